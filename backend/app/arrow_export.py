@@ -0,0 +1,139 @@
+"""
+Apache Arrow / Parquet encoding of indicator series.
+
+pyarrow is imported lazily so the JSON API keeps working on installs without
+it; binary requests then get a 406.
+"""
+import io
+from typing import Iterable, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/x-parquet"
+BINARY_MEDIA_TYPES = (ARROW_STREAM, PARQUET)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401 - registers pyarrow.parquet
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow/Parquet output requires pyarrow on the server")
+    return pyarrow
+
+
+def _quality(params: List[str]) -> float:
+    """The q parameter of an Accept entry (1 when absent, 0 when malformed)"""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Return the binary media type an Accept header prefers, if any; q=0 excludes a type"""
+    if not accept:
+        return None
+    best, best_q = None, 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        q = _quality(params)
+        if media_type in BINARY_MEDIA_TYPES and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def _schema(pa):
+    return pa.schema([
+        ("slug", pa.dictionary(pa.int32(), pa.string())),
+        ("series_type", pa.dictionary(pa.int32(), pa.string())),
+        ("date", pa.date32()),
+        ("value", pa.float64()),
+    ])
+
+
+def _batch(pa, schema, slugs: List[str], series_types: List[str], dates: list, values: list):
+    return pa.record_batch([
+        pa.array(slugs, pa.string()).dictionary_encode(),
+        pa.array(series_types, pa.string()).dictionary_encode(),
+        pa.array(dates, pa.date32()),
+        pa.array(values, pa.float64()),
+    ], schema=schema)
+
+
+def series_body(slug: str, ordered_types: List[str], selected: dict, media_type: str) -> bytes:
+    """Encode already-selected series rows as one long-format Arrow/Parquet table"""
+    pa = _pyarrow()
+    schema = _schema(pa)
+    slugs, series_types, dates, values = [], [], [], []
+    for series_type in ordered_types:
+        rows = selected[series_type]
+        slugs.extend([slug] * len(rows))
+        series_types.extend([series_type] * len(rows))
+        dates.extend(row.date for row in rows)
+        values.extend(row.value for row in rows)
+
+    table = pa.Table.from_batches([_batch(pa, schema, slugs, series_types, dates, values)], schema=schema)
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET:
+        pa.parquet.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents can be taken as they are produced"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_batches(row_partitions: Iterable[list], media_type: str) -> Iterator[bytes]:
+    """Encode (slug, series_type, date, value) row partitions batch by batch.
+
+    Each partition from the database cursor becomes one record batch (or
+    Parquet row group) and is yielded as soon as it is written, so the
+    whole export is never held in memory.
+    """
+    # Resolve pyarrow up front so a missing install is a 406, not a broken stream
+    return _generate_batches(_pyarrow(), row_partitions, media_type)
+
+
+def _generate_batches(pa, row_partitions: Iterable[list], media_type: str) -> Iterator[bytes]:
+    schema = _schema(pa)
+    sink = _DrainableSink()
+    if media_type == PARQUET:
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for rows in row_partitions:
+            slugs, series_types, dates, values = (list(column) for column in zip(*rows))
+            writer.write_batch(_batch(pa, schema, slugs, series_types, dates, values))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,218 @@
+"""
+HTTP conditional GET and an in-process cache of serialized GET responses.
+
+Read routers use `route_class=CachedRoute`; endpoints opt in with
+`@cached(lambda params: [tags...])`, where `params` are the request's path
+parameters. Before the endpoint runs, the revisions of those tags are read
+(app/revisions.py) to derive a strong ETag and Last-Modified; matching
+If-None-Match / If-Modified-Since requests get a 304 without touching
+data_points.
+
+Entries hold the encoded response bytes keyed on path, query string and
+Accept header, are only served while their ETag is current, are evicted
+LRU-first beyond `max_entries` and expire after `ttl_seconds`. Committed
+revision bumps also drop the entries of the touched tags.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+
+from . import revisions
+from .config import get_settings
+from .database import SessionLocal
+
+CacheKey = Tuple[str, str, str]
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    status_code: int
+    media_type: str
+    etag: str
+    tags: Tuple[str, ...]
+    expires_at: float
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._tag_index: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: CacheKey, body: bytes, status_code: int, media_type: str, etag: str, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(body, status_code, media_type, etag, tags, time.monotonic() + self.ttl_seconds)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of `tags`; returns the number dropped"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tag_index.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+
+settings = get_settings()
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+)
+revisions.on_commit(lambda tags: response_cache.invalidate(*tags))
+
+
+def cached(tags: Callable[[dict], List[str]]):
+    """Mark a GET endpoint as cacheable under the tags computed from its path params"""
+    def decorator(endpoint):
+        endpoint.cache_tags = tags
+        return endpoint
+    return decorator
+
+
+def _read_revisions(tags: List[str]):
+    with SessionLocal() as db:
+        return revisions.current(db, tags)
+
+
+def _validators(key: CacheKey, versions: Dict[str, int], last_modified: Optional[datetime]) -> Dict[str, str]:
+    digest = hashlib.sha1(repr((key, sorted(versions.items()))).encode()).hexdigest()
+    headers = {"ETag": f'"{digest}"'}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+class CachedRoute(APIRoute):
+    """APIRoute adding ETag/304 handling and response_cache to @cached endpoints"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        tags_for = getattr(self.endpoint, "cache_tags", None)
+        if tags_for is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            tags = tags_for(request.path_params)
+            key = (
+                request.url.path,
+                "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+                request.headers.get("accept", ""),
+            )
+            # Revision lookup is a primary-key read; the data queries only run on a miss
+            versions, last_modified = await run_in_threadpool(_read_revisions, tags)
+            validators = _validators(key, versions, last_modified)
+            etag = validators["ETag"]
+            
+            if _not_modified(request, etag, last_modified):
+                return Response(status_code=304, headers=validators)
+            
+            if settings.response_cache_enabled:
+                entry = response_cache.get(key)
+                if entry is not None and entry.etag == etag:
+                    return Response(
+                        content=entry.body,
+                        status_code=entry.status_code,
+                        media_type=entry.media_type,
+                        headers={**validators, "X-Cache": "HIT"},
+                    )
+
+            response = await handler(request)
+            if response.status_code == 200 and not isinstance(response, StreamingResponse):
+                response.headers.update(validators)
+                if settings.response_cache_enabled:
+                    response_cache.set(
+                        key,
+                        response.body,
+                        response.status_code,
+                        response.headers.get("content-type", response.media_type),
+                        etag,
+                        tags,
+                    )
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return cached_handler
@@ -0,0 +1,257 @@
+"""
+Bulk collection of today's value for every active indicator, shared by
+POST /api/admin/collect-all-data and its background job.
+
+Pages are scraped concurrently and each distinct scrape_url is fetched and
+parsed once per run, however many indicators point at it (app/scraping.py).
+
+Scrapable indicators are claimed in batches (app/schedule.py), so several
+collectors can run at once without scraping the same indicator twice. A
+batch costs a fixed number of queries whatever its size: one to load the
+indicators with today's point (collectable_indicators), one for the run each
+reading belongs to, one batched append of the readings (ON CONFLICT DO
+NOTHING, so a batch collected again after an expired lease stores them
+once), the day's bars, one to lock the indicators and one to find which of
+the day's points exist, one batched upsert of the day's points, the
+snapshot update (app/snapshots.py), and a single commit that also records
+each indicator's outcome and next due time and releases the batch's
+leases. With `due_only` only indicators that are due are claimed.
+
+Every run scrapes again, even when today's point exists: each reading is
+kept as an intraday observation and today's point follows the day's bar
+(app/intraday.py). When a scrape fails, today's existing point stands.
+"""
+from datetime import date
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from .models import Indicator, DataPoint
+from .ingest import upsert_points
+from .scraping import ScrapeOutcome, host_health, host_of, scrape_targets
+from . import intraday, schedule, selector_memory
+from .snapshots import SeriesWrite, apply_writes, lock_series
+
+# (done, total, result of the indicator just processed)
+ProgressCallback = Callable[[int, int, dict], None]
+
+
+def scrape_indicator(db: Session, indicator: Indicator) -> ScrapeOutcome:
+    """Scrape one indicator like a collection run does (does not commit).
+
+    Goes through the same retries, circuit breaker and selector memory; a
+    failure comes back as the outcome's error.
+    """
+    outcome = scrape_targets(
+        [(indicator.id, indicator.scrape_url, indicator.html_selector, indicator.extractor_type)],
+        hints=selector_memory.load_hints(db, [(indicator.id, indicator.scrape_url)]),
+    )[indicator.id]
+    selector_memory.record(db, [(indicator.id, indicator.scrape_url, outcome.matched, outcome.missed)])
+    return outcome
+
+
+class Collectable(NamedTuple):
+    indicator: Indicator
+    today_value: Optional[float]  # today's historical value, None if not collected yet
+
+    @property
+    def has_today(self) -> bool:
+        return self.today_value is not None
+
+    @property
+    def scrapable(self) -> bool:
+        return bool(self.indicator.scrape_url and self.indicator.html_selector)
+
+
+def collectable_indicators(db: Session, day: date, indicator_ids: Optional[Iterable[int]] = None) -> List[Collectable]:
+    """Indicators with a scrape config or existing data, each with its historical value for `day`.
+
+    `indicator_ids` restricts the result to those indicators.
+    """
+    today_point = aliased(DataPoint)
+    has_data = select(DataPoint.id).where(DataPoint.indicator_id == Indicator.id).exists()
+    has_scrape_config = and_(
+        Indicator.scrape_url.isnot(None), Indicator.scrape_url != "",
+        Indicator.html_selector.isnot(None), Indicator.html_selector != "",
+    )
+    query = (
+        select(Indicator, today_point.value)
+        .outerjoin(today_point, and_(
+            today_point.indicator_id == Indicator.id,
+            today_point.series_type == "historical",
+            today_point.date == day,
+        ))
+        .where(or_(has_scrape_config, has_data))
+        .order_by(Indicator.id)
+    )
+    if indicator_ids is not None:
+        query = query.where(Indicator.id.in_(list(indicator_ids)))
+    rows = db.execute(query).all()
+    return [Collectable(indicator, value) for indicator, value in rows]
+
+
+def save_collected(db: Session, values: dict, day: date, runs: Optional[dict] = None) -> dict:
+    """Save {indicator_id: reading} scraped for `day` (does not commit).
+
+    The readings are appended as intraday observations (once per run in
+    `runs`, see schedule.previous_runs()), the day's bars are recomputed,
+    and each indicator's historical point for the day is set from its bar.
+    Returns the historical value saved per indicator.
+    """
+    intraday.record(db, values, day, runs=runs)
+    field = intraday.daily_value_field()
+    daily = {
+        indicator_id: getattr(bar, field)
+        for indicator_id, bar in intraday.refresh_bars(db, values, day).items()
+    }
+    lock_series(db, daily)
+    existing = set(db.execute(
+        select(DataPoint.indicator_id).where(
+            DataPoint.indicator_id.in_(list(daily)),
+            DataPoint.series_type == "historical",
+            DataPoint.date == day,
+        )
+    ).scalars()) if daily else set()
+    upsert_points(db, [
+        {"indicator_id": indicator_id, "series_type": "historical", "date": day, "value": value}
+        for indicator_id, value in daily.items()
+    ])
+    apply_writes(db, {
+        (indicator_id, "historical"): SeriesWrite({day: value}, int(indicator_id not in existing))
+        for indicator_id, value in daily.items()
+    })
+    return daily
+
+
+def _collect_batch(
+    db: Session,
+    entries: List[Collectable],
+    today: date,
+    results: List[dict],
+    on_progress: Optional[ProgressCallback] = None,
+    total: int = 0,
+    worker: Optional[str] = None,
+) -> set:
+    """Scrape, save and commit one batch, appending a result per entry to `results`.
+
+    The commit releases the leases `worker` holds on the batch. Returns the
+    hosts it scraped.
+    """
+    # Fetch every page still needed once, concurrently
+    to_scrape = [entry.indicator for entry in entries if entry.scrapable]
+    runs = schedule.previous_runs(db, [i.id for i in to_scrape])
+    scraped = scrape_targets(
+        [(i.id, i.scrape_url, i.html_selector, i.extractor_type) for i in to_scrape],
+        hints=selector_memory.load_hints(db, [(i.id, i.scrape_url) for i in to_scrape]),
+    )
+    selector_memory.record(db, [
+        (i.id, i.scrape_url, scraped[i.id].matched, scraped[i.id].missed) for i in to_scrape
+    ])
+
+    first = len(results)
+    collected = {}
+
+    for indicator, today_value in entries:
+        try:
+            outcome = scraped.get(indicator.id)
+            scraped_value = outcome.value if outcome else None
+
+            if scraped_value is None and today_value is not None:
+                results.append({
+                    "indicator": indicator.name,
+                    "value": today_value,
+                    "status": "existing",
+                    "date": today.isoformat()
+                })
+                continue
+
+            if scraped_value is None:
+                results.append({
+                    "indicator": indicator.name,
+                    "status": "failed",
+                    "error": outcome.error if outcome and outcome.error else "Failed to scrape data from source",
+                    "date": today.isoformat()
+                })
+                continue
+
+            # Saved with the rest of the batch below
+            collected[indicator.id] = scraped_value
+
+            results.append({
+                "indicator": indicator.name,
+                "value": scraped_value,
+                "status": "collected",
+                "date": today.isoformat()
+            })
+
+        except Exception as e:
+            results.append({
+                "indicator": indicator.name,
+                "status": "failed",
+                "error": str(e),
+                "date": today.isoformat()
+            })
+        finally:
+            if on_progress:
+                on_progress(len(results), max(total, len(results)), results[-1])
+
+    save_collected(db, collected, today, runs)
+    schedule.mark_collected(db, {
+        entry.indicator.id: result["status"]
+        for entry, result in zip(entries, results[first:]) if entry.scrapable
+    }, worker=worker)
+    db.commit()
+    return {host_of(indicator.scrape_url) for indicator in to_scrape}
+
+
+def collect_all(db: Session, on_progress: Optional[ProgressCallback] = None, due_only: bool = False) -> dict:
+    """Scrape today's value for every indicator with a scrape config or existing data.
+
+    With `due_only`, only scrapable indicators whose schedule is due are
+    processed. Indicators leased by another collector are left to it.
+    Commits once per batch; returns the summary, per-indicator results and
+    the failing hosts with their circuit breaker state.
+    """
+    today = date.today()
+    worker = schedule.worker_id()
+    results: List[dict] = []
+
+    # Indicators with data but no scrape config are only reported
+    passive = [] if due_only else [entry for entry in collectable_indicators(db, today) if not entry.scrapable]
+    schedule.ensure_schedules(db)
+    total = len(passive) + schedule.count_claimable(db, due_only)
+    hosts = _collect_batch(db, passive, today, results, on_progress, total)
+
+    with schedule.LeaseKeeper(worker) as leases:
+        processed = set()
+        while True:
+            claimed = schedule.claim(db, worker, due_only=due_only, exclude=processed)
+            if not claimed:
+                break
+            processed.update(claimed)
+            leases.hold(claimed)
+            try:
+                hosts |= _collect_batch(
+                    db, collectable_indicators(db, today, claimed), today, results, on_progress, total, worker
+                )
+            except Exception:
+                db.rollback()
+                schedule.release(db, worker, claimed)
+                db.commit()
+                raise
+            finally:
+                leases.drop(claimed)
+
+    successful = sum(1 for result in results if result["status"] != "failed")
+    return {
+        "message": "Bulk data collection completed",
+        "date": today.isoformat(),
+        "summary": {
+            "total_processed": len(results),
+            "successful": successful,
+            "failed": len(results) - successful
+        },
+        "hosts": host_health.report(hosts),
+        "results": results
+    }
@@ -8,6 +8,49 @@ class Settings(BaseSettings):
     database_url: str = os.getenv('DATABASE_URL', 'sqlite:///./macro_indicators.db')
     app_name: str = "Macro Indicators API"
     debug: bool = True
+    # In-process cache for public GET endpoints (see app/cache.py)
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 512
+    response_cache_ttl_seconds: float = 300
+    # Rows per chunk (and per commit) when ingesting CSV uploads
+    ingest_chunk_rows: int = 50000
+    # Worker threads for background admin jobs (see app/jobs.py)
+    job_workers: int = 2
+    # Concurrent scraping (see app/scraping.py)
+    scrape_max_workers: int = 16
+    scrape_per_host_concurrency: int = 2
+    scrape_host_interval_seconds: float = 1.0
+    scrape_request_timeout_seconds: float = 15
+    scrape_deadline_seconds: float = 240
+    # Per-host retries with exponential backoff, and the circuit breaker that skips
+    # a host after repeated failures (see app/scraping.py)
+    scrape_retries: int = 2
+    scrape_backoff_base_seconds: float = 0.5
+    scrape_backoff_max_seconds: float = 8
+    host_breaker_threshold: int = 3
+    host_breaker_cooldown_seconds: float = 300
+    # Shared HTTP client for scrape targets (see app/http_client.py)
+    http_pool_hosts: int = 32
+    http_pool_per_host: int = 4
+    http_validator_cache_size: int = 512
+    # Skip a fallback selector after this many misses in a row for an indicator,
+    # retrying it once this many days have passed (see app/selector_memory.py)
+    selector_prune_after: int = 5
+    selector_retry_days: int = 7
+    # Collection schedules (see app/schedule.py): zone cron specs are evaluated in
+    # (empty = the server's local time) and the longest the scheduler sleeps before
+    # looking for new or rescheduled indicators
+    schedule_timezone: str = ""
+    scheduler_max_sleep_seconds: float = 900
+    # Work claiming between collector processes (see app/schedule.py): indicators
+    # per claimed batch, and how long a claim lasts unless its worker renews it
+    collection_claim_batch: int = 50
+    collection_lease_seconds: float = 300
+    # Intraday readings (see app/intraday.py): which bar field becomes the day's
+    # historical point (open, high, low, close/last), and how many days of raw
+    # readings are kept before they are reduced to daily bars
+    intraday_daily_value: str = "close"
+    intraday_retention_days: int = 30
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -0,0 +1,46 @@
+"""
+CSV encoding of indicator series for streaming downloads.
+
+Rows come straight from a database cursor and are written out in batches of
+encoded lines as the response streams, so memory use does not grow with the
+length of the series.
+"""
+import csv
+import io
+from itertools import groupby
+from typing import Iterable, Iterator, Optional, Sequence
+
+# Rows fetched from the cursor and encoded per chunk of the response body
+CSV_BATCH_ROWS = 10000
+
+
+def encode(header: Sequence[str], rows: Iterable[Sequence], batch_rows: Optional[int] = None) -> Iterator[bytes]:
+    """Yield the header line, then UTF-8 CSV lines in chunks of `batch_rows` rows"""
+    batch_rows = batch_rows or CSV_BATCH_ROWS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == batch_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def pivot(rows: Iterable[Sequence], columns: Sequence[str]) -> Iterator[tuple]:
+    """Turn (date, series_type, value) rows sorted by date into (date, value per column) rows.
+
+    Series missing on a date are left empty. Only one date's values are held
+    at a time.
+    """
+    position = {series_type: i for i, series_type in enumerate(columns)}
+    for day, readings in groupby(rows, key=lambda row: row[0]):
+        values = [None] * len(columns)
+        for _, series_type, value in readings:
+            values[position[series_type]] = value
+        yield (day, *values)
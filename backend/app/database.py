@@ -7,10 +7,11 @@ settings = get_settings()
 
 # Handle SQLite vs PostgreSQL
 if settings.database_url.startswith("sqlite"):
+    # SQLite has no schemas: map the "macro_indicators" schema to the main database
     engine = create_engine(
         settings.database_url, 
         connect_args={"check_same_thread": False}
-    )
+    ).execution_options(schema_translate_map={"macro_indicators": None})
 else:
     engine = create_engine(settings.database_url)
 
@@ -0,0 +1,75 @@
+"""
+Shape-preserving downsampling for chart payloads.
+
+Both algorithms return the *indices* of the points to keep (sorted, always
+including the first and last point) so callers can pick rows out of whatever
+structure they already hold.
+"""
+from datetime import date
+from typing import Sequence
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets selection of `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket i covers [starts[i], starts[i + 1]); the first and last points
+    # are kept as-is, so only the n - 2 interior points are bucketed.
+    every = (n - 2) / (threshold - 2)
+    starts = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.int64)
+    lengths = np.diff(starts)
+
+    # Average of every bucket, plus the last point as the final "bucket"
+    avg_x = np.append(np.add.reduceat(x[:n - 1], starts[:-1]) / lengths, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:n - 1], starts[:-1]) / lengths, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = starts[i], starts[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        areas = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Keep the min and max of each bucket (about `threshold` points in total)."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    n_buckets = max(1, (threshold - 2) // 2)
+    bucket = np.arange(n) * n_buckets // n
+    # Sort by (bucket, value): the first row of each bucket is its min, the last its max
+    order = np.lexsort((y, bucket))
+    first = np.searchsorted(bucket[order], np.arange(n_buckets), side="left")
+    last = np.searchsorted(bucket[order], np.arange(n_buckets), side="right") - 1
+
+    picks = np.concatenate(([0, n - 1], order[first], order[last]))
+    return np.unique(picks)
+
+
+def downsample_indices(
+    dates: Sequence[date],
+    values: Sequence[float],
+    points: int,
+    method: str = "lttb",
+) -> np.ndarray:
+    """Indices of at most ~`points` rows that preserve the shape of the series."""
+    y = np.asarray(values, dtype=np.float64)
+    if method == "minmax":
+        return minmax_indices(y, points)
+    x = np.fromiter((d.toordinal() for d in dates), dtype=np.float64, count=len(dates))
+    return lttb_indices(x, y, points)
@@ -0,0 +1,311 @@
+"""
+Value extraction from fetched pages, shared by every collector.
+
+An indicator's `extractor_type` decides how its `html_selector` expression is
+evaluated against a Page (app/http_client.py):
+
+  css       CSS selector, compiled once to an lxml XPath (default)
+  xpath     XPath expression, compiled once
+  jsonpath  JSONPath subset ($.a.b[0], $['a b'], [*]) over a JSON response
+  regex     regular expression over the raw text; group 1, or the whole match
+
+Simple CSS selectors (.class, #id, [attr="value"], optionally with a tag) are
+first tried by a pre-filter that finds the element in the raw text and
+parses only that snippet; anything it cannot decide safely falls through to
+the full tree. When a CSS selector matches nothing, FALLBACK_SELECTORS are
+tried in order, starting with the one that worked last time (`preferred`)
+and minus the ones that keep failing for the indicator (`skip`); see
+app/selector_memory.py.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Collection, List, NamedTuple, Optional, Tuple, Union
+
+from lxml import etree, html
+from lxml.cssselect import CSSSelector
+
+from .http_client import Page
+
+CSS = "css"
+XPATH = "xpath"
+JSONPATH = "jsonpath"
+REGEX = "regex"
+EXTRACTOR_TYPES = (CSS, XPATH, JSONPATH, REGEX)
+
+NUMBER_PATTERN = re.compile(r'[\d,]+\.?\d*')
+
+# Generic price selectors tried when a configured CSS selector misses
+FALLBACK_SELECTORS = [
+    '.text-5xl', '.text-4xl', '.text-3xl', '.text-2xl',
+    '[data-test="instrument-price-last"]',
+    '.instrument-price_last',
+    '.last-price-value', '.price-value', '.current-price',
+    '.pid-index-last', '.pid-last',
+    '.price', '.value', '.amount',
+    'span[class*="price"]', 'div[class*="price"]',
+    'span[class*="value"]', 'div[class*="value"]'
+]
+
+
+class Extraction(NamedTuple):
+    value: Optional[float] = None
+    matched: Optional[str] = None  # the expression that produced the value
+    missed: Tuple[str, ...] = ()  # expressions tried before it that found nothing
+
+
+def parse_number(text: str) -> Optional[float]:
+    """First number in a scraped string ("$1,234.50 USD" -> 1234.5)"""
+    numbers = NUMBER_PATTERN.findall(text)
+    if numbers:
+        return float(numbers[0].replace(',', ''))
+    return None
+
+
+def _to_number(raw: Any) -> Optional[float]:
+    if isinstance(raw, bool) or raw is None:
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    if isinstance(raw, etree._Element):
+        raw = raw.text_content()
+    return parse_number(str(raw).strip())
+
+
+# --- CSS / XPath ---------------------------------------------------------
+
+@lru_cache(maxsize=2048)
+def compiled_css(selector: str) -> CSSSelector:
+    return CSSSelector(selector, translator="html")
+
+
+@lru_cache(maxsize=2048)
+def compiled_xpath(expression: str) -> etree.XPath:
+    return etree.XPath(expression)
+
+
+def _first(result: Union[list, Any]) -> Any:
+    if isinstance(result, list):
+        return result[0] if result else None
+    return result
+
+
+_SIMPLE_CSS = re.compile(
+    r'^(?P<tag>[a-zA-Z][\w-]*)?'
+    r'(?:\.(?P<cls>[\w-]+)|#(?P<id>[\w-]+)|\[(?P<attr>[\w-]+)=(?P<q>["\'])(?P<val>[^"\']*)(?P=q)\])$'
+)
+_OPAQUE_BLOCKS = (("<script", "</script"), ("<style", "</style"), ("<!--", "-->"))
+
+
+@lru_cache(maxsize=2048)
+def _prefilter_pattern(selector: str) -> Optional[Tuple["re.Pattern", Optional[str]]]:
+    """Regex matching the opening tag of a simple selector's first element, if the selector is simple"""
+    m = _SIMPLE_CSS.match(selector.strip())
+    if not m:
+        return None
+    if m.group("cls"):
+        attr, value = "class", r'(?:[^"\']*\s)?' + re.escape(m.group("cls")) + r'(?:\s[^"\']*)?'
+    elif m.group("id"):
+        attr, value = "id", re.escape(m.group("id"))
+    else:
+        attr, value = re.escape(m.group("attr")), re.escape(m.group("val"))
+    tag = re.escape(m.group("tag")) if m.group("tag") else r'[a-zA-Z][\w-]*'
+    pattern = re.compile(
+        rf'<({tag})\b[^>]*?\s{attr}\s*=\s*(["\']){value}\2[^>]*>',
+        re.IGNORECASE,
+    )
+    return pattern, m.group("tag")
+
+
+def _inside_opaque_block(lowered: str, position: int) -> bool:
+    for opener, closer in _OPAQUE_BLOCKS:
+        if lowered.rfind(opener, 0, position) > lowered.rfind(closer, 0, position):
+            return True
+    return False
+
+
+def prefilter_css(page: Page, selector: str) -> Tuple[bool, Optional[float]]:
+    """Try a simple CSS selector against the raw text.
+
+    Returns (decided, value). `decided` is False when the selector is not
+    simple or the snippet could not be located safely; the caller then uses
+    the full tree.
+    """
+    compiled = _prefilter_pattern(selector)
+    if compiled is None:
+        return False, None
+    pattern, _ = compiled
+    text = page.text
+    match = pattern.search(text)
+    if match is None:
+        return False, None
+    lowered = text[:match.start()].lower()
+    if _inside_opaque_block(lowered, match.start()):
+        return False, None
+
+    # Find the matching close tag, allowing for nested elements of the same name
+    tag = match.group(1)
+    depth = 1
+    end = match.end()
+    if not match.group(0).endswith("/>"):
+        for token in re.finditer(rf'<(/?){re.escape(tag)}\b[^>]*?(/?)>', text[match.end():], re.IGNORECASE):
+            if token.group(1):
+                depth -= 1
+            elif not token.group(2):
+                depth += 1
+            if depth == 0:
+                end = match.end() + token.end()
+                break
+        else:
+            return False, None
+
+    fragment = html.fragment_fromstring(text[match.start():end])
+    return True, parse_number(fragment.text_content().strip())
+
+
+def extract_css(page: Page, selector: str) -> Optional[float]:
+    decided, value = prefilter_css(page, selector)
+    if decided:
+        return value
+    return _to_number(_first(compiled_css(selector)(page.tree)))
+
+
+def extract_xpath(page: Page, expression: str) -> Optional[float]:
+    return _to_number(_first(compiled_xpath(expression)(page.tree)))
+
+
+# --- JSONPath ------------------------------------------------------------
+
+_JSONPATH_TOKEN = re.compile(r'\.(?P<name>[\w-]+)|\.\*|\[\*\]|\[(?P<index>-?\d+)\]|\[(?P<q>["\'])(?P<key>.*?)(?P=q)\]')
+
+
+@lru_cache(maxsize=2048)
+def compiled_jsonpath(expression: str) -> Tuple[Any, ...]:
+    """Steps of a JSONPath subset: keys, indexes and * wildcards"""
+    expression = expression.strip()
+    if not expression.startswith("$"):
+        raise ValueError(f"JSONPath must start with '$': {expression}")
+    steps: List[Any] = []
+    position = 1
+    while position < len(expression):
+        token = _JSONPATH_TOKEN.match(expression, position)
+        if token is None:
+            raise ValueError(f"Unsupported JSONPath syntax at '{expression[position:]}'")
+        if token.group("name") is not None:
+            steps.append(token.group("name"))
+        elif token.group("index") is not None:
+            steps.append(int(token.group("index")))
+        elif token.group("key") is not None:
+            steps.append(token.group("key"))
+        else:
+            steps.append("*")
+        position = token.end()
+    return tuple(steps)
+
+
+def _walk(node: Any, steps: Tuple[Any, ...]):
+    if not steps:
+        yield node
+        return
+    step, rest = steps[0], steps[1:]
+    if step == "*":
+        children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else []
+        for child in children:
+            yield from _walk(child, rest)
+    elif isinstance(step, int):
+        if isinstance(node, list) and -len(node) <= step < len(node):
+            yield from _walk(node[step], rest)
+    elif isinstance(node, dict) and step in node:
+        yield from _walk(node[step], rest)
+
+
+def extract_jsonpath(page: Page, expression: str) -> Optional[float]:
+    for match in _walk(page.json, compiled_jsonpath(expression)):
+        value = _to_number(match)
+        if value is not None:
+            return value
+    return None
+
+
+# --- Regex ---------------------------------------------------------------
+
+@lru_cache(maxsize=2048)
+def compiled_regex(pattern: str) -> "re.Pattern":
+    return re.compile(pattern, re.DOTALL)
+
+
+def extract_regex(page: Page, pattern: str) -> Optional[float]:
+    match = compiled_regex(pattern).search(page.text)
+    if match is None:
+        return None
+    return parse_number(match.group(1) if match.re.groups else match.group(0))
+
+
+_EXTRACTORS = {
+    CSS: extract_css,
+    XPATH: extract_xpath,
+    JSONPATH: extract_jsonpath,
+    REGEX: extract_regex,
+}
+_COMPILERS = {
+    CSS: compiled_css,
+    XPATH: compiled_xpath,
+    JSONPATH: compiled_jsonpath,
+    REGEX: compiled_regex,
+}
+
+
+def validate(extractor_type: str, expression: str) -> None:
+    """Raise ValueError unless `expression` compiles for `extractor_type`"""
+    if extractor_type not in _COMPILERS:
+        raise ValueError(f"Unknown extractor type '{extractor_type}' (expected one of {', '.join(EXTRACTOR_TYPES)})")
+    try:
+        _COMPILERS[extractor_type](expression)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid {extractor_type} expression '{expression}': {e}")
+
+
+def extract(
+    page: Page,
+    expression: str,
+    extractor_type: Optional[str] = None,
+    fallback: bool = True,
+    preferred: Optional[str] = None,
+    skip: Collection[str] = (),
+) -> Extraction:
+    """Evaluate an indicator's expression against a page.
+
+    For CSS, the configured selector is tried first and is never skipped.
+    Unless `fallback` is False, FALLBACK_SELECTORS not in `skip` follow, with
+    `preferred` (the fallback that produced the value last time) moved to the
+    front of them.
+    """
+    extractor_type = extractor_type or CSS
+    if extractor_type not in _EXTRACTORS:
+        raise ValueError(f"Unknown extractor type '{extractor_type}'")
+
+    if extractor_type != CSS:
+        value = _EXTRACTORS[extractor_type](page, expression)
+        return Extraction(value, expression) if value is not None else Extraction(missed=(expression,))
+
+    candidates = [expression]
+    if fallback:
+        fallbacks = [selector for selector in FALLBACK_SELECTORS if selector not in skip]
+        if preferred in fallbacks:
+            fallbacks.remove(preferred)
+            fallbacks.insert(0, preferred)
+        candidates += fallbacks
+
+    missed = []
+    for selector in dict.fromkeys(candidates):
+        value = extract_css(page, selector)
+        if value is not None:
+            return Extraction(value, selector, tuple(missed))
+        missed.append(selector)
+    return Extraction(missed=tuple(missed))
+
+
+# Compile the fallbacks up front; the compiled XPath objects are reused by every run
+for _selector in FALLBACK_SELECTORS:
+    compiled_css(_selector)
@@ -0,0 +1,151 @@
+"""
+Shared HTTP client for scrape targets.
+
+One pooled requests.Session per process: connections are kept alive and
+reused, each host gets at most `http_pool_per_host` connections, and
+responses are gzip/deflate (and brotli when the brotli package is installed)
+compressed.
+
+fetch_page() makes conditional requests. The ETag / Last-Modified of each
+page are kept with the Page, sent back as If-None-Match / If-Modified-Since,
+and a 304 returns the stored Page, including whatever tree or JSON was
+already parsed from it, without downloading it again.
+"""
+import json
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, NamedTuple, Optional, Tuple
+
+import requests
+from lxml import html
+from requests.adapters import HTTPAdapter
+
+from .config import get_settings
+
+settings = get_settings()
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode "br"
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide pooled session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.http_pool_hosts,
+                pool_maxsize=settings.http_pool_per_host,
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            _session = session
+        return _session
+
+
+class Page:
+    """A fetched response body; the text, HTML tree and JSON forms are built on first use"""
+
+    def __init__(self, url: str, content: bytes, encoding: Optional[str] = None, content_type: str = ""):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.content_type = content_type
+        self._lock = threading.Lock()
+
+    @cached_property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    @property
+    def tree(self):
+        # Parsed at most once even when several threads extract from the same page
+        with self._lock:
+            if "_tree" not in self.__dict__:
+                self._tree = html.fromstring(self.content)
+            return self._tree
+
+    @cached_property
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class _Validated(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    page: Page
+
+
+class ValidatorStore:
+    """ETag / Last-Modified and stored Page per URL, LRU-bounded"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Validated]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.revalidated = 0
+
+    def get(self, url: str) -> Optional[_Validated]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def set(self, url: str, etag: Optional[str], last_modified: Optional[str], page: Page) -> None:
+        with self._lock:
+            self._entries[url] = _Validated(etag, last_modified, page)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, url: str) -> None:
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+validators = ValidatorStore(settings.http_validator_cache_size)
+
+
+def fetch_page(url: str, timeout: float, headers: Optional[dict] = None) -> Tuple[Page, bool]:
+    """GET a page, revalidating a stored copy if there is one.
+
+    Returns (page, not_modified); raises for HTTP errors.
+    """
+    request_headers = dict(headers or {})
+    request_headers["Accept-Encoding"] = ACCEPT_ENCODING
+    stored = validators.get(url)
+    if stored is not None:
+        if stored.etag:
+            request_headers["If-None-Match"] = stored.etag
+        if stored.last_modified:
+            request_headers["If-Modified-Since"] = stored.last_modified
+
+    response = get_session().get(url, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and stored is not None:
+        validators.revalidated += 1
+        return stored.page, True
+
+    response.raise_for_status()
+    page = Page(url, response.content, response.encoding, response.headers.get("Content-Type", ""))
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        validators.set(url, etag, last_modified, page)
+    else:
+        validators.discard(url)
+    return page, False
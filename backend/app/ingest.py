@@ -0,0 +1,225 @@
+"""
+Vectorized CSV ingest for data_points.
+
+A DataFrame with `date` and `value` columns is parsed, validated and written
+with one set-based upsert (INSERT ... ON CONFLICT DO UPDATE against the
+uq_data_points_indicator_series_date constraint) instead of a SELECT and an
+ORM object per row.
+
+Uploads are read with ingest_csv_stream() in fixed-size chunks straight from
+the upload's temporary file, so peak memory depends on the chunk size rather
+than the file size.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import BinaryIO, Callable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import DataPoint
+from .snapshots import SeriesWrite, apply_writes, lock_series
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MAX_REPORTED_ERRORS = 10
+
+# Rows per INSERT statement; keeps bind parameter counts well inside driver limits
+UPSERT_BATCH_ROWS = 5000
+
+
+class IngestResult(NamedTuple):
+    added: int
+    updated: int
+    errors: List[str]
+    total_errors: int
+    chunks: int = 1
+
+
+class CsvFormatError(ValueError):
+    """The upload is not a readable CSV with date and value columns"""
+
+    def __init__(self, message: str, rows_saved: int = 0):
+        super().__init__(message)
+        self.rows_saved = rows_saved
+
+
+ProgressCallback = Callable[[int, int, int], None]  # (rows_done, bytes_done, total_bytes)
+
+
+def _parse_one(value: str):
+    try:
+        return pd.Timestamp(value).tz_localize(None).as_unit("s")
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+
+
+def parse_dates(raw: pd.Series) -> pd.Series:
+    """Parse yyyy, yyyy-mm and yyyy-mm-dd (or other pandas-parseable) dates in one pass.
+
+    Dates are held at second resolution, so years before 1677 (outside the
+    nanosecond range) still parse. Unparseable entries become NaT.
+    """
+    text = raw.astype(str).str.strip()
+    # Years read as floats by pandas ("1960.0" -> "1960")
+    text = text.str.replace(r"^(-?\d+)\.0*$", r"\1", regex=True)
+
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[s]")
+    is_year = text.str.fullmatch(r"\d{4}")
+    is_month = text.str.fullmatch(r"\d{4}-\d{1,2}")
+    other = ~(is_year | is_month)
+
+    for mask, fmt in ((is_year, "%Y"), (is_month, "%Y-%m"), (other, "mixed")):
+        if mask.any():
+            try:
+                parsed[mask] = pd.to_datetime(text[mask], format=fmt, errors="coerce").dt.as_unit("s")
+            except (ValueError, TypeError):
+                # Mixed UTC offsets and the like: take each entry's own wall-clock time
+                parsed[mask] = [_parse_one(value) for value in text[mask]]
+
+    # Older pandas coerces years outside the nanosecond range to NaT; read those one by one
+    is_day = text.str.fullmatch(r"\d{4}-\d{1,2}-\d{1,2}")
+    for idx in parsed.index[parsed.isna() & (is_year | is_month | is_day)]:
+        fmt = "%Y" if is_year[idx] else "%Y-%m" if is_month[idx] else "%Y-%m-%d"
+        try:
+            parsed[idx] = datetime.strptime(text[idx], fmt)
+        except ValueError:
+            pass
+    return parsed
+
+
+def _row_errors(df: pd.DataFrame, bad_date: pd.Series, bad_value: pd.Series) -> List[str]:
+    """Messages for the first MAX_REPORTED_ERRORS invalid rows"""
+    messages = []
+    for idx in df.index[bad_date | bad_value][:MAX_REPORTED_ERRORS]:
+        if bad_date[idx]:
+            messages.append(f"Row {idx}: invalid date '{df.at[idx, 'date']}'")
+        else:
+            messages.append(f"Row {idx}: invalid value '{df.at[idx, 'value']}'")
+    return messages
+
+
+def upsert_points(db: Session, rows: List[dict]) -> None:
+    """INSERT ... ON CONFLICT (indicator_id, series_type, date) DO UPDATE SET value"""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(DataPoint)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataPoint.indicator_id, DataPoint.series_type, DataPoint.date],
+        set_={"value": stmt.excluded.value},
+    )
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        db.execute(stmt, rows[i:i + UPSERT_BATCH_ROWS])
+
+
+def ingest_dataframe(db: Session, indicator_id: int, series_type: str, df: pd.DataFrame) -> IngestResult:
+    """Validate and upsert a date/value DataFrame and update the series' snapshot (does not commit)"""
+    dates = parse_dates(df["date"])
+    values = pd.to_numeric(df["value"], errors="coerce")
+
+    bad_date = dates.isna()
+    bad_value = ~np.isfinite(values.to_numpy(dtype=np.float64, na_value=np.nan))
+    bad_value = pd.Series(bad_value, index=df.index) & ~bad_date
+    valid = ~(bad_date | bad_value)
+    total_errors = int((~valid).sum())
+    errors = _row_errors(df, bad_date, bad_value) if total_errors else []
+
+    clean = pd.DataFrame({"date": dates[valid].dt.date, "value": values[valid].astype(float)})
+    # The last occurrence of a date in the file wins, as with row-by-row updates
+    clean = clean.drop_duplicates(subset="date", keep="last")
+    if clean.empty:
+        return IngestResult(0, 0, errors, total_errors)
+
+    # Nobody else may add points to the series between this lookup and the snapshot update
+    lock_series(db, [indicator_id])
+    existing = db.execute(
+        select(DataPoint.date).where(
+            DataPoint.indicator_id == indicator_id,
+            DataPoint.series_type == series_type,
+            DataPoint.date >= clean["date"].min(),
+            DataPoint.date <= clean["date"].max(),
+        )
+    ).scalars().all()
+    updated = int(clean["date"].isin(set(existing)).sum())
+
+    points = dict(zip(clean["date"].tolist(), clean["value"].tolist()))
+    upsert_points(db, [
+        {"indicator_id": indicator_id, "series_type": series_type, "date": d, "value": v}
+        for d, v in points.items()
+    ])
+    apply_writes(db, {(indicator_id, series_type): SeriesWrite(points, len(clean) - updated)})
+    return IngestResult(len(clean) - updated, updated, errors, total_errors)
+
+
+def _file_size(fileobj: BinaryIO) -> int:
+    try:
+        return os.fstat(fileobj.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        position = fileobj.tell()
+        size = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(position)
+        return size
+
+
+def ingest_csv_stream(
+    db: Session,
+    indicator_id: int,
+    series_type: str,
+    fileobj: BinaryIO,
+    chunk_rows: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> IngestResult:
+    """Upsert a CSV upload chunk by chunk.
+
+    Every chunk but the last is committed with its snapshot update as soon
+    as it is written, bounding both memory and transaction size. The last
+    chunk is left uncommitted for the caller to commit. Raises CsvFormatError if the file cannot be parsed; rows
+    of chunks read before the failure are written but left uncommitted
+    (see `rows_saved`) for the caller to keep or roll back.
+    """
+    chunk_rows = chunk_rows or settings.ingest_chunk_rows
+    total_bytes = _file_size(fileobj)
+    fileobj.seek(0)
+
+    try:
+        reader = pd.read_csv(fileobj, chunksize=chunk_rows, encoding="utf-8")
+        chunks = iter(reader)
+        chunk = next(chunks, None)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise CsvFormatError(f"Error reading CSV: {e}")
+
+    if chunk is None or "date" not in chunk.columns or "value" not in chunk.columns:
+        raise CsvFormatError("CSV must contain 'date' and 'value' columns")
+
+    added = updated = total_errors = rows_done = chunk_count = 0
+    errors: List[str] = []
+    while chunk is not None:
+        result = ingest_dataframe(db, indicator_id, series_type, chunk)
+        added += result.added
+        updated += result.updated
+        total_errors += result.total_errors
+        errors.extend(result.errors[:MAX_REPORTED_ERRORS - len(errors)])
+        rows_done += len(chunk)
+        chunk_count += 1
+
+        bytes_done = min(fileobj.tell(), total_bytes)
+        logger.info("Ingested %s rows (%s/%s bytes) for indicator %s", rows_done, bytes_done, total_bytes, indicator_id)
+        if on_progress:
+            on_progress(rows_done, bytes_done, total_bytes)
+
+        try:
+            chunk = next(chunks, None)
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            raise CsvFormatError(f"Error reading CSV after row {rows_done}: {e}", rows_saved=rows_done)
+        if chunk is not None:
+            db.commit()
+
+    return IngestResult(added, updated, errors, total_errors, chunk_count)
@@ -0,0 +1,153 @@
+"""
+Intraday readings and the daily bars derived from them.
+
+Every successful scrape appends a row to intraday_observations, so the
+readings taken at 09:00, 15:00 and 21:00 are all kept. Each run inserts its
+readings in one batch, so appends stay cheap and never touch data_points'
+indexes.
+
+A scheduled reading is keyed by its indicator and the schedule's
+`last_run_at` when the batch was claimed (`previous_run_at`), and inserted
+with ON CONFLICT DO NOTHING. When a lease expires and another collector
+collects the same batch again, the reading is stored once. Recording the run
+moves last_run_at on, so the next run gets a new key. Manual readings have no
+key and are always appended.
+
+After each run, refresh_bars() recomputes the day's bar (open/high/low/close)
+for the indicators the run touched, from that day's readings only. The day's
+`historical` data point is then set to the bar field named by
+`intraday_daily_value` (the latest reading, "close", by default).
+
+rollup() applies `intraday_retention_days`: bars of older days are
+recomputed one last time and their raw readings are deleted, leaving only
+the bar.
+"""
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import DailyBar, IntradayObservation
+
+settings = get_settings()
+
+BAR_FIELDS = ("open", "high", "low", "close")
+BAR_BATCH_ROWS = 1000
+
+
+class Bar(NamedTuple):
+    open: float
+    high: float
+    low: float
+    close: float
+    observations: int
+    first_at: datetime
+    last_at: datetime
+
+
+def daily_value_field() -> str:
+    """Bar field used as the day's historical value ("last" is an alias of "close")"""
+    field = settings.intraday_daily_value.lower()
+    field = "close" if field == "last" else field
+    if field not in BAR_FIELDS:
+        raise ValueError(f"intraday_daily_value must be one of {', '.join(BAR_FIELDS)} or last, got '{field}'")
+    return field
+
+
+def record(
+    db: Session,
+    values: Dict[int, float],
+    day: date,
+    observed_at: Optional[datetime] = None,
+    runs: Optional[Dict[int, datetime]] = None,
+) -> None:
+    """Append one reading per indicator for `day`, skipping runs already recorded (does not commit).
+
+    `runs` maps indicator ids to their schedule's previous run (see
+    schedule.previous_runs()).
+    """
+    if not values:
+        return
+    observed_at = observed_at or datetime.now(timezone.utc).replace(tzinfo=None)
+    runs = runs or {}
+    insert_ = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = insert_(IntradayObservation).on_conflict_do_nothing(
+        index_elements=[IntradayObservation.indicator_id, IntradayObservation.previous_run_at],
+    )
+    db.execute(stmt, [
+        {"indicator_id": indicator_id, "date": day, "observed_at": observed_at,
+         "previous_run_at": runs.get(indicator_id), "value": value}
+        for indicator_id, value in values.items()
+    ])
+
+
+def _fold(readings: Iterable[Tuple[datetime, float]]) -> Bar:
+    """Bar of one day's (observed_at, value) readings, in observation order"""
+    readings = list(readings)
+    values = [value for _, value in readings]
+    return Bar(values[0], max(values), min(values), values[-1], len(values), readings[0][0], readings[-1][0])
+
+
+def _bars(rows) -> Dict[Tuple[int, date], Bar]:
+    """Bars of (indicator_id, date, observed_at, value) rows sorted by indicator, date and time"""
+    return {
+        key: _fold((observed_at, value) for _, _, observed_at, value in group)
+        for key, group in groupby(rows, key=lambda row: (row[0], row[1]))
+    }
+
+
+def _upsert_bars(db: Session, bars: Dict[Tuple[int, date], Bar]) -> None:
+    rows: List[dict] = [
+        {"indicator_id": indicator_id, "date": day, **bar._asdict()}
+        for (indicator_id, day), bar in bars.items()
+    ]
+    if not rows:
+        return
+    insert_ = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = insert_(DailyBar)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyBar.indicator_id, DailyBar.date],
+        set_={field: stmt.excluded[field] for field in Bar._fields},
+    )
+    for i in range(0, len(rows), BAR_BATCH_ROWS):
+        db.execute(stmt, rows[i:i + BAR_BATCH_ROWS])
+
+
+def _ordered_readings():
+    return select(
+        IntradayObservation.indicator_id, IntradayObservation.date,
+        IntradayObservation.observed_at, IntradayObservation.value,
+    ).order_by(
+        IntradayObservation.indicator_id, IntradayObservation.date,
+        IntradayObservation.observed_at, IntradayObservation.id,
+    )
+
+
+def refresh_bars(db: Session, indicator_ids: Iterable[int], day: date) -> Dict[int, Bar]:
+    """Recompute and store `day`'s bars for the given indicators (does not commit)"""
+    indicator_ids = list(indicator_ids)
+    if not indicator_ids:
+        return {}
+    rows = db.execute(
+        _ordered_readings().where(IntradayObservation.indicator_id.in_(indicator_ids), IntradayObservation.date == day)
+    ).all()
+    bars = _bars(rows)
+    _upsert_bars(db, bars)
+    return {indicator_id: bar for (indicator_id, _), bar in bars.items()}
+
+
+def rollup(db: Session, today: Optional[date] = None) -> dict:
+    """Reduce readings older than the retention window to their daily bars (does not commit)"""
+    cutoff = (today or date.today()) - timedelta(days=settings.intraday_retention_days)
+    # One bar per indicator and day is small next to the readings it summarises
+    rows = db.execute(
+        _ordered_readings().where(IntradayObservation.date < cutoff).execution_options(yield_per=5000)
+    )
+    bars = _bars(rows)
+    _upsert_bars(db, bars)
+    deleted = db.execute(delete(IntradayObservation).where(IntradayObservation.date < cutoff)).rowcount
+    return {"cutoff": cutoff.isoformat(), "bars": len(bars), "observations_deleted": deleted}
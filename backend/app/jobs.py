@@ -0,0 +1,164 @@
+"""
+Background jobs for long-running admin work (CSV ingest, bulk collection).
+
+A request inserts a row into `jobs` and returns its id straight away; a small
+pool of worker threads claims the row and runs the handler registered for its
+kind with a session of its own. Progress, per-item results and errors are
+written back to the row while the job runs and are read with
+GET /api/admin/jobs/{id}. Live progress is also kept in memory for jobs
+running in this process, since SQLite (a single writer) cannot take the
+progress writes while the job's own transaction is open.
+
+Handlers are registered with @job_handler("kind") and called as
+handler(db, params, ctx); whatever they return becomes the job's result.
+On startup, recover_jobs() re-queues jobs a previous process never started
+and fails the ones it was in the middle of.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal, engine
+from .models import Job
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+JobHandler = Callable[[Session, dict, "JobContext"], Any]
+
+_handlers: Dict[str, JobHandler] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Contexts of jobs running in this process, by id
+_running: Dict[str, "JobContext"] = {}
+
+# Minimum seconds between progress writes to the job row
+PROGRESS_SAVE_INTERVAL = 1.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of `kind`"""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+class JobContext:
+    """Lets a running handler report progress to its job row"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.done = 0
+        self.total: Optional[int] = None
+        self.results: list = []
+        self._saved_at = 0.0
+
+    def snapshot(self) -> dict:
+        return {"done": self.done, "total": self.total, "results": list(self.results)}
+
+    def progress(self, done: int, total: Optional[int] = None, result: Optional[dict] = None) -> None:
+        """Record `done` of `total` items, optionally with the outcome of the last one"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if result is not None:
+            self.results.append(result)
+        if engine.dialect.name != "sqlite" and time.monotonic() - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+            self._saved_at = time.monotonic()
+            self.save(progress=self.snapshot())
+
+    def save(self, **values) -> None:
+        # Separate session: progress is visible while the job's own transaction is open
+        with SessionLocal() as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            db.commit()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.job_workers, thread_name_prefix="job")
+        return _executor
+
+
+def enqueue(db: Session, kind: str, params: Optional[dict] = None) -> Job:
+    """Commit a queued job (with any pending changes in `db`) and hand it to a worker"""
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+    job = Job(id=uuid.uuid4().hex, kind=kind, status=QUEUED, params=params or {})
+    db.add(job)
+    db.commit()
+    _pool().submit(run_job, job.id)
+    return job
+
+
+def run_job(job_id: str) -> None:
+    """Claim a queued job and run it to completion"""
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(Job).where(Job.id == job_id, Job.status == QUEUED).values(status=RUNNING, started_at=_now())
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return
+
+        job = db.get(Job, job_id)
+        ctx = _running[job_id] = JobContext(job_id)
+        try:
+            result = _handlers[job.kind](db, dict(job.params or {}), ctx)
+            status, error = SUCCEEDED, None
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", job_id, job.kind)
+            result, status, error = None, FAILED, getattr(e, "detail", None) or str(e) or type(e).__name__
+
+    try:
+        ctx.save(status=status, progress=ctx.snapshot(), result=result, error=error, finished_at=_now())
+    finally:
+        _running.pop(job_id, None)
+
+
+def recover_jobs(db: Session) -> None:
+    """Fail jobs interrupted by a restart and resubmit the ones still queued"""
+    db.execute(
+        update(Job).where(Job.status == RUNNING).values(
+            status=FAILED, error="Interrupted by a server restart", finished_at=_now()
+        )
+    )
+    db.commit()
+    for job_id in db.execute(select(Job.id).where(Job.status == QUEUED).order_by(Job.created_at)).scalars():
+        _pool().submit(run_job, job_id)
+
+
+def serialize(job: Job) -> dict:
+    live = _running.get(job.id)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": live.snapshot() if live is not None and job.status == RUNNING else job.progress,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
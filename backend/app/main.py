@@ -1,14 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import categories, indicators, dashboard, admin
+from .database import engine, Base, SessionLocal
+from .routers import categories, indicators, dashboard, admin, export
 from .config import get_settings
+from .snapshots import backfill_if_empty
+from .jobs import recover_jobs
 
 settings = get_settings()
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Fill indicator_snapshots on the first start after it was introduced
+with SessionLocal() as db:
+    backfill_if_empty(db)
+    # Pick up background jobs left queued by the previous process
+    recover_jobs(db)
+
 app = FastAPI(
     title=settings.app_name,
     description="API for macroeconomic indicators and historical data",
@@ -30,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Cache"],
 )
 
 # Include routers
@@ -37,6 +46,7 @@ app.include_router(categories.router)
 app.include_router(indicators.router)
 app.include_router(dashboard.router)
 app.include_router(admin.router)
+app.include_router(export.router)
 
 
 @app.get("/")
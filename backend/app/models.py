@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, ForeignKey, Text, DateTime, Index, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -30,7 +30,8 @@ class Indicator(Base):
     unit = Column(String(50), nullable=True)  # e.g., "USD", "%", "Index"
     source = Column(String(100), default="")
     scrape_url = Column(String(500), nullable=True)  # URL to scrape data from
-    html_selector = Column(String(200), nullable=True)  # CSS selector or HTML element to extract data
+    html_selector = Column(String(500), nullable=True)  # Expression evaluated by extractor_type (CSS selector by default)
+    extractor_type = Column(String(20), nullable=False, default="css", server_default="css")  # css, xpath, jsonpath, regex
     frequency = Column(String(20), default="monthly")  # daily, monthly, yearly
     display_order = Column(Integer, default=0)
     created_at = Column(DateTime, server_default=func.now())
@@ -41,7 +42,12 @@ class Indicator(Base):
 
 class DataPoint(Base):
     __tablename__ = "data_points"
-    __table_args__ = {"schema": "macro_indicators"}
+    __table_args__ = (
+        # One point per indicator/series/date; the ON CONFLICT target for upserts, and
+        # the index serving per-series "latest N points" and date-range scans
+        UniqueConstraint("indicator_id", "series_type", "date", name="uq_data_points_indicator_series_date"),
+        {"schema": "macro_indicators"},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id"), nullable=False, index=True)
@@ -50,11 +56,140 @@ class DataPoint(Base):
     value = Column(Float, nullable=False)
     
     indicator = relationship("Indicator", back_populates="data_points")
+
+
+class IntradayObservation(Base):
+    """Every scraped reading, append-only; rolled up into daily_bars (see app/intraday.py)"""
+    __tablename__ = "intraday_observations"
+    __table_args__ = (
+        # Serves "this day's readings of an indicator"
+        Index("ix_intraday_observations_indicator_date", "indicator_id", "date"),
+        # One reading per collection run; NULLs (manual readings) never conflict
+        Index("uq_intraday_observations_indicator_run", "indicator_id", "previous_run_at", unique=True),
+        {"schema": "macro_indicators"},
+    )
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)  # collection day the reading belongs to
+    observed_at = Column(DateTime, nullable=False)  # UTC
+    previous_run_at = Column(DateTime, nullable=True)  # the schedule's last_run_at when the batch was claimed
+    value = Column(Float, nullable=False)
+
+
+class DailyBar(Base):
+    """Open/high/low/close of an indicator's intraday observations for one day"""
+    __tablename__ = "daily_bars"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)  # latest reading while the day is still running
+    observations = Column(Integer, nullable=False)
+    first_at = Column(DateTime, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+
+
+class IndicatorSnapshot(Base):
+    """Per-series summary of data_points, kept in step with every write (see app/snapshots.py)"""
+    __tablename__ = "indicator_snapshots"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), primary_key=True)
+    series_type = Column(String(50), primary_key=True)
+    latest_date = Column(Date, nullable=True)
+    latest_value = Column(Float, nullable=True)
+    previous_date = Column(Date, nullable=True)
+    previous_value = Column(Float, nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+    min_date = Column(Date, nullable=True)
+    max_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class DataStats(Base):
+    """Single-row running totals over data_points (see app/snapshots.py)"""
+    __tablename__ = "data_stats"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    id = Column(Integer, primary_key=True)
+    total_data_points = Column(Integer, nullable=False, default=0)
+    oldest_date = Column(Date, nullable=True)
+    newest_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ResourceRevision(Base):
+    """Version counter per cacheable resource tag, bumped on every write (see app/revisions.py)"""
+    __tablename__ = "resource_revisions"
+    __table_args__ = {"schema": "macro_indicators"}
     
-    class Config:
-        indexes = [
-            ("idx_indicator_date", "indicator_id", "date"),
-        ]
+    tag = Column(String(250), primary_key=True)  # e.g. "indicator:gold", "category:energy", "dashboard"
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class DashboardItem(Base):
+    """Indicators shown as cards on the home page dashboard, in display order"""
+    __tablename__ = "dashboard_items"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), unique=True, nullable=False)
+    display_order = Column(Integer, default=0)
+    
+    indicator = relationship("Indicator")
+
+
+class SelectorStat(Base):
+    """Hits and misses of each selector tried for an indicator (see app/selector_memory.py)"""
+    __tablename__ = "selector_stats"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), primary_key=True)
+    selector = Column(String(500), primary_key=True)
+    domain = Column(String(255), nullable=False, index=True)
+    hits = Column(Integer, nullable=False, default=0)
+    misses = Column(Integer, nullable=False, default=0)
+    consecutive_misses = Column(Integer, nullable=False, default=0)
+    last_hit_at = Column(DateTime, nullable=True)
+    last_miss_at = Column(DateTime, nullable=True)
+
+
+class CollectionSchedule(Base):
+    """When each scrapable indicator is next due for collection (see app/schedule.py)"""
+    __tablename__ = "collection_schedules"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    indicator_id = Column(Integer, ForeignKey("macro_indicators.indicators.id", ondelete="CASCADE"), primary_key=True)
+    spec = Column(String(100), nullable=True)  # cron or "every 6h"; NULL uses the default for the indicator's frequency
+    next_due_at = Column(DateTime, nullable=False, index=True)  # UTC
+    last_run_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_status = Column(String(20), nullable=True)  # collected, existing, failed
+    # Claim by a collector process; expires unless renewed (see app/schedule.py)
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+
+class Job(Base):
+    """Background admin job (CSV ingest, bulk collection); see app/jobs.py"""
+    __tablename__ = "jobs"
+    __table_args__ = {"schema": "macro_indicators"}
+    
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    params = Column(JSON, nullable=True)
+    progress = Column(JSON, nullable=True)  # {"done": n, "total": n, "results": [...]}
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 
 # Series type mappings for CSV files
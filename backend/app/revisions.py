@@ -0,0 +1,93 @@
+"""
+Per-resource revision counters behind ETag/Last-Modified and cache invalidation.
+
+Resources are identified by the same tags the response cache uses
+("indicator:<slug>", "category:<slug>", "indicators", "categories",
+"dashboard"). Writers call touch() inside their transaction; once it commits
+the tags are handed to the listeners registered with on_commit() (the
+response cache drops its entries for them).
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Category, Indicator, ResourceRevision
+
+_PENDING_KEY = "touched_revision_tags"
+_commit_listeners: List[Callable[[set], None]] = []
+
+
+def indicator_tags(slug: str, category_slug: Optional[str]) -> List[str]:
+    """Tags whose responses include an indicator's data"""
+    tags = [f"indicator:{slug}", "indicators", "dashboard"]
+    if category_slug:
+        tags.append(f"category:{category_slug}")
+    return tags
+
+
+def touch(db: Session, *tags: str) -> None:
+    """Bump the revision of `tags` in the current transaction (does not commit)"""
+    tags = sorted(set(tags))
+    if not tags:
+        return
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    for tag in tags:
+        stmt = insert(ResourceRevision).values(tag=tag, version=1, updated_at=now)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ResourceRevision.tag],
+            set_={"version": ResourceRevision.version + 1, "updated_at": now},
+        ))
+    db.info.setdefault(_PENDING_KEY, set()).update(tags)
+
+
+def touch_indicators(db: Session, indicator_ids: Iterable[int]) -> None:
+    """Bump every tag that depends on the given indicators' data"""
+    indicator_ids = list(indicator_ids)
+    if not indicator_ids:
+        return
+    rows = db.execute(
+        select(Indicator.slug, Category.slug)
+        .outerjoin(Category, Category.id == Indicator.category_id)
+        .where(Indicator.id.in_(indicator_ids))
+    ).all()
+    tags = set()
+    for slug, category_slug in rows:
+        tags.update(indicator_tags(slug, category_slug))
+    touch(db, *tags)
+
+
+def current(db: Session, tags: Iterable[str]) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """Versions of `tags` (0 when never written) and their latest change time"""
+    tags = list(tags)
+    rows = db.execute(select(ResourceRevision).where(ResourceRevision.tag.in_(tags))).scalars().all()
+    versions = {tag: 0 for tag in tags}
+    last_modified = None
+    for row in rows:
+        versions[row.tag] = row.version
+        if last_modified is None or row.updated_at > last_modified:
+            last_modified = row.updated_at
+    return versions, last_modified
+
+
+def on_commit(listener: Callable[[set], None]) -> None:
+    """Call `listener(tags)` after each commit that touched revisions"""
+    _commit_listeners.append(listener)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session):
+    tags = session.info.pop(_PENDING_KEY, None)
+    if tags:
+        for listener in _commit_listeners:
+            listener(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
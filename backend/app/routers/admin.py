@@ -1,17 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Form
-from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, select
 from typing import List, Optional
-from datetime import datetime, date
-import pandas as pd
-import io
-import requests
-from lxml import html
-import re
-from ..database import get_db
-from ..models import Category, Indicator, DataPoint
+from datetime import date
+import os
+import shutil
+import tempfile
+from ..database import get_db, SessionLocal
+from ..models import (
+    Category, Indicator, DataPoint, IndicatorSnapshot, DashboardItem, Job, SelectorStat, CollectionSchedule,
+    IntradayObservation, DailyBar,
+)
+from ..snapshots import refresh_snapshots, rebuild_snapshots, get_stats
+from ..cache import response_cache
+from ..revisions import touch, indicator_tags
+from ..ingest import ingest_csv_stream, CsvFormatError
+from ..jobs import enqueue, job_handler, serialize as serialize_job
+from ..collection import collect_all, save_collected, scrape_indicator
+from ..extractors import validate as validate_extractor
+from .. import csv_export, intraday, schedule
 from ..config import get_settings
+from .indicators import STANDARD_SERIES
 
 settings = get_settings()
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -26,6 +37,156 @@ def verify_admin_token(admin_token: str = Query(...)):
     return admin_token
 
 
+def touch_indicator_revisions(db: Session, *indicators: Indicator):
+    """Bump the revisions (ETags, cached responses) of pages showing these indicators"""
+    tags = set()
+    for indicator in indicators:
+        tags.update(indicator_tags(indicator.slug, indicator.category.slug if indicator.category else None))
+    touch(db, *tags)
+
+
+def check_extractor(extractor_type: str, expression: Optional[str]):
+    """400 unless the scrape expression is valid for the extractor type"""
+    try:
+        validate_extractor(extractor_type, expression or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ingest_upload(db: Session, indicator: Indicator, series_type: str, fileobj, new_indicator=False, on_progress=None):
+    """Stream a CSV into one series of an indicator and commit.
+
+    Each chunk updates the snapshots as it is written, so chunks committed
+    before a failure show up whatever the failure was. A new indicator is
+    removed again when its file fails before any row was saved.
+    """
+    indicator_id = indicator.id
+
+    def commit():
+        # A new indicator changes the listings even when no row was written
+        if new_indicator:
+            touch(db, "categories")
+            touch_indicator_revisions(db, indicator)
+        db.commit()
+
+    def discard_failed():
+        """Roll back the chunk that failed, and a new indicator left without data"""
+        db.rollback()
+        if not new_indicator:
+            return
+        saved = db.get(Indicator, indicator_id)
+        if saved is None:
+            # Never committed; the rollback removed it
+            return
+        if db.execute(select(DataPoint.id).where(DataPoint.indicator_id == indicator_id).limit(1)).first():
+            commit()
+            return
+        touch(db, "categories")
+        touch_indicator_revisions(db, saved)
+        db.query(CollectionSchedule).filter(CollectionSchedule.indicator_id == indicator_id).delete()
+        db.delete(saved)
+        db.commit()
+    
+    try:
+        ingest = ingest_csv_stream(db, indicator_id, series_type, fileobj, on_progress=on_progress)
+    except CsvFormatError as e:
+        if e.rows_saved:
+            commit()
+        else:
+            discard_failed()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        # Earlier chunks are committed and stay
+        discard_failed()
+        raise
+    
+    commit()
+    return ingest
+
+
+def _upload_result(indicator: Indicator, series_type: str, ingest) -> dict:
+    result = {
+        "message": "CSV uploaded successfully",
+        "indicator": indicator.name,
+        "added": ingest.added,
+        "updated": ingest.updated,
+        "chunks": ingest.chunks,
+        "series_type": series_type
+    }
+    
+    if ingest.total_errors:
+        result["errors"] = ingest.errors  # First 10 errors
+        result["total_errors"] = ingest.total_errors
+    
+    return result
+
+
+def _create_result(indicator: Indicator, series_type: str, ingest) -> dict:
+    result = {
+        "message": "Indicator created successfully with data",
+        "indicator": {
+            "id": indicator.id,
+            "name": indicator.name,
+            "slug": indicator.slug
+        },
+        "data_added": ingest.added,
+        "chunks": ingest.chunks,
+        "series_type": series_type
+    }
+    
+    if ingest.total_errors:
+        result["errors"] = ingest.errors  # First 10 errors
+        result["total_errors"] = ingest.total_errors
+    
+    return result
+
+
+def _spool_to_disk(fileobj) -> str:
+    """Copy an upload to a temp file that outlives the request"""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        fileobj.seek(0)
+        shutil.copyfileobj(fileobj, out)
+    return path
+
+
+def _job_accepted(job: Job, message: str, **extra) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "message": message,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/admin/jobs/{job.id}",
+        **extra,
+    })
+
+
+@job_handler("ingest_csv")
+def run_ingest_job(db: Session, params: dict, ctx):
+    """Background half of upload-csv / create-indicator-from-csv (progress in bytes)"""
+    try:
+        indicator = db.get(Indicator, params["indicator_id"])
+        if not indicator:
+            raise HTTPException(status_code=404, detail="Indicator not found")
+        
+        with open(params["path"], "rb") as fileobj:
+            ingest = _ingest_upload(
+                db, indicator, params["series_type"], fileobj, params.get("new_indicator", False),
+                on_progress=lambda rows, done, total: ctx.progress(done, total),
+            )
+    finally:
+        if os.path.exists(params["path"]):
+            os.remove(params["path"])
+    
+    build = _create_result if params.get("new_indicator") else _upload_result
+    return build(indicator, params["series_type"], ingest)
+
+
+@job_handler("collect_all")
+def run_collect_all_job(db: Session, params: dict, ctx):
+    """Background collect-all-data; progress counts indicators"""
+    return collect_all(db, on_progress=ctx.progress, due_only=params.get("due_only", False))
+
+
 @router.get("/stats")
 def get_admin_stats(
     db: Session = Depends(get_db),
@@ -35,7 +196,7 @@ def get_admin_stats(
     # Get total counts
     total_categories = db.query(func.count(Category.id)).scalar()
     total_indicators = db.query(func.count(Indicator.id)).scalar()
-    total_data_points = db.query(func.count(DataPoint.id)).scalar()
+    total_data_points = get_stats(db).total_data_points
     
     # Get all categories (return slugs for form usage)
     categories = db.query(Category.slug).all()
@@ -44,13 +205,13 @@ def get_admin_stats(
     # Get all indicators with details, ordered by display_order
     indicators = db.query(Indicator).order_by(Indicator.display_order, Indicator.id).all()
     
-    # Optimize: Get data point stats for all indicators in one query
+    # Data point stats for all indicators from the snapshot table
     data_stats = db.query(
-        DataPoint.indicator_id,
-        func.count(DataPoint.id).label('count'),
-        func.min(DataPoint.date).label('min_date'),
-        func.max(DataPoint.date).label('max_date')
-    ).group_by(DataPoint.indicator_id).all()
+        IndicatorSnapshot.indicator_id,
+        func.sum(IndicatorSnapshot.count).label('count'),
+        func.min(IndicatorSnapshot.min_date).label('min_date'),
+        func.max(IndicatorSnapshot.max_date).label('max_date')
+    ).group_by(IndicatorSnapshot.indicator_id).all()
     
     # Create a lookup dictionary for faster access
     stats_dict = {
@@ -97,9 +258,10 @@ async def upload_csv(
     file: UploadFile = File(...),
     series_type: str = Form("historical"),
     admin_token: str = Form(...),
+    background: bool = Form(False),
     db: Session = Depends(get_db)
 ):
-    """Upload CSV data for an existing indicator"""
+    """Upload CSV data for an existing indicator (as a background job with background=true)"""
     # Verify admin token
     if admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -109,133 +271,66 @@ async def upload_csv(
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    # Read the CSV file
-    contents = await file.read()
-    try:
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error reading CSV: {str(e)}")
-    
-    # Validate required columns
-    if 'date' not in df.columns or 'value' not in df.columns:
-        raise HTTPException(
-            status_code=400,
-            detail="CSV must contain 'date' and 'value' columns"
-        )
-    
-    # Process and insert data
-    added_count = 0
-    updated_count = 0
-    errors = []
-    
-    for idx, row in df.iterrows():
-        try:
-            # Parse date - support multiple formats: yyyy-mm-dd, yyyy-mm, yyyy
-            date_str = str(row['date']).strip()
-            
-            # Handle numeric years (pandas may read as float like 1960.0)
-            if '.' in date_str and date_str.replace('.', '').replace('-', '').isdigit():
-                # Remove decimal part if present (e.g., "1960.0" -> "1960")
-                date_str = date_str.split('.')[0]
-            
-            # Try to parse different date formats
-            if len(date_str) == 4 and date_str.isdigit():
-                # Format: yyyy (e.g., "2024")
-                date_obj = datetime.strptime(date_str, '%Y').date()
-            elif len(date_str) == 7 and date_str[4] == '-':
-                # Format: yyyy-mm (e.g., "2024-01")
-                date_obj = datetime.strptime(date_str, '%Y-%m').date()
-            else:
-                # Format: yyyy-mm-dd or other pandas-parseable format
-                date_obj = pd.to_datetime(date_str).date()
-            
-            value = float(row['value'])
-            
-            # Check if data point already exists
-            existing = db.query(DataPoint).filter(
-                and_(
-                    DataPoint.indicator_id == indicator.id,
-                    DataPoint.date == date_obj,
-                    DataPoint.series_type == series_type
-                )
-            ).first()
-            
-            if existing:
-                existing.value = value
-                updated_count += 1
-            else:
-                data_point = DataPoint(
-                    indicator_id=indicator.id,
-                    date=date_obj,
-                    value=value,
-                    series_type=series_type
-                )
-                db.add(data_point)
-                added_count += 1
-        except Exception as e:
-            # Log error but continue processing
-            errors.append(f"Row {idx}: {str(e)}")
-            continue
-    
-    db.commit()
+    if background:
+        path = await run_in_threadpool(_spool_to_disk, file.file)
+        job = enqueue(db, "ingest_csv", {"indicator_id": indicator.id, "series_type": series_type, "path": path})
+        return _job_accepted(job, "CSV upload queued", indicator=indicator.name, series_type=series_type)
     
-    result = {
-        "message": "CSV uploaded successfully",
-        "indicator": indicator.name,
-        "added": added_count,
-        "updated": updated_count,
-        "series_type": series_type
-    }
-    
-    if errors:
-        result["errors"] = errors[:10]  # Return first 10 errors
-        result["total_errors"] = len(errors)
-    
-    return result
+    # Stream the upload in fixed-size chunks, committing each as it is written
+    ingest = await run_in_threadpool(_ingest_upload, db, indicator, series_type, file.file)
+    return _upload_result(indicator, series_type, ingest)
 
 
 @router.get("/download-csv/{indicator_slug}")
 def download_indicator_data(
     indicator_slug: str,
     series_type: str = Query("historical"),
+    wide: bool = Query(False, description="Every series type as a column, one row per date"),
     admin_token: str = Depends(verify_admin_token),
     db: Session = Depends(get_db)
 ):
-    """Download all data for an indicator as CSV"""
+    """Download all data for an indicator as CSV, streamed from the database in batches"""
     # Find the indicator
     indicator = db.query(Indicator).filter(Indicator.slug == indicator_slug).first()
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    # Get all data points for the indicator
-    data_points = db.query(DataPoint).filter(
-        and_(
-            DataPoint.indicator_id == indicator.id,
-            DataPoint.series_type == series_type
+    if wide:
+        found = db.execute(
+            select(DataPoint.series_type).where(DataPoint.indicator_id == indicator.id).distinct()
+        ).scalars().all()
+        # Standard series types first, in their usual order, then any custom ones
+        columns = [t for t in STANDARD_SERIES if t in found] + sorted(t for t in found if t not in STANDARD_SERIES)
+        header = ["date", *columns]
+        stmt = (
+            select(DataPoint.date, DataPoint.series_type, DataPoint.value)
+            .where(DataPoint.indicator_id == indicator.id)
+            .order_by(DataPoint.date, DataPoint.series_type)
         )
-    ).order_by(DataPoint.date).all()
+        filename = f"{indicator_slug}_all_series.csv"
+    else:
+        filters = (DataPoint.indicator_id == indicator.id, DataPoint.series_type == series_type)
+        found = db.execute(select(DataPoint.date).where(*filters).limit(1)).first()
+        header = ["date", "value"]
+        stmt = select(DataPoint.date, DataPoint.value).where(*filters).order_by(DataPoint.date)
+        filename = f"{indicator_slug}_{series_type}.csv"
     
-    if not data_points:
+    if not found:
         raise HTTPException(status_code=404, detail="No data found for this indicator")
     
-    # Create DataFrame
-    df = pd.DataFrame([
-        {
-            "date": dp.date.strftime('%Y-%m-%d'),
-            "value": dp.value
-        }
-        for dp in data_points
-    ])
+    stmt = stmt.execution_options(yield_per=csv_export.CSV_BATCH_ROWS)
     
-    # Convert to CSV
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
+    def rows():
+        # The streaming body outlives the request-scoped session, so use its own
+        stream_db = SessionLocal()
+        try:
+            result = stream_db.execute(stmt)
+            yield from csv_export.pivot(result, columns) if wide else result
+        finally:
+            stream_db.close()
     
-    # Return as downloadable file
-    filename = f"{indicator_slug}_{series_type}.csv"
     return StreamingResponse(
-        io.BytesIO(csv_buffer.getvalue().encode()),
+        csv_export.encode(header, rows()),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -252,15 +347,20 @@ async def create_indicator_from_csv(
     frequency: str = Form("daily"),
     scrape_url: str = Form(""),
     html_selector: str = Form(""),
+    extractor_type: str = Form("css"),
     series_type: str = Form("historical"),
     admin_token: str = Form(...),
+    background: bool = Form(False),
     db: Session = Depends(get_db)
 ):
-    """Create a new indicator and upload initial CSV data"""
+    """Create a new indicator and upload initial CSV data (in the background with background=true)"""
     # Verify admin token
     if admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
     
+    if html_selector:
+        check_extractor(extractor_type, html_selector)
+    
     # Check if slug already exists
     existing = db.query(Indicator).filter(Indicator.slug == slug).first()
     if existing:
@@ -285,86 +385,30 @@ async def create_indicator_from_csv(
         unit=unit,
         frequency=frequency,
         scrape_url=scrape_url,
-        html_selector=html_selector
+        html_selector=html_selector,
+        extractor_type=extractor_type
     )
     db.add(indicator)
     db.flush()
     
-    # Read and process the CSV file
-    contents = await file.read()
-    try:
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=f"Error reading CSV: {str(e)}")
-    
-    # Validate required columns
-    if 'date' not in df.columns or 'value' not in df.columns:
-        db.rollback()
-        raise HTTPException(
-            status_code=400,
-            detail="CSV must contain 'date' and 'value' columns"
-        )
-    
-    # Process and insert data
-    added_count = 0
-    errors = []
-    
-    for idx, row in df.iterrows():
-        try:
-            # Parse date - support multiple formats: yyyy-mm-dd, yyyy-mm, yyyy
-            date_str = str(row['date']).strip()
-            
-            # Handle numeric years (pandas may read as float like 1960.0)
-            if '.' in date_str and date_str.replace('.', '').replace('-', '').isdigit():
-                # Remove decimal part if present (e.g., "1960.0" -> "1960")
-                date_str = date_str.split('.')[0]
-            
-            # Try to parse different date formats
-            if len(date_str) == 4 and date_str.isdigit():
-                # Format: yyyy (e.g., "2024")
-                date_obj = datetime.strptime(date_str, '%Y').date()
-            elif len(date_str) == 7 and date_str[4] == '-':
-                # Format: yyyy-mm (e.g., "2024-01")
-                date_obj = datetime.strptime(date_str, '%Y-%m').date()
-            else:
-                # Format: yyyy-mm-dd or other pandas-parseable format
-                date_obj = pd.to_datetime(date_str).date()
-            
-            value = float(row['value'])
-            
-            data_point = DataPoint(
-                indicator_id=indicator.id,
-                date=date_obj,
-                value=value,
-                series_type=series_type
-            )
-            db.add(data_point)
-            added_count += 1
-        except Exception as e:
-            # Log error but continue processing
-            errors.append(f"Row {idx}: {str(e)}")
-            continue
-    
-    db.commit()
-    db.refresh(indicator)
-    
-    result = {
-        "message": "Indicator created successfully with data",
-        "indicator": {
+    if background:
+        path = await run_in_threadpool(_spool_to_disk, file.file)
+        touch(db, "categories")
+        touch_indicator_revisions(db, indicator)
+        job = enqueue(db, "ingest_csv", {
+            "indicator_id": indicator.id, "series_type": series_type, "path": path, "new_indicator": True,
+        })
+        return _job_accepted(job, "Indicator created; CSV import queued", indicator={
             "id": indicator.id,
             "name": indicator.name,
             "slug": indicator.slug
-        },
-        "data_added": added_count,
-        "series_type": series_type
-    }
-    
-    if errors:
-        result["errors"] = errors[:10]  # Return first 10 errors
-        result["total_errors"] = len(errors)
+        }, series_type=series_type)
     
-    return result
+    # Stream the upload in fixed-size chunks; the indicator row is committed
+    # with the first chunk
+    ingest = await run_in_threadpool(_ingest_upload, db, indicator, series_type, file.file, True)
+    db.refresh(indicator)
+    return _create_result(indicator, series_type, ingest)
 
 
 @router.delete("/indicators/{indicator_slug}")
@@ -378,8 +422,14 @@ def delete_indicator(
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    # Delete all data points first
+    # Delete all data points first; refreshing drops the snapshot and updates the totals
     db.query(DataPoint).filter(DataPoint.indicator_id == indicator.id).delete()
+    refresh_snapshots(db, [indicator.id])
+    db.query(DashboardItem).filter(DashboardItem.indicator_id == indicator.id).delete()
+    db.query(SelectorStat).filter(SelectorStat.indicator_id == indicator.id).delete()
+    db.query(CollectionSchedule).filter(CollectionSchedule.indicator_id == indicator.id).delete()
+    db.query(IntradayObservation).filter(IntradayObservation.indicator_id == indicator.id).delete()
+    db.query(DailyBar).filter(DailyBar.indicator_id == indicator.id).delete()
     
     # Delete the indicator
     db.delete(indicator)
@@ -398,6 +448,7 @@ def update_indicator(
     source: str = Query(None),
     scrape_url: str = Query(None),
     html_selector: str = Query(None),
+    extractor_type: str = Query(None),
     admin_token: str = Depends(verify_admin_token),
     db: Session = Depends(get_db)
 ):
@@ -406,6 +457,9 @@ def update_indicator(
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
+    if extractor_type or html_selector:
+        check_extractor(extractor_type or indicator.extractor_type, html_selector or indicator.html_selector)
+    
     # Update fields if provided
     if name:
         indicator.name = name
@@ -421,7 +475,10 @@ def update_indicator(
         indicator.scrape_url = scrape_url
     if html_selector:
         indicator.html_selector = html_selector
+    if extractor_type:
+        indicator.extractor_type = extractor_type
     
+    touch_indicator_revisions(db, indicator)
     db.commit()
     db.refresh(indicator)
     
@@ -435,7 +492,8 @@ def update_indicator(
             "unit": indicator.unit,
             "frequency": indicator.frequency,
             "scrape_url": indicator.scrape_url,
-            "html_selector": indicator.html_selector
+            "html_selector": indicator.html_selector,
+            "extractor_type": indicator.extractor_type
         }
     }
 
@@ -448,80 +506,41 @@ def collect_daily_data(
 ):
     """Manually trigger daily data collection for an indicator"""
     
-    def scrape_live_value(url, selector):
-        """Scrape live value from URL using CSS selector"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:147.0) Gecko/20100101 Firefox/147.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Connection': 'keep-alive',
-        }
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            # Parse HTML
-            tree = html.fromstring(response.content)
-            elements = tree.cssselect(selector)
-            
-            if elements:
-                value_text = elements[0].text_content().strip()
-                numbers = re.findall(r'[\d,]+\.?\d*', value_text)
-                if numbers:
-                    return float(numbers[0].replace(',', ''))
-            
-            return None
-        except:
-            return None
-    
     # Find the indicator
     indicator = db.query(Indicator).filter(Indicator.slug == indicator_slug).first()
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    # Get scraping configuration
-    scrape_url = indicator.scrape_url
-    html_selector = indicator.html_selector
-    
-    if not scrape_url or not html_selector:
+    if not indicator.scrape_url or not indicator.html_selector:
         raise HTTPException(status_code=400, detail="Indicator has no scraping configuration")
     
     # Try to scrape live value
-    live_value = scrape_live_value(scrape_url, html_selector)
+    outcome = scrape_indicator(db, indicator)
+    live_value = outcome.value
     
     if live_value is None:
-        raise HTTPException(status_code=400, detail="Failed to scrape data from source")
+        db.commit()  # keep the selector statistics
+        raise HTTPException(status_code=400, detail=f"Failed to scrape data from source: {outcome.error}")
     
-    # Check if data for today already exists
+    # Saved like a scheduled reading, so the day's bar and historical point include it
     today = date.today()
-    existing = db.query(DataPoint).filter(
+    existing = db.query(DataPoint.id).filter(
         DataPoint.indicator_id == indicator.id,
         DataPoint.date == today,
         DataPoint.series_type == 'historical'
     ).first()
+    action = "updated" if existing else "created"
     
-    if existing:
-        existing.value = live_value
-        action = "updated"
-    else:
-        new_data_point = DataPoint(
-            indicator_id=indicator.id,
-            series_type='historical',
-            date=today,
-            value=live_value
-        )
-        db.add(new_data_point)
-        action = "created"
-    
+    daily = save_collected(db, {indicator.id: live_value}, today)
     db.commit()
     
     return {
         "message": f"Successfully {action} daily data",
         "indicator": indicator.name,
         "date": today.isoformat(),
-        "value": live_value,
-        "scraped_from": scrape_url,
+        "value": daily[indicator.id],
+        "reading": live_value,
+        "scraped_from": indicator.scrape_url,
         "action": action
     }
 
@@ -531,25 +550,58 @@ def configure_indicator_scraping(
     indicator_slug: str,
     scrape_url: str = Query(...),
     html_selector: str = Query(...),
+    extractor_type: str = Query("css"),
     admin_token: str = Depends(verify_admin_token),
     db: Session = Depends(get_db)
 ):
-    """Configure scraping URL and selector for an indicator"""
+    """Configure scraping URL, extractor type and expression for an indicator"""
     
     indicator = db.query(Indicator).filter(Indicator.slug == indicator_slug).first()
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
+    check_extractor(extractor_type, html_selector)
     indicator.scrape_url = scrape_url
     indicator.html_selector = html_selector
+    indicator.extractor_type = extractor_type
     
+    touch_indicator_revisions(db, indicator)
     db.commit()
     
     return {
         "message": "Scraping configuration updated successfully",
         "indicator": indicator.name,
         "scrape_url": scrape_url,
-        "html_selector": html_selector
+        "html_selector": html_selector,
+        "extractor_type": extractor_type
+    }
+
+
+@router.get("/cache-stats")
+def get_cache_stats(admin_token: str = Depends(verify_admin_token)):
+    """Get hit/miss counters of the in-process response cache"""
+    return response_cache.stats()
+
+
+@router.post("/cache-clear")
+def clear_cache(admin_token: str = Depends(verify_admin_token)):
+    """Drop every cached public response in this process"""
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
+
+
+@router.post("/rebuild-snapshots")
+def rebuild_indicator_snapshots(
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Recompute the latest-value snapshots and summary totals from data_points"""
+    processed = rebuild_snapshots(db)
+    db.commit()
+    
+    return {
+        "message": "Snapshots rebuilt successfully",
+        "indicators_processed": processed
     }
 
 
@@ -564,11 +616,14 @@ def reorder_indicators(
     Expected format: [{"slug": "indicator-slug", "display_order": 0}, ...]
     """
     try:
+        reordered = []
         for item in indicator_orders:
             indicator = db.query(Indicator).filter(Indicator.slug == item['slug']).first()
             if indicator:
                 indicator.display_order = item['display_order']
+                reordered.append(indicator)
         
+        touch_indicator_revisions(db, *reordered)
         db.commit()
         
         return {
@@ -580,6 +635,54 @@ def reorder_indicators(
         raise HTTPException(status_code=400, detail=f"Error updating order: {str(e)}")
 
 
+@router.get("/dashboard-indicators")
+def get_dashboard_indicators(
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Get the indicators configured for the home page dashboard, in display order"""
+    items = db.query(DashboardItem).order_by(DashboardItem.display_order, DashboardItem.id).all()
+    
+    return {
+        "configured": len(items) > 0,
+        "slugs": [item.indicator.slug for item in items]
+    }
+
+
+@router.put("/dashboard-indicators")
+def set_dashboard_indicators(
+    slugs: List[str],
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Replace the dashboard indicator list
+    
+    Expected format: ["sp500", "gold", ...] in display order. An empty list
+    restores the built-in default selection.
+    """
+    if len(set(slugs)) != len(slugs):
+        raise HTTPException(status_code=400, detail="Duplicate slugs in dashboard list")
+    
+    indicators = db.query(Indicator).filter(Indicator.slug.in_(slugs)).all() if slugs else []
+    by_slug = {indicator.slug: indicator for indicator in indicators}
+    missing = [slug for slug in slugs if slug not in by_slug]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown indicators: {', '.join(missing)}")
+    
+    db.query(DashboardItem).delete()
+    db.add_all([
+        DashboardItem(indicator_id=by_slug[slug].id, display_order=position)
+        for position, slug in enumerate(slugs)
+    ])
+    touch(db, "dashboard")
+    db.commit()
+    
+    return {
+        "message": "Dashboard indicators updated successfully",
+        "slugs": slugs
+    }
+
+
 @router.get("/indicators-with-scraping")
 def get_indicators_with_scraping(
     admin_token: str = Depends(verify_admin_token),
@@ -600,6 +703,7 @@ def get_indicators_with_scraping(
             "slug": indicator.slug,
             "scrape_url": indicator.scrape_url,
             "html_selector": indicator.html_selector,
+            "extractor_type": indicator.extractor_type,
             "unit": indicator.unit,
             "frequency": indicator.frequency
         })
@@ -612,127 +716,89 @@ def get_indicators_with_scraping(
 
 @router.post("/collect-all-data")
 def collect_all_indicators_data(
+    background: bool = Query(False),
+    due_only: bool = Query(False),
     admin_token: str = Depends(verify_admin_token),
     db: Session = Depends(get_db)
 ):
-    """Manually trigger data collection for all indicators with scrape configurations"""
-    
-    def scrape_live_value(url, selector):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:147.0) Gecko/20100101 Firefox/147.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Connection': 'keep-alive',
-        }
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            tree = html.fromstring(response.content)
-            elements = tree.cssselect(selector)
-            
-            if elements:
-                value_text = elements[0].text_content().strip()
-                numbers = re.findall(r'[\d,]+\.?\d*', value_text)
-                if numbers:
-                    return float(numbers[0].replace(',', ''))
-            return None
-        except:
-            return None
-    
-    # Get all indicators with scraping configuration
-    configured_indicators = db.query(Indicator).filter(
-        Indicator.scrape_url.isnot(None),
-        Indicator.html_selector.isnot(None)
-    ).all()
-    
-    # Also include indicators that have recent data (for continuation)
-    all_indicators = db.query(Indicator).all()
-    active_indicators = []
-    
-    for indicator in all_indicators:
-        has_scrape_config = indicator.scrape_url and indicator.html_selector
-        has_recent_data = db.query(DataPoint).filter(
-            DataPoint.indicator_id == indicator.id
-        ).first() is not None
-        
-        if has_scrape_config or has_recent_data:
-            active_indicators.append(indicator)
-    
-    results = []
-    successful = 0
-    failed = 0
-    today = date.today()
+    """Manually trigger data collection for all indicators with scrape configurations.
+
+    With due_only, only indicators whose collection schedule is due are scraped.
+    """
+    if background:
+        job = enqueue(db, "collect_all", {"due_only": due_only})
+        return _job_accepted(job, "Bulk data collection queued")
     
-    for indicator in active_indicators:
-        try:
-            # Check if data already exists for today
-            existing = db.query(DataPoint).filter(
-                DataPoint.indicator_id == indicator.id,
-                DataPoint.date == today,
-                DataPoint.series_type == 'historical'
-            ).first()
-            
-            if existing:
-                results.append({
-                    "indicator": indicator.name,
-                    "value": existing.value,
-                    "status": "existing",
-                    "date": today.isoformat()
-                })
-                successful += 1
-                continue
-            
-            # Try scraping
-            scraped_value = None
-            if indicator.scrape_url and indicator.html_selector:
-                scraped_value = scrape_live_value(indicator.scrape_url, indicator.html_selector)
-            
-            if scraped_value is None:
-                results.append({
-                    "indicator": indicator.name,
-                    "status": "failed",
-                    "error": "Failed to scrape data from source",
-                    "date": today.isoformat()
-                })
-                failed += 1
-                continue
-            
-            # Insert new data point
-            new_data_point = DataPoint(
-                indicator_id=indicator.id,
-                series_type='historical',
-                date=today,
-                value=scraped_value
-            )
-            db.add(new_data_point)
-            
-            results.append({
-                "indicator": indicator.name,
-                "value": scraped_value,
-                "status": "collected",
-                "date": today.isoformat()
-            })
-            successful += 1
-            
-        except Exception as e:
-            results.append({
-                "indicator": indicator.name,
-                "status": "failed",
-                "error": str(e),
-                "date": today.isoformat()
-            })
-            failed += 1
+    return collect_all(db, due_only=due_only)
+
+
+@router.post("/intraday-rollup")
+def rollup_intraday_observations(
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Reduce intraday readings older than the retention window to daily bars"""
+    summary = intraday.rollup(db)
+    db.commit()
+    return {"message": "Intraday readings rolled up", **summary}
+
+
+@router.get("/collection-schedule")
+def get_collection_schedule(
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Next due time and last run of every indicator with scraping configured"""
+    return {
+        "timezone": settings.schedule_timezone or "server local time",
+        "defaults": schedule.DEFAULT_SPECS,
+        "indicators": schedule.describe(db),
+    }
+
+
+@router.put("/indicators/{indicator_slug}/schedule")
+def set_indicator_schedule(
+    indicator_slug: str,
+    spec: str = Query("", description="Cron expression or 'every <n>m|h|d'; empty restores the frequency default"),
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Give an indicator its own collection schedule"""
+    indicator = db.query(Indicator).filter(Indicator.slug == indicator_slug).first()
+    if not indicator:
+        raise HTTPException(status_code=404, detail="Indicator not found")
     
+    try:
+        schedule.set_spec(db, indicator, spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     db.commit()
     
     return {
-        "message": "Bulk data collection completed",
-        "date": today.isoformat(),
-        "summary": {
-            "total_processed": len(active_indicators),
-            "successful": successful,
-            "failed": failed
-        },
-        "results": results
+        "message": "Collection schedule updated successfully",
+        **schedule.describe(db, [indicator.id])[0]
     }
+
+
+@router.get("/jobs")
+def list_jobs(
+    limit: int = Query(20, ge=1, le=200),
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Most recent background jobs, newest first"""
+    jobs = db.query(Job).order_by(Job.created_at.desc()).limit(limit).all()
+    return [serialize_job(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: str,
+    admin_token: str = Depends(verify_admin_token),
+    db: Session = Depends(get_db)
+):
+    """Status, progress, per-item results and errors of a background job"""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
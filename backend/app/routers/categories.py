@@ -1,22 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List
 from ..database import get_db
-from ..models import Category, Indicator, DataPoint
+from ..models import Category, Indicator
 from ..schemas import CategoryResponse, CategoryWithIndicators, IndicatorSummary
+from ..summaries import latest_values, LatestValues
+from ..cache import CachedRoute, cached
 
-router = APIRouter(prefix="/api/categories", tags=["categories"])
+router = APIRouter(prefix="/api/categories", tags=["categories"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[CategoryResponse])
 @router.get("/", response_model=List[CategoryResponse], include_in_schema=False)
+@cached(lambda params: ["categories"])
 def get_categories(db: Session = Depends(get_db)):
     categories = db.query(Category).order_by(Category.display_order).all()
     return categories
 
 
 @router.get("/{slug}", response_model=CategoryWithIndicators)
+@cached(lambda params: [f"category:{params['slug']}"])
 def get_category(slug: str, db: Session = Depends(get_db)):
     category = db.query(Category).filter(Category.slug == slug).first()
     if not category:
@@ -27,29 +30,21 @@ def get_category(slug: str, db: Session = Depends(get_db)):
         Indicator.category_id == category.id
     ).order_by(Indicator.display_order, Indicator.id).all()
     
+    # Latest/previous for every indicator in one query instead of two per indicator
+    summaries = latest_values(db, [indicator.id for indicator in ordered_indicators])
+    
     indicators_with_summary = []
     for indicator in ordered_indicators:
-        latest = db.query(DataPoint).filter(
-            DataPoint.indicator_id == indicator.id
-        ).order_by(DataPoint.date.desc()).first()
-        
-        previous = db.query(DataPoint).filter(
-            DataPoint.indicator_id == indicator.id
-        ).order_by(DataPoint.date.desc()).offset(1).first()
-        
-        change_percent = None
-        if latest and previous and previous.value != 0:
-            change_percent = round(((latest.value - previous.value) / abs(previous.value)) * 100, 2)
-        
+        summary = summaries.get(indicator.id, LatestValues())
         indicators_with_summary.append(IndicatorSummary(
             id=indicator.id,
             name=indicator.name,
             slug=indicator.slug,
             unit=indicator.unit,
-            latest_value=latest.value if latest else None,
-            latest_date=latest.date if latest else None,
-            previous_value=previous.value if previous else None,
-            change_percent=change_percent
+            latest_value=summary.latest_value,
+            latest_date=summary.latest_date,
+            previous_value=summary.previous_value,
+            change_percent=summary.change_percent
         ))
     
     return CategoryWithIndicators(
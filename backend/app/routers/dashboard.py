@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, select, case, exists, or_, and_, true
+from itertools import groupby
 from typing import List
 from ..database import get_db
-from ..models import Category, Indicator, DataPoint
+from ..models import Category, Indicator, DataPoint, DashboardItem
 from ..schemas import DashboardIndicator
+from ..snapshots import get_stats
+from ..cache import CachedRoute, cached
 
-router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"], route_class=CachedRoute)
 
-# Key indicators to show on dashboard
-DASHBOARD_INDICATORS = [
+# Indicators shown until an admin configures the dashboard_items table
+DEFAULT_DASHBOARD_INDICATORS = [
     "sp500",
     "dow-jones",
     "gold",
@@ -22,26 +25,75 @@ DASHBOARD_INDICATORS = [
     "debt-gdp",
 ]
 
+SPARKLINE_POINTS = 12
+
+
+def _dashboard_query(dialect_name: str):
+    """One statement returning up to SPARKLINE_POINTS rows (newest first) per dashboard card"""
+    configured = aliased(DashboardItem)
+    default_position = case(
+        {slug: position for position, slug in enumerate(DEFAULT_DASHBOARD_INDICATORS)},
+        value=Indicator.slug,
+    )
+    cards = (
+        select(
+            Indicator.id,
+            Indicator.name,
+            Indicator.slug,
+            Indicator.unit,
+            Category.slug.label("category_slug"),
+            func.coalesce(DashboardItem.display_order, default_position).label("position"),
+        )
+        .join(Category, Category.id == Indicator.category_id)
+        .outerjoin(DashboardItem, DashboardItem.indicator_id == Indicator.id)
+        .where(or_(
+            DashboardItem.id.isnot(None),
+            and_(~exists(select(configured.id)), Indicator.slug.in_(DEFAULT_DASHBOARD_INDICATORS)),
+        ))
+        .cte("cards")
+    )
+    
+    if dialect_name == "postgresql":
+        # Index seek per card: latest N historical points
+        points = (
+            select(DataPoint.date, DataPoint.value)
+            .where(DataPoint.indicator_id == cards.c.id, DataPoint.series_type == "historical")
+            .order_by(DataPoint.date.desc())
+            .limit(SPARKLINE_POINTS)
+            .lateral("points")
+        )
+        stmt = select(cards, points.c.date, points.c.value).join(points, true())
+    else:
+        points = select(
+            DataPoint.indicator_id,
+            DataPoint.date,
+            DataPoint.value,
+            func.row_number().over(
+                partition_by=DataPoint.indicator_id,
+                order_by=DataPoint.date.desc(),
+            ).label("rn"),
+        ).where(
+            DataPoint.series_type == "historical",
+            DataPoint.indicator_id.in_(select(cards.c.id)),
+        ).subquery("points")
+        stmt = (
+            select(cards, points.c.date, points.c.value)
+            .join(points, points.c.indicator_id == cards.c.id)
+            .where(points.c.rn <= SPARKLINE_POINTS)
+        )
+    
+    return stmt.order_by(cards.c.position, cards.c.id, points.c.date.desc())
+
 
 @router.get("", response_model=List[DashboardIndicator])
 @router.get("/", response_model=List[DashboardIndicator], include_in_schema=False)
+@cached(lambda params: ["dashboard"])
 def get_dashboard(db: Session = Depends(get_db)):
-    results = []
+    rows = db.execute(_dashboard_query(db.get_bind().dialect.name)).all()
     
-    for slug in DASHBOARD_INDICATORS:
-        indicator = db.query(Indicator).filter(Indicator.slug == slug).first()
-        if not indicator:
-            continue
-        
-        # Get latest 12 data points for sparkline (historical series only)
-        data_points = db.query(DataPoint).filter(
-            DataPoint.indicator_id == indicator.id,
-            DataPoint.series_type == "historical"
-        ).order_by(DataPoint.date.desc()).limit(12).all()
-        
-        if not data_points:
-            continue
-        
+    results = []
+    for _, card_rows in groupby(rows, key=lambda row: row.id):
+        data_points = list(card_rows)
         latest = data_points[0]
         previous = data_points[1] if len(data_points) > 1 else None
         
@@ -52,11 +104,11 @@ def get_dashboard(db: Session = Depends(get_db)):
         sparkline = [dp.value for dp in reversed(data_points)]
         
         results.append(DashboardIndicator(
-            id=indicator.id,
-            name=indicator.name,
-            slug=indicator.slug,
-            category_slug=indicator.category.slug,
-            unit=indicator.unit,
+            id=latest.id,
+            name=latest.name,
+            slug=latest.slug,
+            category_slug=latest.category_slug,
+            unit=latest.unit,
             latest_value=latest.value,
             latest_date=latest.date,
             change_percent=change_percent,
@@ -67,21 +119,21 @@ def get_dashboard(db: Session = Depends(get_db)):
 
 
 @router.get("/summary")
+@cached(lambda params: ["dashboard"])
 def get_summary(db: Session = Depends(get_db)):
     """Get overall summary statistics"""
+    # Point totals come from the incrementally maintained data_stats row;
+    # indicators and categories are small enough to count directly
+    stats = get_stats(db)
     total_indicators = db.query(func.count(Indicator.id)).scalar()
-    total_data_points = db.query(func.count(DataPoint.id)).scalar()
     total_categories = db.query(func.count(Category.id)).scalar()
     
-    oldest_date = db.query(func.min(DataPoint.date)).scalar()
-    newest_date = db.query(func.max(DataPoint.date)).scalar()
-    
     return {
         "total_indicators": total_indicators,
-        "total_data_points": total_data_points,
+        "total_data_points": stats.total_data_points,
         "total_categories": total_categories,
         "data_range": {
-            "oldest": oldest_date,
-            "newest": newest_date
+            "oldest": stats.oldest_date,
+            "newest": stats.newest_date
         }
     }
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import List, Optional
+from datetime import date
+from ..database import get_db, SessionLocal
+from ..models import Indicator, DataPoint
+from .. import arrow_export
+
+# Rows fetched from the cursor per Arrow record batch
+EXPORT_BATCH_ROWS = 50000
+
+# Outside /api/indicators so no path can shadow an indicator slug
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+
+@router.get("/indicators")
+def export_indicators(
+    slugs: List[str] = Query(..., description="Indicator slugs to export"),
+    series: Optional[List[str]] = Query(default=None, description="Only export these series types"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    accept: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db)
+):
+    """Export several indicators as one Arrow stream (default) or Parquet file.
+
+    Rows are read from the database in batches and written out as record
+    batches while the response streams.
+    """
+    media_type = arrow_export.negotiate(accept) or arrow_export.ARROW_STREAM
+    
+    found = db.execute(select(Indicator.slug).where(Indicator.slug.in_(slugs))).scalars().all()
+    missing = sorted(set(slugs) - set(found))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Indicators not found: {', '.join(missing)}")
+    
+    filters = [Indicator.slug.in_(slugs)]
+    if series:
+        filters.append(DataPoint.series_type.in_(series))
+    if start_date:
+        filters.append(DataPoint.date >= start_date)
+    if end_date:
+        filters.append(DataPoint.date <= end_date)
+    
+    stmt = (
+        select(Indicator.slug, DataPoint.series_type, DataPoint.date, DataPoint.value)
+        .join(Indicator, Indicator.id == DataPoint.indicator_id)
+        .where(*filters)
+        .order_by(Indicator.slug, DataPoint.series_type, DataPoint.date)
+        .execution_options(yield_per=EXPORT_BATCH_ROWS)
+    )
+    
+    def partitions():
+        # The streaming body outlives the request-scoped session, so use its own
+        stream_db = SessionLocal()
+        try:
+            yield from stream_db.execute(stmt).partitions()
+        finally:
+            stream_db.close()
+    
+    extension = "parquet" if media_type == arrow_export.PARQUET else "arrows"
+    return StreamingResponse(
+        arrow_export.stream_batches(partitions(), media_type),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=indicators.{extension}"}
+    )
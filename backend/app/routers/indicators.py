@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from typing import List, Optional
 from datetime import date, timedelta
 from ..database import get_db
 from ..models import Indicator, DataPoint, Category
 from ..schemas import IndicatorResponse, IndicatorWithData, DataPointBase, DataSeries
+from ..downsample import downsample_indices, DOWNSAMPLE_METHODS
+from .. import arrow_export
+from ..summaries import latest_values, LatestValues
+from ..cache import CachedRoute, cached
 
 # Series type labels for display
 SERIES_LABELS = {
@@ -15,11 +20,114 @@ SERIES_LABELS = {
     "annual_average": "Annual Average",
 }
 
-router = APIRouter(prefix="/api/indicators", tags=["indicators"])
+STANDARD_SERIES = ["historical", "inflation_adjusted", "annual_change", "annual_average"]
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+router = APIRouter(prefix="/api/indicators", tags=["indicators"], route_class=CachedRoute)
+
+
+def _series_label(series_type: str) -> str:
+    return SERIES_LABELS.get(series_type, series_type.replace("_", " ").title())
+
+
+def _columnar_payload(indicator: Indicator, ordered_types: List[str], selected: dict) -> dict:
+    """Build the format=columnar body as plain dicts/lists (no per-point Pydantic objects).
+
+    Each series carries parallel arrays: `dates` as days since 1970-01-01 and `values`.
+    The historical series is not duplicated into `data_points`.
+    """
+    series_list = []
+    for series_type in ordered_types:
+        rows = selected[series_type]
+        series_list.append({
+            "series_type": series_type,
+            "label": _series_label(series_type),
+            "dates": [row.date.toordinal() - EPOCH_ORDINAL for row in rows],
+            "values": [row.value for row in rows],
+        })
+    
+    return {
+        "id": indicator.id,
+        "name": indicator.name,
+        "slug": indicator.slug,
+        "description": indicator.description,
+        "unit": indicator.unit,
+        "frequency": indicator.frequency,
+        "category_id": indicator.category_id,
+        "source": indicator.source,
+        "format": "columnar",
+        "date_encoding": "epoch_days",
+        "series": series_list,
+    }
+
+
+def _series_types(db: Session, indicator_id: int) -> List[str]:
+    """Distinct series types via a loose index scan (one MIN() seek per type)"""
+    series_types = []
+    query = select(func.min(DataPoint.series_type)).where(DataPoint.indicator_id == indicator_id)
+    current = db.execute(query).scalar()
+    while current is not None:
+        series_types.append(current)
+        current = db.execute(query.where(DataPoint.series_type > current)).scalar()
+    return series_types
+
+
+def _load_series_rows(
+    db: Session,
+    indicator_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    limit: Optional[int],
+    series_types: Optional[List[str]],
+):
+    """Fetch (series_type, date, value) rows with filters and per-series limit applied in SQL"""
+    filters = [DataPoint.indicator_id == indicator_id]
+    if start_date:
+        filters.append(DataPoint.date >= start_date)
+    if end_date:
+        filters.append(DataPoint.date <= end_date)
+
+    columns = (DataPoint.series_type, DataPoint.date, DataPoint.value)
+
+    if not limit:
+        if series_types:
+            filters.append(DataPoint.series_type.in_(series_types))
+        stmt = select(*columns).where(*filters).order_by(DataPoint.series_type, DataPoint.date)
+        return db.execute(stmt).all()
+
+    # One index range scan per series: latest `limit` rows, newest first
+    if not series_types:
+        series_types = _series_types(db, indicator_id)
+
+    rows = []
+    for series_type in sorted(series_types):
+        stmt = (
+            select(*columns)
+            .where(*filters, DataPoint.series_type == series_type)
+            .order_by(DataPoint.date.desc())
+            .limit(limit)
+        )
+        rows.extend(reversed(db.execute(stmt).all()))
+    return rows
+
+
+def _select_points(points, max_points: Optional[int], method: str):
+    """Downsample a series to chart size if requested"""
+    if max_points and len(points) > max_points:
+        keep = downsample_indices(
+            [dp.date for dp in points],
+            [dp.value for dp in points],
+            max_points,
+            method,
+        )
+        points = [points[i] for i in keep]
+    return points
 
 
 @router.get("", response_model=List[IndicatorResponse])
 @router.get("/", response_model=List[IndicatorResponse], include_in_schema=False)
+@cached(lambda params: ["indicators"])
 def get_indicators(
     category_slug: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -31,26 +139,24 @@ def get_indicators(
 
 
 @router.get("/{slug}", response_model=IndicatorWithData)
+@cached(lambda params: [f"indicator:{params['slug']}"])
 def get_indicator(
     slug: str,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     limit: int = Query(default=None, le=50000),
+    points: Optional[int] = Query(default=None, ge=3, le=10000, description="Downsample each series to about this many points"),
+    downsample: str = Query(default="lttb", pattern="^(" + "|".join(DOWNSAMPLE_METHODS) + ")$"),
+    series: Optional[List[str]] = Query(default=None, description="Only return these series types"),
+    response_format: str = Query(default="json", alias="format", pattern="^(json|columnar)$", description="columnar: parallel date/value arrays per series"),
+    accept: Optional[str] = Header(default=None),
     db: Session = Depends(get_db)
 ):
     indicator = db.query(Indicator).filter(Indicator.slug == slug).first()
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    # Get all data points for this indicator
-    query = db.query(DataPoint).filter(DataPoint.indicator_id == indicator.id)
-    
-    if start_date:
-        query = query.filter(DataPoint.date >= start_date)
-    if end_date:
-        query = query.filter(DataPoint.date <= end_date)
-    
-    all_data_points = query.order_by(DataPoint.series_type, DataPoint.date).all()
+    all_data_points = _load_series_rows(db, indicator.id, start_date, end_date, limit, series)
     
     # Group by series_type
     series_dict = {}
@@ -59,30 +165,33 @@ def get_indicator(
             series_dict[dp.series_type] = []
         series_dict[dp.series_type].append(dp)
     
-    # Build series list
-    series_list = []
-    # First add standard series types in order
-    for series_type in ["historical", "inflation_adjusted", "annual_change", "annual_average"]:
-        if series_type in series_dict:
-            points = series_dict[series_type][-limit:] if limit else series_dict[series_type]
-            series_list.append(DataSeries(
-                series_type=series_type,
-                label=SERIES_LABELS.get(series_type, series_type.replace("_", " ").title()),
-                data_points=[DataPointBase(date=dp.date, value=dp.value) for dp in points]
-            ))
+    # Standard series types first, in their usual order, then any custom ones
+    ordered_types = [t for t in STANDARD_SERIES if t in series_dict]
+    ordered_types += [t for t in series_dict if t not in STANDARD_SERIES]
+    selected = {t: _select_points(series_dict[t], points, downsample) for t in ordered_types}
+    
+    binary_type = arrow_export.negotiate(accept)
+    if binary_type:
+        return Response(
+            content=arrow_export.series_body(indicator.slug, ordered_types, selected, binary_type),
+            media_type=binary_type
+        )
     
-    # Then add any custom series types
-    for series_type in series_dict.keys():
-        if series_type not in ["historical", "inflation_adjusted", "annual_change", "annual_average"]:
-            points = series_dict[series_type][-limit:] if limit else series_dict[series_type]
-            series_list.append(DataSeries(
-                series_type=series_type,
-                label=SERIES_LABELS.get(series_type, series_type.replace("_", " ").title()),
-                data_points=[DataPointBase(date=dp.date, value=dp.value) for dp in points]
-            ))
+    if response_format == "columnar":
+        return JSONResponse(_columnar_payload(indicator, ordered_types, selected))
+    
+    # Build series list
+    series_list = [
+        DataSeries(
+            series_type=series_type,
+            label=_series_label(series_type),
+            data_points=[DataPointBase(date=dp.date, value=dp.value) for dp in selected[series_type]]
+        )
+        for series_type in ordered_types
+    ]
     
     # For backward compatibility, also return historical data in data_points
-    historical_points = series_dict.get("historical", [])[-limit:] if limit else series_dict.get("historical", [])
+    historical_points = selected.get("historical", [])
     
     return IndicatorWithData(
         id=indicator.id,
@@ -99,29 +208,20 @@ def get_indicator(
 
 
 @router.get("/{slug}/latest")
+@cached(lambda params: [f"indicator:{params['slug']}"])
 def get_latest_value(slug: str, db: Session = Depends(get_db)):
     indicator = db.query(Indicator).filter(Indicator.slug == slug).first()
     if not indicator:
         raise HTTPException(status_code=404, detail="Indicator not found")
     
-    latest = db.query(DataPoint).filter(
-        DataPoint.indicator_id == indicator.id
-    ).order_by(DataPoint.date.desc()).first()
-    
-    previous = db.query(DataPoint).filter(
-        DataPoint.indicator_id == indicator.id
-    ).order_by(DataPoint.date.desc()).offset(1).first()
-    
-    change_percent = None
-    if latest and previous and previous.value != 0:
-        change_percent = round(((latest.value - previous.value) / abs(previous.value)) * 100, 2)
+    summary = latest_values(db, [indicator.id]).get(indicator.id, LatestValues())
     
     return {
         "indicator": indicator.name,
         "slug": indicator.slug,
         "unit": indicator.unit,
-        "latest_value": latest.value if latest else None,
-        "latest_date": latest.date if latest else None,
-        "previous_value": previous.value if previous else None,
-        "change_percent": change_percent
+        "latest_value": summary.latest_value,
+        "latest_date": summary.latest_date,
+        "previous_value": summary.previous_value,
+        "change_percent": summary.change_percent
     }
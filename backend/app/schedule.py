@@ -0,0 +1,460 @@
+"""
+When each indicator is due for collection.
+
+Every indicator with a scrape config has a collection_schedules row holding
+its next due time (UTC) and the outcome of its last run. The schedule spec
+is either the indicator's own (`spec`) or the default for its frequency:
+
+  cron      five fields, "minute hour day-of-month month day-of-week", with
+            *, lists, ranges and /steps; evaluated in `schedule_timezone`
+  interval  "every 30m", "every 6h", "every 2d"; counted from the last run
+
+The scheduler asks for the indicators that are due, collects only those,
+records the outcome with mark_collected() in the same transaction, and
+sleeps until next_wakeup().
+
+Several collector processes (the scheduler, the Railway cron service, admin
+triggers) can run at once. Each claims batches of indicators with claim(),
+which leases them to the worker for `collection_lease_seconds`:
+SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL, a conditional UPDATE on
+SQLite (one writer at a time). A LeaseKeeper renews the leases while the
+batch is scraped, and mark_collected() releases them with the batch's
+commit. A worker that dies simply lets its leases expire. Each reading is
+stored under the run it belongs to (previous_runs(), app/intraday.py) with
+ON CONFLICT DO NOTHING, and the day's point is upserted from the day's bar,
+so a batch that is collected twice after an expired lease stores its
+readings once.
+"""
+import logging
+import os
+import re
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Collection, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Union
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, case, false, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal
+from .models import CollectionSchedule, Indicator
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Defaults by Indicator.frequency; daily series keep the 09:00/15:00/21:00 windows
+DEFAULT_SPECS = {
+    "daily": "0 9,15,21 * * *",
+    "weekly": "0 9 * * *",
+    "monthly": "0 9 * * 1,4",
+    "quarterly": "0 9 * * 1",
+    "yearly": "0 9 1,15 * *",
+}
+FALLBACK_SPEC = DEFAULT_SPECS["daily"]
+
+_INTERVAL = re.compile(r'^every\s+(\d+)\s*([mhd])$', re.IGNORECASE)
+_INTERVAL_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+_CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day of month", 1, 31), ("month", 1, 12), ("day of week", 0, 7))
+
+
+# previous_run_at of readings from an indicator's first collection run
+NEVER_RUN = datetime(1970, 1, 1)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Interval(NamedTuple):
+    every: timedelta
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + self.every
+
+
+class Cron(NamedTuple):
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # 0 = Sunday
+    any_day: bool  # day of month is *
+    any_weekday: bool  # day of week is *
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # As in cron: when both day fields are restricted, either may match
+        if not self.any_day and not self.any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_wall_time(self, wall: datetime) -> datetime:
+        """First matching wall-clock minute strictly after `wall`"""
+        moment = wall.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year=moment.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError("Cron expression never matches")
+
+    def next_after(self, moment: datetime) -> datetime:
+        zone = _zone()
+        aware = moment.replace(tzinfo=timezone.utc)
+        wall = (aware.astimezone(zone) if zone else aware.astimezone()).replace(tzinfo=None)
+        following = self.next_wall_time(wall)
+        localized = following.replace(tzinfo=zone) if zone else following.astimezone()
+        return localized.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+Schedule = Union[Cron, Interval]
+
+
+@lru_cache(maxsize=None)
+def _zone() -> Optional[ZoneInfo]:
+    """The zone cron specs are evaluated in; None means the server's local time"""
+    return ZoneInfo(settings.schedule_timezone) if settings.schedule_timezone else None
+
+
+def _cron_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        body, _, step = part.partition("/")
+        if body == "*":
+            start, end = low, high
+        elif "-" in body:
+            start, end = (int(bound) for bound in body.split("-", 1))
+        else:
+            start = end = int(body)
+            if step:
+                end = high
+        step = int(step) if step else 1
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Invalid {name} field '{text}'")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@lru_cache(maxsize=256)
+def parse(spec: str) -> Schedule:
+    """Parse a cron or interval spec; raises ValueError"""
+    spec = spec.strip()
+    interval = _INTERVAL.match(spec)
+    if interval:
+        amount = int(interval.group(1))
+        if amount < 1:
+            raise ValueError(f"Interval must be positive: '{spec}'")
+        return Interval(timedelta(**{_INTERVAL_UNITS[interval.group(2).lower()]: amount}))
+
+    fields = spec.split()
+    if len(fields) != 5:
+        raise ValueError(f"Expected 'every <n>m|h|d' or five cron fields, got '{spec}'")
+    try:
+        minutes, hours, days, months, weekdays = (
+            _cron_field(text, name, low, high) for text, (name, low, high) in zip(fields, _CRON_FIELDS)
+        )
+    except ValueError as e:
+        raise ValueError(f"Invalid cron expression '{spec}': {e}")
+    weekdays = frozenset(day % 7 for day in weekdays)
+    return Cron(minutes, hours, days, months, weekdays, fields[2] == "*", fields[4] == "*")
+
+
+def spec_for(frequency: Optional[str], spec: Optional[str] = None) -> str:
+    return spec or DEFAULT_SPECS.get((frequency or "").lower(), FALLBACK_SPEC)
+
+
+def _scrapable():
+    return and_(
+        Indicator.scrape_url.isnot(None), Indicator.scrape_url != "",
+        Indicator.html_selector.isnot(None), Indicator.html_selector != "",
+    )
+
+
+def _insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def ensure_schedules(db: Session, now: Optional[datetime] = None) -> None:
+    """Give scrapable indicators without a schedule one that is due at once (does not commit)"""
+    now = now or utcnow()
+    unscheduled = db.execute(
+        select(Indicator.id)
+        .outerjoin(CollectionSchedule, CollectionSchedule.indicator_id == Indicator.id)
+        .where(_scrapable(), CollectionSchedule.indicator_id.is_(None))
+    ).scalars().all()
+    if unscheduled:
+        db.execute(
+            _insert(db)(CollectionSchedule).on_conflict_do_nothing(index_elements=[CollectionSchedule.indicator_id]),
+            [{"indicator_id": indicator_id, "next_due_at": now} for indicator_id in unscheduled],
+        )
+
+
+def due_indicator_ids(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Scrapable indicators due at `now`, oldest first (does not commit)"""
+    now = now or utcnow()
+    ensure_schedules(db, now)
+    return db.execute(
+        select(CollectionSchedule.indicator_id)
+        .join(Indicator, Indicator.id == CollectionSchedule.indicator_id)
+        .where(_scrapable(), CollectionSchedule.next_due_at <= now)
+        .order_by(CollectionSchedule.next_due_at, CollectionSchedule.indicator_id)
+    ).scalars().all()
+
+
+def next_wakeup(db: Session) -> Optional[datetime]:
+    """Earliest next_due_at of any scrapable indicator (UTC)"""
+    return db.execute(
+        select(func.min(CollectionSchedule.next_due_at))
+        .join(Indicator, Indicator.id == CollectionSchedule.indicator_id)
+        .where(_scrapable())
+    ).scalar()
+
+
+def mark_collected(
+    db: Session,
+    statuses: Dict[int, str],
+    now: Optional[datetime] = None,
+    worker: Optional[str] = None,
+) -> None:
+    """Record each indicator's run status and schedule its next run (does not commit).
+
+    A failed run is retried at the next due time like any other. The leases
+    `worker` still holds on the indicators are released; a lease that expired
+    and was claimed by another worker is left to that worker.
+    """
+    if not statuses:
+        return
+    now = now or utcnow()
+    rows = db.execute(
+        select(Indicator.id, Indicator.frequency, CollectionSchedule.spec)
+        .outerjoin(CollectionSchedule, CollectionSchedule.indicator_id == Indicator.id)
+        .where(Indicator.id.in_(list(statuses)))
+    ).all()
+    values = [
+        {
+            "indicator_id": indicator_id,
+            "next_due_at": parse(spec_for(frequency, spec)).next_after(now),
+            "last_run_at": now,
+            "last_success_at": now if statuses[indicator_id] != "failed" else None,
+            "last_status": statuses[indicator_id],
+        }
+        for indicator_id, frequency, spec in rows
+    ]
+    stmt = _insert(db)(CollectionSchedule)
+    still_held = CollectionSchedule.lease_owner == worker if worker else false()
+    db.execute(stmt.on_conflict_do_update(index_elements=[CollectionSchedule.indicator_id], set_={
+        "next_due_at": stmt.excluded.next_due_at,
+        "last_run_at": stmt.excluded.last_run_at,
+        "last_success_at": func.coalesce(stmt.excluded.last_success_at, CollectionSchedule.last_success_at),
+        "last_status": stmt.excluded.last_status,
+        "lease_owner": case((still_held, None), else_=CollectionSchedule.lease_owner),
+        "lease_expires_at": case((still_held, None), else_=CollectionSchedule.lease_expires_at),
+    }), values)
+
+
+def set_spec(db: Session, indicator: Indicator, spec: Optional[str], now: Optional[datetime] = None) -> CollectionSchedule:
+    """Give an indicator its own spec (None restores the frequency default) and reschedule it (does not commit)"""
+    spec = spec.strip() if spec and spec.strip() else None
+    schedule = parse(spec_for(indicator.frequency, spec))
+    now = now or utcnow()
+    row = db.get(CollectionSchedule, indicator.id)
+    if row is None:
+        row = CollectionSchedule(indicator_id=indicator.id)
+        db.add(row)
+    row.spec = spec
+    row.next_due_at = schedule.next_after(row.last_run_at or now) if isinstance(schedule, Interval) else schedule.next_after(now)
+    return row
+
+
+def describe(db: Session, indicator_ids: Optional[Iterable[int]] = None) -> List[dict]:
+    """Schedule of every scrapable indicator (or of the given indicators), soonest first"""
+    query = (
+        select(Indicator, CollectionSchedule)
+        .outerjoin(CollectionSchedule, CollectionSchedule.indicator_id == Indicator.id)
+        .order_by(CollectionSchedule.next_due_at, Indicator.id)
+    )
+    if indicator_ids is None:
+        query = query.where(_scrapable())
+    else:
+        query = query.where(Indicator.id.in_(list(indicator_ids)))
+    return [
+        {
+            "indicator": indicator.name,
+            "slug": indicator.slug,
+            "frequency": indicator.frequency,
+            "schedule": spec_for(indicator.frequency, row.spec if row else None),
+            "custom": bool(row and row.spec),
+            "next_due_at": row.next_due_at.isoformat() if row else None,
+            "last_run_at": row.last_run_at.isoformat() if row and row.last_run_at else None,
+            "last_success_at": row.last_success_at.isoformat() if row and row.last_success_at else None,
+            "last_status": row.last_status if row else None,
+        }
+        for indicator, row in db.execute(query).all()
+    ]
+
+
+# --- Work claiming -------------------------------------------------------
+
+def worker_id() -> str:
+    """Lease owner name for one collection run: host, process and a random suffix"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claimable(now: datetime, due_only: bool, exclude: Collection[int] = ()):
+    query = (
+        select(CollectionSchedule.indicator_id)
+        .join(Indicator, Indicator.id == CollectionSchedule.indicator_id)
+        .where(_scrapable(), or_(CollectionSchedule.lease_expires_at.is_(None), CollectionSchedule.lease_expires_at < now))
+    )
+    if due_only:
+        query = query.where(CollectionSchedule.next_due_at <= now)
+    if exclude:
+        query = query.where(CollectionSchedule.indicator_id.notin_(list(exclude)))
+    return query
+
+
+def count_claimable(db: Session, due_only: bool = True, now: Optional[datetime] = None) -> int:
+    """Scrapable indicators not leased by anyone (and due, with `due_only`)"""
+    subquery = _claimable(now or utcnow(), due_only).subquery()
+    return db.execute(select(func.count()).select_from(subquery)).scalar()
+
+
+def claim(
+    db: Session,
+    worker: str,
+    limit: Optional[int] = None,
+    due_only: bool = True,
+    exclude: Collection[int] = (),
+    now: Optional[datetime] = None,
+) -> List[int]:
+    """Lease up to `limit` unleased indicators to `worker`, most overdue first, and commit.
+
+    With `due_only` False, indicators that are not due yet are claimed too
+    (a manual "collect everything" run); `exclude` skips the ones the run
+    already handled.
+    """
+    now = now or utcnow()
+    limit = limit or settings.collection_claim_batch
+    ensure_schedules(db, now)
+    candidates = _claimable(now, due_only, exclude).order_by(
+        CollectionSchedule.next_due_at, CollectionSchedule.indicator_id
+    ).limit(limit)
+    lease = {"lease_owner": worker, "lease_expires_at": now + timedelta(seconds=settings.collection_lease_seconds)}
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Rows another worker is claiming right now are skipped, not waited for
+        ids = db.execute(candidates.with_for_update(of=CollectionSchedule, skip_locked=True)).scalars().all()
+        if ids:
+            db.execute(update(CollectionSchedule).where(CollectionSchedule.indicator_id.in_(ids)).values(**lease))
+    else:
+        # One writer at a time: the conditional UPDATE is the claim
+        db.execute(
+            update(CollectionSchedule)
+            .where(CollectionSchedule.indicator_id.in_(candidates))
+            .values(**lease)
+            .execution_options(synchronize_session=False)
+        )
+        ids = db.execute(
+            select(CollectionSchedule.indicator_id)
+            .where(CollectionSchedule.lease_owner == worker, CollectionSchedule.lease_expires_at == lease["lease_expires_at"])
+            .order_by(CollectionSchedule.next_due_at, CollectionSchedule.indicator_id)
+        ).scalars().all()
+    db.commit()
+    return list(ids)
+
+
+def renew(db: Session, worker: str, indicator_ids: Iterable[int], now: Optional[datetime] = None) -> int:
+    """Extend `worker`'s leases on the given indicators and commit; returns how many it still holds"""
+    indicator_ids = list(indicator_ids)
+    if not indicator_ids:
+        return 0
+    now = now or utcnow()
+    renewed = db.execute(
+        update(CollectionSchedule)
+        .where(CollectionSchedule.indicator_id.in_(indicator_ids), CollectionSchedule.lease_owner == worker)
+        .values(lease_expires_at=now + timedelta(seconds=settings.collection_lease_seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return renewed
+
+
+def release(db: Session, worker: str, indicator_ids: Iterable[int]) -> None:
+    """Give up `worker`'s leases without recording a run (does not commit)"""
+    indicator_ids = list(indicator_ids)
+    if indicator_ids:
+        db.execute(
+            update(CollectionSchedule)
+            .where(CollectionSchedule.indicator_id.in_(indicator_ids), CollectionSchedule.lease_owner == worker)
+            .values(lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def previous_runs(db: Session, indicator_ids: Iterable[int]) -> Dict[int, datetime]:
+    """Each indicator's last_run_at (NEVER_RUN if it has none), keying the readings of the run being collected"""
+    indicator_ids = list(indicator_ids)
+    if not indicator_ids:
+        return {}
+    rows = db.execute(
+        select(CollectionSchedule.indicator_id, CollectionSchedule.last_run_at)
+        .where(CollectionSchedule.indicator_id.in_(indicator_ids))
+    )
+    return {indicator_id: last_run_at or NEVER_RUN for indicator_id, last_run_at in rows}
+
+
+class LeaseKeeper:
+    """Renews a worker's held leases from a background thread, every third of the lease time"""
+
+    def __init__(self, worker: str):
+        self.worker = worker
+        self._held: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def hold(self, indicator_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._held.update(indicator_ids)
+
+    def drop(self, indicator_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._held.difference_update(indicator_ids)
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.collection_lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                # Own session: the collector's session may be mid-transaction
+                with SessionLocal() as db:
+                    renewed = renew(db, self.worker, held)
+                if renewed < len(held):
+                    logger.warning(f"{len(held) - renewed} leases of {self.worker} expired and were claimed elsewhere")
+            except Exception as e:
+                logger.warning(f"Renewing leases of {self.worker} failed: {e}")
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
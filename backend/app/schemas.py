@@ -23,6 +23,7 @@ class IndicatorBase(BaseModel):
     frequency: str = "monthly"
     scrape_url: Optional[str] = None
     html_selector: Optional[str] = None
+    extractor_type: Optional[str] = "css"
 
 
 class IndicatorSummary(BaseModel):
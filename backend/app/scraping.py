@@ -0,0 +1,400 @@
+"""
+Concurrent scraping engine with per-host politeness.
+
+ScrapeEngine runs many fetches on a bounded thread pool. Requests to
+different hosts proceed in parallel, while each host gets at most
+`per_host` requests in flight and consecutive request starts spaced by
+`host_interval` seconds. The whole run is bounded by `deadline` seconds:
+request timeouts are capped at the time left and tasks that have not
+started by then are reported as skipped.
+
+Tasks only fetch and parse; database writes stay with the caller, on the
+caller's thread.
+
+Failures are tracked per host (HostHealth, shared by every run in the
+process):
+- Transient errors (timeouts, connection errors, 429 and 5xx) are retried
+  up to `scrape_retries` times, with exponential backoff and full jitter,
+  within the run deadline.
+- `host_breaker_threshold` failed requests in a row (transient or 403)
+  open the host's circuit. Its tasks then fail at once, without a request,
+  for `host_breaker_cooldown_seconds`.
+- After the cool-down, a single trial request decides whether the circuit
+  closes or opens again.
+One dead site therefore costs a few timeouts instead of one per indicator.
+
+scrape_targets() groups targets by URL so each page is downloaded once per
+run (DocumentCache) and every indicator's expression pointing at it is
+evaluated against the same Page, with the extractor it chose
+(app/extractors.py).
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import get_settings
+from .extractors import extract
+from .http_client import Page, fetch_page
+from .selector_memory import SelectorHint
+
+settings = get_settings()
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:147.0) Gecko/20100101 Firefox/147.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Connection': 'keep-alive',
+}
+
+# A task gets the request timeout to use (seconds) and returns its result
+ScrapeTask = Tuple[Hashable, str, Callable[[float], Any]]  # (key, url, fn)
+# What to scrape: (key, url, expression, extractor_type)
+ScrapeTarget = Tuple[Hashable, str, str, Optional[str]]
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpen(Exception):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host} after repeated failures (retrying in {retry_in:.0f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+TRANSIENT = "transient"  # worth retrying: timeouts, connection errors, 429, 5xx
+BLOCKED = "blocked"  # not retried, but counts against the host: 403
+
+
+def failure_kind(error: Exception) -> Optional[str]:
+    """How a fetch error reflects on the host; None when the host answered normally (404, bad page)"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return TRANSIENT
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429 or status >= 500:
+            return TRANSIENT
+        if status == 403:
+            return BLOCKED
+    return None
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class _HostState:
+    __slots__ = ("failures", "opened_until", "trial", "trips", "last_error")
+
+    def __init__(self):
+        self.failures = 0  # consecutive
+        self.opened_until: Optional[float] = None  # monotonic
+        self.trial = False  # a half-open trial request is in flight
+        self.trips = 0
+        self.last_error: Optional[str] = None
+
+
+class HostHealth:
+    """Consecutive failures and circuit breaker state per host.
+
+    A failure is one page that could not be fetched after its retries, so a
+    single flaky page cannot open the circuit on its own. Once a circuit is
+    open, only the half-open trial request can close it; results of requests
+    started before it opened are ignored.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, cooldown: Optional[float] = None):
+        self.threshold = threshold or settings.host_breaker_threshold
+        self.cooldown = settings.host_breaker_cooldown_seconds if cooldown is None else cooldown
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str) -> bool:
+        """Allow a request to `host` or raise CircuitOpen; True when it is the half-open trial"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_until is None:
+                return False
+            remaining = state.opened_until - time.monotonic()
+            if remaining > 0 or state.trial:
+                raise CircuitOpen(host, max(remaining, 0))
+            state.trial = True
+            return True
+
+    def success(self, host: str, trial: bool = False) -> None:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or (state.opened_until is not None and not trial):
+                return
+            state.failures = 0
+            state.opened_until = None
+            state.trial = False
+
+    def failure(self, host: str, error: Exception, trial: bool = False) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            if state.opened_until is not None and not trial:
+                return
+            state.failures += 1
+            state.last_error = str(error) or type(error).__name__
+            if trial or state.failures >= self.threshold:
+                state.opened_until = time.monotonic() + self.cooldown
+                state.trips += 1
+            state.trial = False
+
+    def cancel_trial(self, host: str) -> None:
+        """The trial request never ran (run deadline); let the next one try"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.trial = False
+
+    def report(self, hosts: Optional[Iterable[str]] = None) -> List[dict]:
+        """State of the given hosts (default: all) that have failed since their last success"""
+        now = time.monotonic()
+        with self._lock:
+            names = sorted(self._hosts if hosts is None else set(hosts) & set(self._hosts))
+            report = []
+            for host in names:
+                state = self._hosts[host]
+                if state.failures == 0 and state.opened_until is None:
+                    continue
+                if state.opened_until is None:
+                    status = "degraded"
+                elif state.opened_until > now:
+                    status = "open"
+                else:
+                    status = "half-open"
+                report.append({
+                    "host": host,
+                    "circuit": status,
+                    "consecutive_failures": state.failures,
+                    "trips": state.trips,
+                    "retry_in_seconds": round(max(state.opened_until - now, 0), 1) if state.opened_until else None,
+                    "last_error": state.last_error,
+                })
+            return report
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+host_health = HostHealth()
+
+
+class ScrapeOutcome(NamedTuple):
+    value: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    matched: Optional[str] = None  # expression that produced the value (may be a fallback)
+    missed: Tuple[str, ...] = ()  # expressions tried before it that found nothing
+
+
+class HostThrottle:
+    """Per-host concurrency cap and minimum spacing between request starts"""
+
+    def __init__(self, per_host: int, interval: float):
+        self.per_host = per_host
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, url: str, deadline: float):
+        host = host_of(url)
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        if not semaphore.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise DeadlineExceeded()
+        try:
+            with self._lock:
+                start = max(time.monotonic(), self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.interval
+            if start >= deadline:
+                raise DeadlineExceeded()
+            time.sleep(max(start - time.monotonic(), 0))
+            yield
+        finally:
+            semaphore.release()
+
+
+class ScrapeEngine:
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        per_host: Optional[int] = None,
+        host_interval: Optional[float] = None,
+        deadline: Optional[float] = None,
+        request_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        health: Optional[HostHealth] = None,
+    ):
+        self.max_workers = max_workers or settings.scrape_max_workers
+        self.per_host = per_host or settings.scrape_per_host_concurrency
+        self.host_interval = settings.scrape_host_interval_seconds if host_interval is None else host_interval
+        self.deadline = deadline or settings.scrape_deadline_seconds
+        self.request_timeout = request_timeout or settings.scrape_request_timeout_seconds
+        self.retries = settings.scrape_retries if retries is None else retries
+        self.health = health or host_health
+
+    @staticmethod
+    def backoff(attempt: int, error: Exception) -> float:
+        """Full-jitter exponential delay before retry number `attempt` + 1, honouring Retry-After"""
+        cap = settings.scrape_backoff_max_seconds
+        delay = random.uniform(0, min(cap, settings.scrape_backoff_base_seconds * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        if retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), cap))
+        return delay
+
+    def run(self, tasks: Iterable[ScrapeTask]) -> Dict[Hashable, ScrapeOutcome]:
+        """Run every task; returns an outcome per key (errors are captured, not raised)"""
+        tasks = list(tasks)
+        if not tasks:
+            return {}
+        deadline = time.monotonic() + self.deadline
+        throttle = HostThrottle(self.per_host, self.host_interval)
+
+        def execute(url: str, fn: Callable[[float], Any]) -> ScrapeOutcome:
+            started = time.monotonic()
+            host = host_of(url)
+            attempt = 0
+            trial = False
+            try:
+                while True:
+                    try:
+                        with throttle.slot(url, deadline):
+                            # Checked once the host slot is ours, so queued tasks see a circuit opened meanwhile
+                            trial = self.health.acquire(host)
+                            timeout = min(self.request_timeout, deadline - time.monotonic())
+                            if timeout <= 0:
+                                raise DeadlineExceeded()
+                            value = fn(timeout)
+                    except (DeadlineExceeded, CircuitOpen):
+                        raise
+                    except Exception as e:
+                        kind = failure_kind(e)
+                        if kind is None:
+                            # The host answered; the page itself was the problem
+                            self.health.success(host, trial)
+                            raise
+                        delay = self.backoff(attempt, e)
+                        if trial or kind != TRANSIENT or attempt >= self.retries or time.monotonic() + delay >= deadline:
+                            # Counted once per page, when it is given up on
+                            self.health.failure(host, e, trial)
+                            trial = False
+                            raise
+                        attempt += 1
+                        time.sleep(delay)
+                        continue
+                    self.health.success(host, trial)
+                    return ScrapeOutcome(value, None, time.monotonic() - started)
+            except DeadlineExceeded:
+                if trial:
+                    self.health.cancel_trial(host)
+                return ScrapeOutcome(None, "Run deadline exceeded", time.monotonic() - started)
+            except Exception as e:
+                return ScrapeOutcome(None, str(e) or type(e).__name__, time.monotonic() - started)
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks)), thread_name_prefix="scrape")
+        try:
+            futures = {key: executor.submit(execute, url, fn) for key, url, fn in tasks}
+            wait(futures.values(), timeout=max(deadline - time.monotonic(), 0))
+        finally:
+            # Don't block on stragglers; their request timeouts already end at the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return {
+            key: future.result() if future.done() and not future.cancelled()
+            else ScrapeOutcome(None, "Run deadline exceeded", self.deadline)
+            for key, future in futures.items()
+        }
+
+
+class DocumentCache:
+    """Pages by URL, fetched at most once for the length of a run.
+
+    Fetches go through the shared pooled client, so pages that did not change
+    since the last run come back as 304s and reuse their stored Page (and
+    anything already parsed from it).
+    """
+
+    def __init__(self, headers: Optional[dict] = None):
+        self.headers = headers or DEFAULT_HEADERS
+        self.fetches = 0
+        self.not_modified = 0
+        self._pages: Dict[str, Page] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, timeout: float) -> Page:
+        with self._lock:
+            url_lock = self._locks.setdefault(url, threading.Lock())
+        with url_lock:
+            if url not in self._pages:
+                page, not_modified = fetch_page(url, timeout, self.headers)
+                self.fetches += 1
+                self.not_modified += not_modified
+                self._pages[url] = page
+            return self._pages[url]
+
+
+def group_by_url(targets: Iterable[ScrapeTarget]) -> Dict[str, List[Tuple[Hashable, str, Optional[str]]]]:
+    groups: Dict[str, List[Tuple[Hashable, str, Optional[str]]]] = {}
+    for key, url, expression, extractor_type in targets:
+        groups.setdefault(url, []).append((key, expression, extractor_type))
+    return groups
+
+
+def scrape_targets(
+    targets: Iterable[ScrapeTarget],
+    engine: Optional[ScrapeEngine] = None,
+    documents: Optional[DocumentCache] = None,
+    hints: Optional[Dict[Hashable, SelectorHint]] = None,
+) -> Dict[Hashable, ScrapeOutcome]:
+    """Scrape a value per target, fetching each distinct URL once.
+
+    Targets are plain tuples so no ORM object is touched off the caller's
+    thread. A failed fetch fails every target on that URL; a failing
+    expression only fails its own target. `hints` (app/selector_memory.py)
+    reorder and prune the CSS fallbacks per key.
+    """
+    documents = documents or DocumentCache()
+    hints = hints or {}
+    groups = group_by_url(targets)
+
+    def page_task(url: str, members: List[Tuple[Hashable, str, Optional[str]]]):
+        def fetch(timeout: float) -> Dict[Hashable, ScrapeOutcome]:
+            page = documents.get(url, timeout)
+            values = {}
+            for key, expression, extractor_type in members:
+                hint = hints.get(key, SelectorHint())
+                try:
+                    value, matched, missed = extract(page, expression, extractor_type, preferred=hint.preferred, skip=hint.skip)
+                    error = None if value is not None else "No value found for selector"
+                    values[key] = ScrapeOutcome(value, error, matched=matched, missed=missed)
+                except Exception as e:
+                    values[key] = ScrapeOutcome(None, str(e) or type(e).__name__)
+            return values
+        return fetch
+
+    pages = (engine or ScrapeEngine()).run(
+        (url, url, page_task(url, members)) for url, members in groups.items()
+    )
+
+    outcomes = {}
+    for url, members in groups.items():
+        page = pages[url]
+        for key, _, _ in members:
+            outcome = page.value[key] if page.error is None else ScrapeOutcome(None, page.error)
+            outcomes[key] = outcome._replace(elapsed=page.elapsed)
+    return outcomes
@@ -0,0 +1,107 @@
+"""
+Which CSS selector actually produced each indicator's value.
+
+Every bulk collection run records a hit for the selector that matched and a
+miss for each one tried before it (selector_stats). When the configured
+selector misses on the next run, the last winning fallback is tried first:
+the indicator's own, or failing that the one that wins most often on the
+same domain. A hint only reorders the fallbacks; the configured selector
+always goes first, so a generic selector never shadows it. Fallback
+selectors that missed `selector_prune_after` times in a row for an
+indicator are skipped until `selector_retry_days` have passed since they
+were last tried.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import SelectorStat
+
+settings = get_settings()
+
+
+class SelectorHint(NamedTuple):
+    preferred: Optional[str] = None
+    skip: FrozenSet[str] = frozenset()
+
+
+def domain_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def load_hints(db: Session, indicators: Iterable[Tuple[int, str]]) -> Dict[int, SelectorHint]:
+    """Hints for (indicator_id, scrape_url) pairs, from two queries"""
+    domains = {indicator_id: domain_of(url) for indicator_id, url in indicators}
+    if not domains:
+        return {}
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    retry_before = now - timedelta(days=settings.selector_retry_days)
+    preferred: Dict[int, Tuple[datetime, str]] = {}
+    skip: Dict[int, set] = {}
+    for stat in db.execute(select(SelectorStat).where(SelectorStat.indicator_id.in_(domains))).scalars():
+        if stat.last_hit_at is not None and (
+            stat.indicator_id not in preferred or stat.last_hit_at > preferred[stat.indicator_id][0]
+        ):
+            preferred[stat.indicator_id] = (stat.last_hit_at, stat.selector)
+        if stat.consecutive_misses >= settings.selector_prune_after and stat.last_miss_at and stat.last_miss_at > retry_before:
+            skip.setdefault(stat.indicator_id, set()).add(stat.selector)
+
+    # Indicators with no winner of their own borrow the domain's most successful selector (fallback order only)
+    domain_best: Dict[str, str] = {}
+    missing = {domain for indicator_id, domain in domains.items() if indicator_id not in preferred}
+    if missing:
+        rows = db.execute(
+            select(SelectorStat.domain, SelectorStat.selector, func.sum(SelectorStat.hits).label("hits"))
+            .where(SelectorStat.domain.in_(missing), SelectorStat.hits > 0)
+            .group_by(SelectorStat.domain, SelectorStat.selector)
+            .order_by(func.sum(SelectorStat.hits).desc())
+        ).all()
+        for domain, selector, _ in rows:
+            domain_best.setdefault(domain, selector)
+
+    return {
+        indicator_id: SelectorHint(
+            preferred[indicator_id][1] if indicator_id in preferred else domain_best.get(domain),
+            frozenset(skip.get(indicator_id, ())),
+        )
+        for indicator_id, domain in domains.items()
+    }
+
+
+def record(db: Session, results: Iterable[Tuple[int, str, Optional[str], Iterable[str]]]) -> None:
+    """Upsert hit/miss counts for (indicator_id, scrape_url, matched, missed) results (does not commit)"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    hits, misses = [], []
+    for indicator_id, url, matched, missed in results:
+        domain = domain_of(url)
+        if matched:
+            hits.append({"indicator_id": indicator_id, "selector": matched, "domain": domain,
+                         "hits": 1, "misses": 0, "consecutive_misses": 0, "last_hit_at": now})
+        for selector in missed:
+            misses.append({"indicator_id": indicator_id, "selector": selector, "domain": domain,
+                           "hits": 0, "misses": 1, "consecutive_misses": 1, "last_miss_at": now})
+
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    keys = [SelectorStat.indicator_id, SelectorStat.selector]
+    if hits:
+        stmt = insert(SelectorStat)
+        db.execute(stmt.on_conflict_do_update(index_elements=keys, set_={
+            "hits": SelectorStat.hits + 1,
+            "consecutive_misses": 0,
+            "last_hit_at": stmt.excluded.last_hit_at,
+            "domain": stmt.excluded.domain,
+        }), hits)
+    if misses:
+        stmt = insert(SelectorStat)
+        db.execute(stmt.on_conflict_do_update(index_elements=keys, set_={
+            "misses": SelectorStat.misses + 1,
+            "consecutive_misses": SelectorStat.consecutive_misses + 1,
+            "last_miss_at": stmt.excluded.last_miss_at,
+            "domain": stmt.excluded.domain,
+        }), misses)
@@ -0,0 +1,249 @@
+"""
+Maintenance of the indicator_snapshots and data_stats tables.
+
+Every code path that writes data_points updates the snapshots of the series
+it touched *before* committing, so the snapshot is updated in the same
+transaction as the data. Read endpoints then answer "latest value",
+"change %" and "date range" questions with a primary-key lookup.
+
+Upserts go through apply_writes(), which folds the written points into the
+stored snapshot (the two latest points are kept, so a new latest or previous
+point is known without reading the series) and adds the number of new rows
+to the counts: its cost follows the size of the write, not of the series.
+Deletes and rebuilds go through refresh_snapshots(), which re-aggregates the
+indicators' points.
+
+Both bump the resource revisions of the touched indicators, their
+categories and the dashboard (ETags and response cache).
+
+The single data_stats row is adjusted in place (`total_data_points =
+total_data_points + delta`) by the change in point count, so
+/api/dashboard/summary never counts data_points. Writers call lock_series()
+before they look up which of their points already exist, so concurrent
+writers of an indicator count new rows and update its snapshot one after
+the other instead of both starting from the same state.
+"""
+import heapq
+from datetime import date
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from sqlalchemy import case, delete, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from .models import DataPoint, DataStats, Indicator, IndicatorSnapshot
+from .revisions import touch_indicators
+
+STATS_ROW_ID = 1
+
+
+class SeriesWrite(NamedTuple):
+    """Points just upserted into one series, and how many of them were new rows"""
+    points: Dict[date, float]
+    added: int
+
+
+def lock_series(db: Session, indicator_ids: Iterable[int]) -> None:
+    """Hold the given indicators' rows until commit, serialising their writers.
+
+    Takes SELECT ... FOR NO KEY UPDATE, which still lets data_points rows
+    referencing the indicators be inserted. A no-op on SQLite, where writers
+    are serialised anyway.
+    """
+    indicator_ids = sorted(set(indicator_ids))
+    if indicator_ids:
+        db.execute(
+            select(Indicator.id).where(Indicator.id.in_(indicator_ids))
+            .order_by(Indicator.id).with_for_update(key_share=True)
+        ).all()
+
+
+def apply_writes(db: Session, writes: Dict[Tuple[int, str], SeriesWrite]) -> None:
+    """Fold points upserted into {(indicator_id, series_type): SeriesWrite} into the snapshots (does not commit)
+
+    Only for points added or updated; after a delete, use refresh_snapshots().
+    The caller holds lock_series() on the indicators since it counted `added`.
+    """
+    writes = {key: write for key, write in writes.items() if write.points}
+    if not writes:
+        return
+    indicator_ids = sorted({indicator_id for indicator_id, _ in writes})
+
+    stored = {
+        (snapshot.indicator_id, snapshot.series_type): snapshot
+        for snapshot in db.execute(
+            select(IndicatorSnapshot)
+            .where(IndicatorSnapshot.indicator_id.in_(indicator_ids))
+            .execution_options(populate_existing=True)
+        ).scalars()
+    }
+
+    for key, write in writes.items():
+        snapshot = stored.get(key)
+        if snapshot is None:
+            snapshot = IndicatorSnapshot(indicator_id=key[0], series_type=key[1], count=write.added)
+            db.add(snapshot)
+        elif write.added:
+            snapshot.count = IndicatorSnapshot.count + write.added
+
+        # The new two latest points are among the stored two and the two latest written
+        top = {}
+        if snapshot.latest_date is not None:
+            top[snapshot.latest_date] = snapshot.latest_value
+        if snapshot.previous_date is not None:
+            top[snapshot.previous_date] = snapshot.previous_value
+        top.update(heapq.nlargest(2, write.points.items()))
+        (latest_date, latest_value), *rest = sorted(top.items(), reverse=True)[:2]
+
+        snapshot.latest_date, snapshot.latest_value = latest_date, latest_value
+        snapshot.previous_date, snapshot.previous_value = rest[0] if rest else (None, None)
+        snapshot.min_date = min(filter(None, (snapshot.min_date, min(write.points))))
+        snapshot.max_date = latest_date
+    db.flush()
+
+    _apply_stats_change(
+        db,
+        sum(write.added for write in writes.values()),
+        min(min(write.points) for write in writes.values()),
+        max(max(write.points) for write in writes.values()),
+    )
+    touch_indicators(db, indicator_ids)
+
+
+def refresh_snapshots(db: Session, indicator_ids: Iterable[int]) -> None:
+    """Recompute the snapshot rows of the given indicators (does not commit)"""
+    indicator_ids = sorted(set(indicator_ids))
+    if not indicator_ids:
+        return
+
+    # Make pending ORM inserts/updates visible to the aggregate queries
+    db.flush()
+
+    aggregates = db.execute(
+        select(
+            DataPoint.indicator_id,
+            DataPoint.series_type,
+            func.count(DataPoint.id).label("count"),
+            func.min(DataPoint.date).label("min_date"),
+            func.max(DataPoint.date).label("max_date"),
+        )
+        .where(DataPoint.indicator_id.in_(indicator_ids))
+        .group_by(DataPoint.indicator_id, DataPoint.series_type)
+    ).all()
+
+    ranked = select(
+        DataPoint.indicator_id,
+        DataPoint.series_type,
+        DataPoint.date,
+        DataPoint.value,
+        func.row_number().over(
+            partition_by=(DataPoint.indicator_id, DataPoint.series_type),
+            order_by=(DataPoint.date.desc(), DataPoint.id.desc()),
+        ).label("rn"),
+    ).where(DataPoint.indicator_id.in_(indicator_ids)).subquery()
+    top_two = db.execute(select(ranked).where(ranked.c.rn <= 2)).all()
+
+    latest = {}
+    previous = {}
+    for row in top_two:
+        key = (row.indicator_id, row.series_type)
+        if row.rn == 1:
+            latest[key] = row
+        else:
+            previous[key] = row
+
+    old_count = sum(db.execute(
+        select(IndicatorSnapshot.count)
+        .where(IndicatorSnapshot.indicator_id.in_(indicator_ids))
+        .order_by(IndicatorSnapshot.indicator_id, IndicatorSnapshot.series_type)
+        .with_for_update()
+    ).scalars())
+
+    db.execute(delete(IndicatorSnapshot).where(IndicatorSnapshot.indicator_id.in_(indicator_ids)))
+    db.add_all([
+        IndicatorSnapshot(
+            indicator_id=row.indicator_id,
+            series_type=row.series_type,
+            latest_date=latest[(row.indicator_id, row.series_type)].date,
+            latest_value=latest[(row.indicator_id, row.series_type)].value,
+            previous_date=getattr(previous.get((row.indicator_id, row.series_type)), "date", None),
+            previous_value=getattr(previous.get((row.indicator_id, row.series_type)), "value", None),
+            count=row.count,
+            min_date=row.min_date,
+            max_date=row.max_date,
+        )
+        for row in aggregates
+    ])
+    db.flush()
+
+    _apply_stats_change(db, sum(row.count for row in aggregates) - old_count)
+    touch_indicators(db, indicator_ids)
+
+
+def _apply_stats_change(db: Session, count_delta: int, oldest: date = None, newest: date = None) -> None:
+    """Shift the running point count in place.
+
+    The date range is widened to `oldest`/`newest` when given (points were
+    only added), otherwise re-derived from the snapshots.
+    """
+    if oldest is None:
+        oldest_date = select(func.min(IndicatorSnapshot.min_date)).scalar_subquery()
+        newest_date = select(func.max(IndicatorSnapshot.max_date)).scalar_subquery()
+    else:
+        oldest, newest = literal(oldest, DataStats.oldest_date.type), literal(newest, DataStats.newest_date.type)
+        oldest_date = case(
+            (or_(DataStats.oldest_date.is_(None), DataStats.oldest_date > oldest), oldest),
+            else_=DataStats.oldest_date,
+        )
+        newest_date = case(
+            (or_(DataStats.newest_date.is_(None), DataStats.newest_date < newest), newest),
+            else_=DataStats.newest_date,
+        )
+    result = db.execute(
+        update(DataStats)
+        .where(DataStats.id == STATS_ROW_ID)
+        .values(
+            total_data_points=DataStats.total_data_points + count_delta,
+            oldest_date=oldest_date,
+            newest_date=newest_date,
+        )
+    )
+    if result.rowcount == 0:
+        rebuild_stats(db)
+
+
+def rebuild_stats(db: Session) -> None:
+    """Recompute the data_stats row with a full scan of data_points (does not commit)"""
+    total, oldest, newest = db.execute(
+        select(func.count(DataPoint.id), func.min(DataPoint.date), func.max(DataPoint.date))
+    ).one()
+    db.merge(DataStats(id=STATS_ROW_ID, total_data_points=total, oldest_date=oldest, newest_date=newest))
+    db.flush()
+
+
+def get_stats(db: Session) -> DataStats:
+    """The data_stats row, or an empty one if nothing has been recorded yet"""
+    return db.get(DataStats, STATS_ROW_ID) or DataStats(id=STATS_ROW_ID, total_data_points=0)
+
+
+def rebuild_snapshots(db: Session, batch_size: int = 50) -> int:
+    """Recompute snapshots for every indicator and the data_stats row (does not commit).
+
+    Returns the number of indicators processed.
+    """
+    indicator_ids = db.execute(select(Indicator.id).order_by(Indicator.id)).scalars().all()
+    for i in range(0, len(indicator_ids), batch_size):
+        refresh_snapshots(db, indicator_ids[i:i + batch_size])
+    rebuild_stats(db)
+    return len(indicator_ids)
+
+
+def backfill_if_empty(db: Session) -> None:
+    """Populate the snapshot and stats tables on first start after they were introduced"""
+    has_snapshots = db.execute(select(IndicatorSnapshot.indicator_id).limit(1)).first()
+    has_data = db.execute(select(DataPoint.id).limit(1)).first()
+    if not has_snapshots and has_data:
+        rebuild_snapshots(db)
+        db.commit()
+    elif db.get(DataStats, STATS_ROW_ID) is None:
+        rebuild_stats(db)
+        db.commit()
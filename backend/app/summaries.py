@@ -0,0 +1,59 @@
+"""
+Latest/previous value lookups shared by the read routers, served from the
+indicator_snapshots table (see app/snapshots.py).
+"""
+from datetime import date
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import IndicatorSnapshot
+
+
+class LatestValues(NamedTuple):
+    latest_value: Optional[float] = None
+    latest_date: Optional[date] = None
+    previous_value: Optional[float] = None
+
+    @property
+    def change_percent(self) -> Optional[float]:
+        if self.latest_value is None or self.previous_value is None or self.previous_value == 0:
+            return None
+        return round(((self.latest_value - self.previous_value) / abs(self.previous_value)) * 100, 2)
+
+
+def latest_values(
+    db: Session,
+    indicator_ids: Iterable[int],
+    series_type: str = "historical",
+) -> Dict[int, LatestValues]:
+    """Latest and previous point for every indicator in one indexed lookup.
+
+    Reports `series_type`; indicators without that series fall back to
+    whichever of their series has the newest point.
+    """
+    indicator_ids = list(indicator_ids)
+    if not indicator_ids:
+        return {}
+
+    snapshots = db.execute(
+        select(IndicatorSnapshot).where(IndicatorSnapshot.indicator_id.in_(indicator_ids))
+    ).scalars().all()
+
+    chosen = {}
+    for snapshot in snapshots:
+        current = chosen.get(snapshot.indicator_id)
+        if current is None or current.series_type != series_type and (
+            snapshot.series_type == series_type or snapshot.latest_date > current.latest_date
+        ):
+            chosen[snapshot.indicator_id] = snapshot
+
+    return {
+        indicator_id: LatestValues(
+            latest_value=snapshot.latest_value,
+            latest_date=snapshot.latest_date,
+            previous_value=snapshot.previous_value,
+        )
+        for indicator_id, snapshot in chosen.items()
+    }
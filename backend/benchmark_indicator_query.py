@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/indicators/{slug}?limit=N as history grows.
+
+Seeds a throwaway SQLite database with indicators of increasing history length
+and compares the SQL-limited endpoint against the old "load every ORM row and
+slice in Python" approach. Latency of the endpoint should stay flat.
+
+The response cache is disabled, so every request runs the query; with it on,
+repeated requests would only measure cache hits.
+
+Usage:
+  python benchmark_indicator_query.py
+  python benchmark_indicator_query.py --sizes 1000 10000 100000 --limit 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Point the app at a scratch database before it is imported
+_tmpdir = tempfile.mkdtemp(prefix="macro-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+# Measure the query, not the response cache in front of it
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi.testclient import TestClient
+from app.database import SessionLocal, engine
+from app.models import Category, Indicator, DataPoint
+from app.main import app
+
+
+def seed(sizes):
+    """Create one indicator per history size with a historical and an inflation-adjusted series"""
+    db = SessionLocal()
+    category = Category(name="Benchmark", slug="benchmark")
+    db.add(category)
+    db.flush()
+
+    start = date(1900, 1, 1)
+    for size in sizes:
+        indicator = Indicator(category_id=category.id, name=f"Bench {size}", slug=f"bench-{size}")
+        db.add(indicator)
+        db.flush()
+        for series_type in ("historical", "inflation_adjusted"):
+            db.execute(DataPoint.__table__.insert(), [
+                {
+                    "indicator_id": indicator.id,
+                    "series_type": series_type,
+                    "date": start + timedelta(days=i),
+                    "value": 100.0 + i * 0.01,
+                }
+                for i in range(size)
+            ])
+    db.commit()
+    db.close()
+
+
+def legacy_query(slug, limit):
+    """The pre-SQL-limit implementation: hydrate every row, slice per series"""
+    db = SessionLocal()
+    try:
+        indicator = db.query(Indicator).filter(Indicator.slug == slug).first()
+        rows = db.query(DataPoint).filter(
+            DataPoint.indicator_id == indicator.id
+        ).order_by(DataPoint.series_type, DataPoint.date).all()
+        series = {}
+        for dp in rows:
+            series.setdefault(dp.series_type, []).append(dp)
+        return {k: v[-limit:] for k, v in series.items()}
+    finally:
+        db.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🗄️  Seeding {_tmpdir}/bench.db ...")
+    seed(args.sizes)
+    client = TestClient(app)
+
+    print("\nEndpoint timings are uncached (response cache disabled)")
+    print(f"\n{'rows/series':>12} | {'endpoint ms':>12} | {'legacy ms':>10}")
+    print("-" * 42)
+    for size in args.sizes:
+        slug = f"bench-{size}"
+        url = f"/api/indicators/{slug}?limit={args.limit}"
+        assert client.get(url).status_code == 200
+
+        endpoint_ms = timed(lambda: client.get(url), args.repeat)
+        legacy_ms = timed(lambda: legacy_query(slug, args.limit), args.repeat)
+        print(f"{size:>12,} | {endpoint_ms:>12.1f} | {legacy_ms:>10.1f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data collectors offline against recorded pages.
+
+Serves the pages in benchmark_fixtures/ (HTML and JSON, described by
+manifest.json) from local HTTP servers, one per simulated host on
+127.0.0.1, 127.0.0.2, ...; each server adds latency, can fail a share of
+requests with 503s, can hang entirely (dead hosts) and answers
+If-None-Match with 304s. A throwaway SQLite database is seeded with
+indicators pointing at those pages, then each target collects them all:
+
+  scheduler   DataCollectorScheduler.collect_all_indicators()
+  admin       POST /api/admin/collect-all-data
+  admin-job   POST /api/admin/collect-all-data?background=true, polled to completion
+
+Reported per run: indicators per second, p50/p99 latency per page fetch,
+CPU time spent parsing and extracting, requests served (and 304s), and
+indicators that failed or saved a value other than the recorded one.
+
+Usage:
+  python benchmark_scraping.py
+  python benchmark_scraping.py --indicators 500 --hosts 10 --latency-ms 150 --fail-rate 0.05 --dead-hosts 1
+  python benchmark_scraping.py --targets admin --repeat 3 --json bench.json --min-rate 20
+  python benchmark_scraping.py --record https://example.com/quote --expression ".price" --name example_quote
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "benchmark_fixtures"
+ROOT = Path(__file__).resolve().parent.parent
+
+WORDS = ("inflation yields futures demand supply central bank rates outlook traders session "
+         "volatility earnings guidance commodities currency policy growth data release").split()
+SYMBOLS = ("EUR/USD", "USD/JPY", "S&P 500", "Nasdaq", "DAX", "FTSE 100", "Nikkei", "Bitcoin", "Platinum", "Corn")
+
+
+# --- Fixtures ------------------------------------------------------------
+
+def filler(kb, seed):
+    """Related-news markup standing in for the bulk of a real quote page"""
+    rng = random.Random(seed)
+    blocks, size, i = [], 0, 0
+    while size < kb * 1024:
+        block = (
+            f'<article class="news-item"><a href="/news/{i}-{rng.randrange(10 ** 6)}">Markets wrap: stocks '
+            f'{rng.choice(("edge higher", "slip", "rally", "hold steady"))} as traders weigh data</a>'
+            f'<p class="summary">{" ".join(rng.choice(WORDS) for _ in range(30))}</p>'
+            f'<table class="related"><tr><td>{rng.choice(SYMBOLS)}</td><td>{rng.uniform(1, 5000):.2f}</td>'
+            f'<td>{rng.uniform(-3, 3):+.2f}%</td></tr></table></article>\n'
+        )
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    return "".join(blocks)
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for entry in json.loads((directory / "manifest.json").read_text()):
+        body = (directory / entry["file"]).read_text(encoding="utf-8")
+        body = body.replace("<!-- filler -->", filler(entry.get("pad_kb", 0), entry["file"]))
+        fixtures.append({**entry, "body": body.encode("utf-8")})
+    return fixtures
+
+
+def record(args):
+    """Save a live page as a fixture, with the value the current extractor finds on it"""
+    sys.path.insert(0, str(ROOT))
+    from backend.app.extractors import extract
+    from backend.app.http_client import Page, get_session
+    from backend.app.scraping import DEFAULT_HEADERS
+
+    response = get_session().get(args.record, headers=DEFAULT_HEADERS, timeout=30)
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "text/html")
+    page = Page(args.record, response.content, response.encoding, content_type)
+    found = extract(page, args.expression, args.extractor_type, fallback=False)
+    if found.value is None:
+        sys.exit(f"❌ '{args.expression}' ({args.extractor_type}) finds nothing on {args.record}")
+
+    name = args.name + (".json" if "json" in content_type else ".html")
+    (args.fixtures / name).write_bytes(response.content)
+    manifest_path = args.fixtures / "manifest.json"
+    manifest = [entry for entry in json.loads(manifest_path.read_text()) if entry["file"] != name]
+    manifest.append({
+        "file": name, "content_type": content_type, "pad_kb": 0,
+        "extractor_type": args.extractor_type, "expression": args.expression, "expected": found.value,
+    })
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n")
+    print(f"📼 Recorded {args.record} as {name} (expected value {found.value})")
+
+
+# --- Local HTTP stand-in -------------------------------------------------
+
+class FixtureServer:
+    """One simulated host: serves fixture pages with latency, failures and ETags"""
+
+    def __init__(self, address, pages, latency, jitter, fail_rate, dead, etags, stats):
+        self.pages = pages  # path -> (body, content_type, etag)
+        self.stopping = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stats["requests"] += 1
+                if dead:
+                    # Hang past any client timeout, like an unresponsive site
+                    server.stopping.wait(60)
+                    self.close_connection = True
+                    return
+                time.sleep(max(latency * (1 + random.uniform(-jitter, jitter)), 0))
+                if self.path not in server.pages:
+                    self.send_error(404)
+                    return
+                if random.random() < fail_rate:
+                    stats["failures_injected"] += 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, content_type, etag = server.pages[self.path]
+                if etags and self.headers.get("If-None-Match") == etag:
+                    stats["not_modified"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etags:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(address, Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def host_addresses(count):
+    """127.0.0.1, 127.0.0.2, ... where the OS routes them (Linux); otherwise 127.0.0.1 only"""
+    import socket
+    addresses = []
+    for i in range(count):
+        candidate = f"127.0.0.{i + 1}"
+        try:
+            with socket.socket() as probe:
+                probe.bind((candidate, 0))
+            addresses.append(candidate)
+        except OSError:
+            break
+    return addresses or ["127.0.0.1"]
+
+
+def start_hosts(args, fixtures, stats):
+    """Servers and the indicator definitions pointing at them"""
+    addresses = host_addresses(args.hosts)
+    if len(addresses) < args.hosts:
+        print(f"⚠️  Only {len(addresses)} loopback address(es) usable; simulated hosts share them by port")
+    pages_per_host = [dict() for _ in range(args.hosts)]
+    placements = []
+    for i in range(args.indicators):
+        fixture = fixtures[i % len(fixtures)]
+        host = i % args.hosts
+        path = f"/{fixture['file']}/{i // (args.indicators_per_page * args.hosts * len(fixtures))}"
+        etag = '"' + hashlib.sha1(fixture["body"] + path.encode()).hexdigest()[:16] + '"'
+        pages_per_host[host][path] = (fixture["body"], fixture["content_type"], etag)
+        placements.append((host, path, fixture))
+
+    servers = [
+        FixtureServer(
+            (addresses[host % len(addresses)], 0), pages, args.latency_ms / 1000, args.jitter, args.fail_rate,
+            host < args.dead_hosts, not args.no_etags, stats,
+        )
+        for host, pages in enumerate(pages_per_host)
+    ]
+    indicators = [
+        {
+            "slug": f"bench-{i}",
+            "scrape_url": servers[host].base_url + path,
+            "extractor_type": fixture["extractor_type"],
+            "html_selector": fixture["expression"],
+            "expected": fixture["expected"],
+        }
+        for i, (host, path, fixture) in enumerate(placements)
+    ]
+    return servers, indicators
+
+
+# --- Instrumentation -----------------------------------------------------
+
+class Probe:
+    """Times every page fetch and the CPU spent in extraction (including parsing)"""
+
+    def __init__(self, scraping):
+        self.fetch_ms = []
+        self.parse_cpu = 0.0
+        self._lock = threading.Lock()
+        fetch_page, extract = scraping.fetch_page, scraping.extract
+
+        def timed_fetch(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fetch_page(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.fetch_ms.append((time.perf_counter() - started) * 1000)
+
+        def timed_extract(*args, **kwargs):
+            started = time.thread_time()
+            try:
+                return extract(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.parse_cpu += time.thread_time() - started
+
+        scraping.fetch_page = timed_fetch
+        scraping.extract = timed_extract
+
+    def reset(self):
+        with self._lock:
+            self.fetch_ms = []
+            self.parse_cpu = 0.0
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+# --- Targets -------------------------------------------------------------
+
+def run_scheduler(modules):
+    modules["scheduler"].DataCollectorScheduler().collect_all_indicators()
+
+
+def run_admin(modules):
+    response = modules["client"].post("/api/admin/collect-all-data", params={"admin_token": "admin"})
+    assert response.status_code == 200, response.text
+
+
+def run_admin_job(modules):
+    client = modules["client"]
+    response = client.post("/api/admin/collect-all-data", params={"admin_token": "admin", "background": True})
+    assert response.status_code == 202, response.text
+    job_url = f"/api/admin/jobs/{response.json()['job_id']}"
+    while True:
+        job = client.get(job_url, params={"admin_token": "admin"}).json()
+        if job["status"] in ("succeeded", "failed"):
+            assert job["status"] == "succeeded", job.get("error")
+            return
+        time.sleep(0.05)
+
+
+TARGETS = {"scheduler": run_scheduler, "admin": run_admin, "admin-job": run_admin_job}
+
+
+def load_app(args, workdir):
+    """Import the app against the scratch database, with the benchmark's scraping settings"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["SCRAPE_HOST_INTERVAL_SECONDS"] = str(args.host_interval)
+    os.environ["SCRAPE_PER_HOST_CONCURRENCY"] = str(args.per_host)
+    os.environ["SCRAPE_REQUEST_TIMEOUT_SECONDS"] = str(args.request_timeout)
+    # The scheduler logs to logs/ relative to the working directory
+    os.chdir(workdir)
+    os.makedirs("logs", exist_ok=True)
+    sys.path.insert(0, str(ROOT))
+
+    import logging
+    from fastapi.testclient import TestClient
+
+    import universal_data_scheduler
+    from backend.app import models, scraping
+    from backend.app.database import Base, SessionLocal, engine
+    from backend.app.http_client import validators
+    from backend.app.main import app
+
+    for noisy in (universal_data_scheduler.__name__, "httpx"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    Base.metadata.create_all(bind=engine)
+    return {
+        "scheduler": universal_data_scheduler, "models": models, "scraping": scraping,
+        "SessionLocal": SessionLocal, "engine": engine, "validators": validators, "client": TestClient(app),
+    }
+
+
+def seed(modules, indicators):
+    models = modules["models"]
+    db = modules["SessionLocal"]()
+    category = models.Category(name="Benchmark", slug="benchmark")
+    db.add(category)
+    db.flush()
+    for spec in indicators:
+        db.add(models.Indicator(
+            category_id=category.id, name=spec["slug"].title(), slug=spec["slug"], unit="USD", frequency="daily",
+            scrape_url=spec["scrape_url"], html_selector=spec["html_selector"], extractor_type=spec["extractor_type"],
+        ))
+    db.commit()
+    db.close()
+
+
+def reset_run(modules):
+    """Forget today's results so every run collects everything again"""
+    models = modules["models"]
+    db = modules["SessionLocal"]()
+    for model in (models.DataPoint, models.IntradayObservation, models.DailyBar, models.CollectionSchedule, models.IndicatorSnapshot):
+        db.query(model).delete()
+    db.commit()
+    db.close()
+    modules["scraping"].host_health.clear()
+
+
+def check_values(modules, indicators):
+    """(failed, wrong): indicators without today's value, and ones whose value differs from the recording"""
+    models = modules["models"]
+    db = modules["SessionLocal"]()
+    ids = dict(db.query(models.Indicator.slug, models.Indicator.id))
+    saved = dict(db.query(models.DataPoint.indicator_id, models.DataPoint.value))
+    db.close()
+    failed = wrong = 0
+    for spec in indicators:
+        value = saved.get(ids[spec["slug"]])
+        if value is None:
+            failed += 1
+        elif not math.isclose(value, spec["expected"], rel_tol=1e-9):
+            wrong += 1
+    return failed, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=["scheduler", "admin", "admin-job"])
+    parser.add_argument("--indicators", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--indicators-per-page", type=int, default=2, help="indicators sharing one page")
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency varies by ± this fraction")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--dead-hosts", type=int, default=0, help="hosts that never answer")
+    parser.add_argument("--no-etags", action="store_true", help="serve without ETags (no 304 revalidation)")
+    parser.add_argument("--host-interval", type=float, default=0.05, help="SCRAPE_HOST_INTERVAL_SECONDS")
+    parser.add_argument("--per-host", type=int, default=2, help="SCRAPE_PER_HOST_CONCURRENCY")
+    parser.add_argument("--request-timeout", type=float, default=3, help="SCRAPE_REQUEST_TIMEOUT_SECONDS")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per target (later runs revalidate with ETags)")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("--min-rate", type=float, help="exit 1 if any run collects fewer indicators per second")
+    parser.add_argument("--record", metavar="URL", help="record URL as a new fixture instead of benchmarking")
+    parser.add_argument("--expression", help="with --record: the expression to extract")
+    parser.add_argument("--extractor-type", default="css", help="with --record: css, xpath, jsonpath or regex")
+    parser.add_argument("--name", help="with --record: fixture file name without extension")
+    args = parser.parse_args()
+    args.fixtures = args.fixtures.resolve()
+    if args.json:
+        args.json = args.json.resolve()
+
+    if args.record:
+        if not (args.expression and args.name):
+            parser.error("--record needs --expression and --name")
+        record(args)
+        return
+
+    fixtures = load_fixtures(args.fixtures)
+    stats = Counter()
+    servers, indicators = start_hosts(args, fixtures, stats)
+    workdir = tempfile.mkdtemp(prefix="macro-scrape-bench-")
+    print(f"🗄️  Seeding {workdir}/bench.db with {len(indicators)} indicators on {args.hosts} hosts "
+          f"({len(fixtures)} fixtures, {args.latency_ms:.0f}ms ± {args.jitter:.0%}, "
+          f"{args.fail_rate:.0%} failures, {args.dead_hosts} dead)")
+    modules = load_app(args, workdir)
+    seed(modules, indicators)
+    probe = Probe(modules["scraping"])
+
+    rows = []
+    try:
+        for target in args.targets:
+            modules["validators"].clear()
+            for run in range(1, args.repeat + 1):
+                reset_run(modules)
+                probe.reset()
+                stats.clear()
+                started = time.perf_counter()
+                TARGETS[target](modules)
+                seconds = time.perf_counter() - started
+                failed, wrong = check_values(modules, indicators)
+                rows.append({
+                    "target": target,
+                    "run": run,
+                    "indicators": len(indicators),
+                    "seconds": round(seconds, 3),
+                    "indicators_per_second": round(len(indicators) / seconds, 1),
+                    "fetch_p50_ms": round(percentile(probe.fetch_ms, 0.50), 1),
+                    "fetch_p99_ms": round(percentile(probe.fetch_ms, 0.99), 1),
+                    "parse_cpu_ms": round(probe.parse_cpu * 1000, 1),
+                    "requests": stats["requests"],
+                    "not_modified": stats["not_modified"],
+                    "failures_injected": stats["failures_injected"],
+                    "failed": failed,
+                    "wrong": wrong,
+                })
+    finally:
+        for server in servers:
+            server.stop()
+        modules["engine"].dispose()
+
+    header = (f"{'target':>10} | {'run':>3} | {'sec':>6} | {'ind/s':>6} | {'p50 ms':>7} | {'p99 ms':>7} | "
+              f"{'parse ms':>8} | {'reqs':>5} | {'304':>4} | {'failed':>6} | {'wrong':>5}")
+    print("\n" + header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['target']:>10} | {row['run']:>3} | {row['seconds']:>6.2f} | {row['indicators_per_second']:>6.1f} | "
+              f"{row['fetch_p50_ms']:>7.1f} | {row['fetch_p99_ms']:>7.1f} | {row['parse_cpu_ms']:>8.1f} | "
+              f"{row['requests']:>5} | {row['not_modified']:>4} | {row['failed']:>6} | {row['wrong']:>5}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"settings": {k: str(v) for k, v in vars(args).items()}, "runs": rows}, indent=2))
+    if args.min_rate is not None and any(row["indicators_per_second"] < args.min_rate for row in rows):
+        sys.exit(f"❌ Throughput below {args.min_rate} indicators/s")
+
+
+if __name__ == "__main__":
+    main()
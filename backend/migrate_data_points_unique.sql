@@ -0,0 +1,17 @@
+-- One data point per (indicator_id, series_type, date), required by the CSV upsert
+-- Run this on your Railway PostgreSQL database (new databases get it from create_all)
+
+-- Step 1: Remove duplicate points, keeping the most recently inserted one
+DELETE FROM macro_indicators.data_points dp
+USING macro_indicators.data_points newer
+WHERE dp.indicator_id = newer.indicator_id
+  AND dp.series_type = newer.series_type
+  AND dp.date = newer.date
+  AND dp.id < newer.id;
+
+-- Step 2: Add the unique constraint; its index serves per-series "latest N points" and range scans
+ALTER TABLE macro_indicators.data_points
+    ADD CONSTRAINT uq_data_points_indicator_series_date UNIQUE (indicator_id, series_type, date);
+
+-- Step 3: Rebuild snapshots and totals afterwards:
+--   POST /api/admin/rebuild-snapshots?admin_token=TOKEN
@@ -0,0 +1,8 @@
+-- Per-indicator extractor choice (css, xpath, jsonpath, regex) for app/extractors.py.
+-- html_selector is widened because JSONPath and regex expressions run longer than CSS selectors.
+
+ALTER TABLE macro_indicators.indicators
+    ADD COLUMN IF NOT EXISTS extractor_type VARCHAR(20) NOT NULL DEFAULT 'css';
+
+ALTER TABLE macro_indicators.indicators
+    ALTER COLUMN html_selector TYPE VARCHAR(500);
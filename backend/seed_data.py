@@ -14,7 +14,8 @@ from collections import defaultdict
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.database import SessionLocal, engine, Base
-from app.models import Category, Indicator, DataPoint, SERIES_TYPE_MAP
+from app.models import Category, Indicator, DataPoint, IndicatorSnapshot, SERIES_TYPE_MAP
+from app.snapshots import rebuild_snapshots
 
 # Path to the data folder - Update this path to point to your local data directory
 DATA_DIR = Path(os.environ.get("MACRO_DATA_DIR", str(Path(__file__).parent / "data" / "organized")))
@@ -167,6 +168,7 @@ def seed_database():
         # Clear existing data
         print("Clearing existing data...")
         db.query(DataPoint).delete()
+        db.query(IndicatorSnapshot).delete()
         db.query(Indicator).delete()
         db.query(Category).delete()
         db.commit()
@@ -274,6 +276,10 @@ def seed_database():
             
             db.commit()
         
+        print("\nBuilding indicator snapshots...")
+        rebuild_snapshots(db)
+        db.commit()
+        
         print(f"\n{'='*50}")
         print(f"Seeding complete!")
         print(f"  Categories: {len(category_map)}")
@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+# Run the app against a scratch SQLite database
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='macro-tests-')}/test.db"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.cache import response_cache
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import Category, DataPoint, Indicator
+from app.scraping import host_health
+from app.snapshots import refresh_snapshots
+
+
+@pytest.fixture(autouse=True)
+def healthy_hosts():
+    # Circuit breaker state is process-wide; don't let one test's failures leak into the next
+    host_health.clear()
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting the SQL statements executed inside it.
+
+    The per-request revision lookup done for ETags is left out unless
+    `include_revisions` is set, so counts reflect the endpoint's own queries.
+    """
+    @contextmanager
+    def counter(include_revisions=False):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if include_revisions or "resource_revisions" not in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counter
+
+
+def make_indicator(db, category, slug, points=0, start=date(2020, 1, 1), series_type="historical"):
+    indicator = Indicator(category_id=category.id, name=slug.title(), slug=slug, unit="USD")
+    db.add(indicator)
+    db.flush()
+    db.add_all([
+        DataPoint(indicator_id=indicator.id, series_type=series_type, date=start + timedelta(days=i), value=100.0 + i)
+        for i in range(points)
+    ])
+    refresh_snapshots(db, [indicator.id])
+    db.commit()
+    return indicator
+
+
+def make_category(db, slug="market-indexes"):
+    category = Category(name=slug.replace("-", " ").title(), slug=slug)
+    db.add(category)
+    db.commit()
+    return category
@@ -0,0 +1,91 @@
+import io
+import sys
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.arrow_export import ARROW_STREAM, PARQUET, negotiate
+from app.models import DataPoint
+
+from .conftest import make_category, make_indicator
+
+
+def read(response):
+    if response.headers["content-type"] == PARQUET:
+        return pq.read_table(io.BytesIO(response.content))
+    return pa.ipc.open_stream(response.content).read_all()
+
+
+def test_negotiate_picks_the_binary_type_from_accept():
+    assert negotiate(None) is None
+    assert negotiate("text/html, application/json") is None
+    assert negotiate(f"application/json;q=0.5, {PARQUET};q=0.9") == PARQUET
+    assert negotiate(ARROW_STREAM.upper()) == ARROW_STREAM
+    assert negotiate(f"{ARROW_STREAM};q=0") is None
+    assert negotiate(f"{ARROW_STREAM}; q=0.0, application/json") is None
+    assert negotiate(f"{ARROW_STREAM};q=0.2, {PARQUET};q=0.8") == PARQUET
+
+
+def test_indicator_series_as_arrow_and_parquet(client, db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold", points=3)
+    db.add(DataPoint(indicator_id=gold.id, series_type="annual_change", date=date(2020, 1, 3), value=2.5))
+    db.commit()
+
+    for media_type in (ARROW_STREAM, PARQUET):
+        response = client.get("/api/indicators/gold", headers={"Accept": media_type})
+        assert response.headers["content-type"] == media_type
+        table = read(response)
+        assert table.column_names == ["slug", "series_type", "date", "value"]
+        assert table.column("series_type").to_pylist() == ["historical"] * 3 + ["annual_change"]
+        assert table.column("date").to_pylist()[:3] == [date(2020, 1, d) for d in (1, 2, 3)]
+        assert table.column("value").to_pylist() == [100.0, 101.0, 102.0, 2.5]
+
+    # JSON is still the default, and what a client refusing Arrow gets
+    assert client.get("/api/indicators/gold").headers["content-type"] == "application/json"
+    refused = client.get("/api/indicators/gold", headers={"Accept": f"{ARROW_STREAM};q=0"})
+    assert refused.headers["content-type"] == "application/json"
+
+
+def test_export_streams_several_indicators(client, db, monkeypatch):
+    from app.routers import export
+
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 2)
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+    make_indicator(db, category, "silver", points=2)
+
+    for media_type in (ARROW_STREAM, PARQUET):
+        response = client.get("/api/export/indicators", params={"slugs": ["silver", "gold"]}, headers={"Accept": media_type})
+        assert response.status_code == 200
+        table = read(response)
+        assert table.column("slug").to_pylist() == ["gold"] * 3 + ["silver"] * 2
+        assert table.num_rows == 5
+
+    # Arrow is the default; a range with no data is an empty but valid stream
+    response = client.get("/api/export/indicators", params={"slugs": ["gold"], "start_date": "2030-01-01"})
+    assert response.headers["content-type"] == ARROW_STREAM
+    empty = read(response)
+    assert empty.num_rows == 0 and empty.column_names == ["slug", "series_type", "date", "value"]
+
+    missing = client.get("/api/export/indicators", params={"slugs": ["gold", "platinum"]})
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == "Indicators not found: platinum"
+
+
+def test_an_indicator_named_export_is_reachable(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "export", points=2)
+
+    assert client.get("/api/indicators/export").json()["slug"] == "export"
+
+
+def test_binary_requests_are_406_without_pyarrow(client, db, monkeypatch):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    assert client.get("/api/export/indicators", params={"slugs": ["gold"]}).status_code == 406
+    assert client.get("/api/indicators/gold", headers={"Accept": PARQUET}).status_code == 406
+    assert client.get("/api/indicators/gold").status_code == 200
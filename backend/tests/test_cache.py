@@ -0,0 +1,53 @@
+from .conftest import make_category, make_indicator
+
+
+def test_reads_are_cached_until_an_admin_write(client, db, count_queries):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+
+    first = client.get("/api/indicators/gold")
+    assert first.headers["X-Cache"] == "MISS"
+    with count_queries() as statements:
+        second = client.get("/api/indicators/gold")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert statements == []
+
+    # Different query parameters are cached separately
+    assert client.get("/api/indicators/gold?limit=1").headers["X-Cache"] == "MISS"
+    assert client.get("/api/categories/market-indexes").headers["X-Cache"] == "MISS"
+
+    client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", "date,value\n2021-01-01,5\n", "text/csv")},
+        data={"admin_token": "admin"},
+    )
+    third = client.get("/api/indicators/gold")
+    assert third.headers["X-Cache"] == "MISS"
+    assert third.json()["data_points"][-1]["value"] == 5.0
+    assert client.get("/api/categories/market-indexes").json()["indicators"][0]["latest_value"] == 5.0
+
+    stats = client.get("/api/admin/cache-stats", params={"admin_token": "admin"}).json()
+    assert stats["hits"] >= 1 and stats["misses"] >= 4
+
+
+def test_creating_an_indicator_without_valid_rows_invalidates_listings(client, db):
+    make_category(db)
+    client.get("/api/indicators")
+    client.get("/api/categories/market-indexes")
+    etag = client.get("/api/indicators").headers["ETag"]
+
+    response = client.post(
+        "/api/admin/create-indicator-from-csv",
+        files={"file": ("x.csv", "date,value\nnot-a-date,1\n", "text/csv")},
+        data={"admin_token": "admin", "name": "X", "slug": "x", "category_slug": "market-indexes"},
+    )
+    assert response.status_code == 200
+
+    listing = client.get("/api/indicators")
+    assert listing.headers["X-Cache"] == "MISS"
+    assert [i["slug"] for i in listing.json()] == ["x"]
+    assert client.get("/api/indicators", headers={"If-None-Match": etag}).status_code == 200
+    category = client.get("/api/categories/market-indexes")
+    assert category.headers["X-Cache"] == "MISS"
+    assert [i["slug"] for i in category.json()["indicators"]] == ["x"]
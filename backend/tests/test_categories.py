@@ -0,0 +1,32 @@
+import pytest
+
+from .conftest import make_category, make_indicator
+
+
+def test_category_returns_latest_and_previous(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+    make_indicator(db, category, "empty")
+
+    body = client.get("/api/categories/market-indexes").json()
+    gold, empty = body["indicators"]
+
+    assert gold["latest_value"] == 102.0
+    assert gold["latest_date"] == "2020-01-03"
+    assert gold["previous_value"] == 101.0
+    assert gold["change_percent"] == round(1 / 101 * 100, 2)
+    assert empty["latest_value"] is None and empty["previous_value"] is None
+
+
+@pytest.mark.parametrize("n_indicators", [1, 5, 25])
+def test_category_query_count_is_constant(client, db, count_queries, n_indicators):
+    category = make_category(db)
+    for i in range(n_indicators):
+        make_indicator(db, category, f"ind-{i}", points=3)
+
+    with count_queries() as statements:
+        response = client.get("/api/categories/market-indexes")
+
+    assert response.status_code == 200
+    assert len(response.json()["indicators"]) == n_indicators
+    assert len(statements) == 3
@@ -0,0 +1,99 @@
+from datetime import date
+
+from app import collection, schedule
+from app.models import DailyBar, DataPoint, IndicatorSnapshot
+from app.scraping import ScrapeOutcome
+
+from .conftest import make_category, make_indicator
+
+
+def test_collectable_indicators_is_one_query(db, count_queries):
+    category = make_category(db)
+    today = date.today()
+    scraped = make_indicator(db, category, "gold")
+    scraped.scrape_url, scraped.html_selector = "https://quotes.example/gold", ".price"
+    done = make_indicator(db, category, "silver", points=1, start=today)
+    make_indicator(db, category, "oil", points=3)
+    make_indicator(db, category, "idle")
+    db.commit()
+
+    with count_queries() as statements:
+        entries = collection.collectable_indicators(db, today)
+
+    assert len(statements) == 1
+    assert [(entry.indicator.slug, entry.has_today, entry.scrapable) for entry in entries] == [
+        ("gold", False, True), ("silver", True, False), ("oil", False, False),
+    ]
+    assert entries[1].today_value == 100.0
+    assert done.id == entries[1].indicator.id
+
+
+def test_collect_all_saves_the_run_in_one_batch(db, monkeypatch):
+    category = make_category(db)
+    indicators = [make_indicator(db, category, slug) for slug in ("gold", "silver", "copper")]
+    for indicator in indicators:
+        indicator.scrape_url, indicator.html_selector = f"https://quotes.example/{indicator.slug}", ".price"
+    db.commit()
+    gold, silver, copper = (indicator.id for indicator in indicators)
+
+    monkeypatch.setattr(collection, "scrape_targets", lambda targets, **kwargs: {
+        gold: ScrapeOutcome(10.0, matched=".price"),
+        silver: ScrapeOutcome(20.0, matched=".price"),
+        copper: ScrapeOutcome(None, "No value found for selector"),
+    })
+
+    result = collection.collect_all(db)
+    assert result["summary"] == {"total_processed": 3, "successful": 2, "failed": 1}
+    values = {point.indicator_id: point.value for point in db.query(DataPoint)}
+    assert values == {gold: 10.0, silver: 20.0}
+    assert db.get(IndicatorSnapshot, (gold, "historical")).latest_value == 10.0
+
+    # A later run keeps every reading; today's point follows the latest one
+    monkeypatch.setattr(collection, "scrape_targets", lambda targets, **kwargs: {
+        gold: ScrapeOutcome(12.0, matched=".price"),
+        silver: ScrapeOutcome(None, "Read timed out"),
+        copper: ScrapeOutcome(None, "No value found for selector"),
+    })
+    statuses = [r["status"] for r in collection.collect_all(db)["results"]]
+    assert statuses == ["collected", "existing", "failed"]
+    db.expire_all()
+    values = {point.indicator_id: point.value for point in db.query(DataPoint)}
+    assert values == {gold: 12.0, silver: 20.0}
+    bar = db.get(DailyBar, (gold, date.today()))
+    assert (bar.open, bar.high, bar.low, bar.close, bar.observations) == (10.0, 12.0, 10.0, 12.0, 2)
+
+
+def test_concurrent_collectors_scrape_each_indicator_once(db, monkeypatch):
+    import threading
+
+    from app.database import SessionLocal
+
+    monkeypatch.setattr(schedule.settings, "collection_claim_batch", 2)
+    category = make_category(db)
+    for i in range(8):
+        indicator = make_indicator(db, category, f"series-{i}")
+        indicator.scrape_url, indicator.html_selector = f"https://quotes.example/{i}", ".price"
+    db.commit()
+
+    scraped = []
+    lock = threading.Lock()
+
+    def scrape(targets, **kwargs):
+        with lock:
+            scraped.extend(key for key, *_ in targets)
+        return {key: ScrapeOutcome(1.0, matched=".price") for key, *_ in targets}
+
+    monkeypatch.setattr(collection, "scrape_targets", scrape)
+
+    def run():
+        with SessionLocal() as session:
+            collection.collect_all(session, due_only=True)
+
+    workers = [threading.Thread(target=run) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(scraped) == sorted(set(scraped)) and len(scraped) == 8
+    assert db.query(DataPoint).count() == 8
@@ -0,0 +1,39 @@
+from datetime import date
+
+from app.models import DataPoint
+
+from .conftest import make_category, make_indicator
+
+EPOCH = date(1970, 1, 1)
+
+
+def test_columnar_returns_parallel_arrays_with_epoch_days(client, db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold", points=3)
+    db.add(DataPoint(indicator_id=gold.id, series_type="annual_change", date=date(2020, 1, 2), value=1.5))
+    db.commit()
+
+    body = client.get("/api/indicators/gold", params={"format": "columnar"}).json()
+
+    assert (body["format"], body["date_encoding"], body["slug"]) == ("columnar", "epoch_days", "gold")
+    assert "data_points" not in body
+    historical, annual_change = body["series"]
+    assert historical["series_type"] == "historical"
+    assert historical["dates"] == [(date(2020, 1, d) - EPOCH).days for d in (1, 2, 3)]
+    assert historical["values"] == [100.0, 101.0, 102.0]
+    assert (annual_change["label"], annual_change["dates"], annual_change["values"]) == (
+        "Annual % Change", [(date(2020, 1, 2) - EPOCH).days], [1.5],
+    )
+
+
+def test_columnar_matches_the_default_shape(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=200)
+    params = {"points": 20, "series": "historical"}
+
+    rows = client.get("/api/indicators/gold", params=params).json()["series"][0]["data_points"]
+    columns = client.get("/api/indicators/gold", params={**params, "format": "columnar"}).json()["series"][0]
+
+    assert [(EPOCH.toordinal() + d) for d in columns["dates"]] == [date.fromisoformat(r["date"]).toordinal() for r in rows]
+    assert columns["values"] == [r["value"] for r in rows]
+    assert client.get("/api/indicators/gold", params={"format": "csv"}).status_code == 422
@@ -0,0 +1,38 @@
+from .conftest import make_category, make_indicator
+
+
+def test_etag_round_trip_skips_data_queries(client, db, count_queries):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+
+    first = client.get("/api/categories/market-indexes")
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+
+    with count_queries(include_revisions=True) as statements:
+        second = client.get("/api/categories/market-indexes", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert len(statements) == 1 and "resource_revisions" in statements[0]
+
+    since = client.get("/api/categories/market-indexes", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+    client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", "date,value\n2021-01-01,5\n", "text/csv")},
+        data={"admin_token": "admin"},
+    )
+    third = client.get("/api/categories/market-indexes", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
+
+
+def test_etag_depends_on_query_and_accept(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+
+    plain = client.get("/api/indicators/gold").headers["ETag"]
+    limited = client.get("/api/indicators/gold?limit=1").headers["ETag"]
+    columnar = client.get("/api/indicators/gold?format=columnar").headers["ETag"]
+    assert len({plain, limited, columnar}) == 3
@@ -0,0 +1,51 @@
+from datetime import date
+
+from app import csv_export
+from app.models import DataPoint
+
+from .conftest import make_category, make_indicator
+
+
+def test_encode_yields_batches_and_pivot_fills_gaps(monkeypatch):
+    monkeypatch.setattr(csv_export, "CSV_BATCH_ROWS", 2)
+    chunks = list(csv_export.encode(["date", "value"], [(1, 2.0)] * 5))
+    assert chunks == [b"date,value\n1,2.0\n1,2.0\n", b"1,2.0\n1,2.0\n", b"1,2.0\n"]
+
+    rows = [(1, "a", 1.0), (1, "b", 2.0), (2, "b", 3.0)]
+    assert list(csv_export.pivot(rows, ["a", "b"])) == [(1, 1.0, 2.0), (2, None, 3.0)]
+
+
+def test_download_csv_streams_batches(client, db, monkeypatch):
+    monkeypatch.setattr(csv_export, "CSV_BATCH_ROWS", 2)
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=5)
+    make_indicator(db, category, "empty")
+
+    response = client.get("/api/admin/download-csv/gold", params={"admin_token": "admin"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == "attachment; filename=gold_historical.csv"
+    assert response.text.splitlines() == ["date,value"] + [f"2020-01-0{i + 1},{100.0 + i}" for i in range(5)]
+
+    missing = client.get("/api/admin/download-csv/empty", params={"admin_token": "admin"})
+    assert missing.status_code == 404
+
+
+def test_download_csv_wide_has_a_column_per_series(client, db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold", points=3)
+    db.add_all([
+        DataPoint(indicator_id=gold.id, series_type="annual_change", date=date(2020, 1, 2), value=1.5),
+        DataPoint(indicator_id=gold.id, series_type="annual_change", date=date(2020, 1, 4), value=2.5),
+        DataPoint(indicator_id=gold.id, series_type="futures", date=date(2020, 1, 1), value=99.0),
+    ])
+    db.commit()
+
+    response = client.get("/api/admin/download-csv/gold", params={"admin_token": "admin", "wide": True})
+    assert response.headers["content-disposition"] == "attachment; filename=gold_all_series.csv"
+    assert response.text.splitlines() == [
+        "date,historical,annual_change,futures",
+        "2020-01-01,100.0,,99.0",
+        "2020-01-02,101.0,1.5,",
+        "2020-01-03,102.0,,",
+        "2020-01-04,,2.5,",
+    ]
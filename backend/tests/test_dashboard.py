@@ -0,0 +1,37 @@
+import pytest
+
+from .conftest import make_category, make_indicator
+
+
+@pytest.mark.parametrize("n_cards", [1, 10])
+def test_dashboard_is_one_query(client, db, count_queries, n_cards):
+    category = make_category(db)
+    slugs = [f"card-{i}" for i in range(n_cards)]
+    for slug in slugs:
+        make_indicator(db, category, slug, points=20)
+    client.put("/api/admin/dashboard-indicators", params={"admin_token": "admin"}, json=slugs)
+
+    with count_queries() as statements:
+        body = client.get("/api/dashboard").json()
+
+    assert len(statements) == 1
+    assert [card["slug"] for card in body] == slugs
+    assert body[0]["sparkline"] == [100.0 + i for i in range(8, 20)]
+    assert body[0]["latest_value"] == 119.0
+    assert body[0]["category_slug"] == "market-indexes"
+
+
+def test_dashboard_defaults_until_configured(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+    make_indicator(db, category, "sp500", points=3)
+    make_indicator(db, category, "not-on-dashboard", points=3)
+
+    assert [card["slug"] for card in client.get("/api/dashboard").json()] == ["sp500", "gold"]
+
+    response = client.put("/api/admin/dashboard-indicators", params={"admin_token": "admin"}, json=["not-on-dashboard", "gold"])
+    assert response.status_code == 200
+    assert [card["slug"] for card in client.get("/api/dashboard").json()] == ["not-on-dashboard", "gold"]
+
+    response = client.put("/api/admin/dashboard-indicators", params={"admin_token": "admin"}, json=["missing"])
+    assert response.status_code == 400
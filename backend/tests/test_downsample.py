@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.downsample import downsample_indices, lttb_indices, minmax_indices
+
+from .conftest import make_category, make_indicator
+
+
+def random_walk(n, seed=7):
+    return np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+def test_lttb_keeps_one_point_per_bucket_and_both_ends():
+    y = random_walk(1000)
+    keep = lttb_indices(np.arange(1000, dtype=np.float64), y, 50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    # Interior point i comes from bucket i of the 998 interior points
+    every = 998 / 48
+    for i, index in enumerate(keep[1:-1]):
+        assert int(i * every) + 1 <= index < int((i + 1) * every) + 1
+
+    # Nothing to drop, or too few points asked for: everything is kept
+    assert lttb_indices(np.arange(10.0), np.arange(10.0), 10).tolist() == list(range(10))
+    assert lttb_indices(np.arange(10.0), np.arange(10.0), 2).tolist() == list(range(10))
+
+
+def test_minmax_keeps_the_extremes_within_the_budget():
+    y = random_walk(1000)
+    keep = minmax_indices(y, 40)
+
+    assert len(keep) <= 40
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert {int(np.argmin(y)), int(np.argmax(y))} <= set(keep.tolist())
+
+
+def test_downsample_indices_uses_dates_as_x():
+    dates = [date(2020, 1, 1) + timedelta(days=i) for i in range(100)]
+    values = random_walk(100).tolist()
+    assert len(downsample_indices(dates, values, 10)) == 10
+    assert len(downsample_indices(dates, values, 10, "minmax")) <= 10
+
+
+def test_points_downsamples_every_series_in_the_endpoint(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=500)
+
+    for method in ("lttb", "minmax"):
+        body = client.get("/api/indicators/gold", params={"points": 20, "downsample": method}).json()
+        [series] = body["series"]
+        assert 3 <= len(series["data_points"]) <= 20
+        assert series["data_points"][0]["date"] == "2020-01-01"
+        assert series["data_points"][-1]["date"] == (date(2020, 1, 1) + timedelta(days=499)).isoformat()
+        assert body["data_points"] == series["data_points"]
+
+    # Limits and date filters apply before downsampling
+    body = client.get("/api/indicators/gold", params={"points": 10, "limit": 50}).json()
+    assert len(body["data_points"]) == 10
+    assert body["data_points"][0]["date"] == (date(2020, 1, 1) + timedelta(days=450)).isoformat()
+
+    assert client.get("/api/indicators/gold", params={"points": 2}).status_code == 422
+    assert client.get("/api/indicators/gold", params={"points": 10, "downsample": "avg"}).status_code == 422
@@ -0,0 +1,64 @@
+import pytest
+
+from app.extractors import extract, prefilter_css, validate
+from app.http_client import Page
+
+HTML = b"""<html><head>
+<script>var tpl = '<span class="price">999</span>';</script>
+</head><body>
+<div class="quote main"><span class="price">1,234.50</span><span class="change">-0.4%</span></div>
+<div id="last"><b>12.5</b> USD</div>
+<span data-test="instrument-price-last">77</span>
+<ul class="rows"><li class="rows">3</li></ul>
+</body></html>"""
+
+
+def page(content=HTML, content_type="text/html"):
+    return Page("https://example.test/", content, "utf-8", content_type)
+
+
+@pytest.mark.parametrize("selector, expected", [
+    (".price", 1234.5),
+    ("div.quote", 1234.5),
+    ("#last", 12.5),
+    ('[data-test="instrument-price-last"]', 77.0),
+    ("ul.rows", 3.0),
+    ("div.quote span.change", 0.4),
+])
+def test_css_matches_full_tree_semantics(selector, expected):
+    assert extract(page(), selector, "css").value == expected
+
+
+def test_prefilter_skips_script_contents_and_parses_only_the_snippet(monkeypatch):
+    monkeypatch.setattr(Page, "tree", property(lambda self: pytest.fail("full tree was built")))
+    decided, value = prefilter_css(page(HTML.replace(b"<script>", b"<script >")), "#last")
+    assert (decided, value) == (True, 12.5)
+
+    # The only earlier match is inside <script>; the pre-filter defers to the tree
+    assert prefilter_css(page(), ".price") == (False, None)
+
+
+def test_xpath_jsonpath_and_regex():
+    assert extract(page(), "//div[@id='last']/b/text()", "xpath").value == 12.5
+    assert extract(page(), "count(//span)", "xpath").value == 3.0
+
+    data = page(b'{"data": {"quotes": [{"symbol": "GC", "last": 2010.5}, {"symbol": "SI", "last": "24.10"}]}}')
+    assert extract(data, "$.data.quotes[1].last", "jsonpath").value == 24.1
+    assert extract(data, "$['data'].quotes[*].last", "jsonpath").value == 2010.5
+    assert extract(data, "$.data.missing", "jsonpath").value is None
+
+    assert extract(page(), r'id="last"><b>([\d.]+)', "regex").value == 12.5
+
+
+def test_css_miss_falls_back_to_generic_selectors():
+    result = extract(page(b'<html><body><span class="current-price">5.5</span></body></html>'), ".nope", "css")
+    assert (result.value, result.matched) == (5.5, ".current-price")
+    assert result.missed[:2] == (".nope", ".text-5xl")
+    assert extract(page(b"<html><body><p>none</p></body></html>"), ".nope", "css").value is None
+
+
+def test_validate_rejects_unknown_types_and_bad_expressions():
+    validate("jsonpath", "$.a[0]")
+    for extractor_type, expression in [("soup", ".a"), ("jsonpath", "a.b"), ("regex", "(unclosed"), ("xpath", "//[")]:
+        with pytest.raises(ValueError):
+            validate(extractor_type, expression)
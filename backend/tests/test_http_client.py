@@ -0,0 +1,50 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import http_client
+
+
+def serve(handler_class):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_unchanged_pages_revalidate_with_304_and_reuse_the_stored_page():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            seen.append((self.headers.get("If-None-Match"), self.client_address[1]))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = b'<html><body><span class="price">42</span></body></html>'
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server, base = serve(Handler)
+    http_client.validators.clear()
+    try:
+        first, first_not_modified = http_client.fetch_page(f"{base}/quote", timeout=5)
+        second, second_not_modified = http_client.fetch_page(f"{base}/quote", timeout=5)
+    finally:
+        server.shutdown()
+
+    assert (first_not_modified, second_not_modified) == (False, True)
+    assert second is first
+    assert first.tree is second.tree
+    assert [etag for etag, _ in seen] == [None, '"v1"']
+    # Keep-alive: both requests came over the same pooled connection
+    assert seen[0][1] == seen[1][1]
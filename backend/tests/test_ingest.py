@@ -0,0 +1,117 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app import ingest
+from app.ingest import parse_dates
+from app.models import DataPoint
+
+from .conftest import make_category, make_indicator
+
+
+def test_parse_dates_handles_year_month_and_full_dates():
+    parsed = parse_dates(pd.Series(["2024", 1960.0, "2024-03", "2024-03-15", "03/15/2024", "not a date", None]))
+    assert parsed.dt.strftime("%Y-%m-%d").tolist()[:5] == [
+        "2024-01-01", "1960-01-01", "2024-03-01", "2024-03-15", "2024-03-15",
+    ]
+    assert parsed[5:].isna().all()
+
+
+def test_upload_csv_accepts_early_years(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold")
+
+    csv = "date,value\n1600,1\n1500-01,2\n1492-10-12,3\n10000-01-01,4\n"
+    body = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", csv, "text/csv")},
+        data={"admin_token": "admin"},
+    ).json()
+
+    assert body["added"] == 3
+    assert body["errors"] == ["Row 3: invalid date '10000-01-01'"]
+    dates = sorted(point.date for point in db.query(DataPoint))
+    assert dates == [date(1492, 10, 12), date(1500, 1, 1), date(1600, 1, 1)]
+
+
+def test_upload_csv_upserts_and_reports_errors(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=2)  # 2020-01-01, 2020-01-02
+
+    csv = "date,value\n2020-01-02,7\n2020-01-03,8\nbad,9\n2020-01-04,abc\n2020-01-03,10\n"
+    body = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", csv, "text/csv")},
+        data={"admin_token": "admin"},
+    ).json()
+
+    assert body["added"] == 1
+    assert body["updated"] == 1
+    assert body["total_errors"] == 2
+    assert body["errors"] == ["Row 2: invalid date 'bad'", "Row 3: invalid value 'abc'"]
+
+    points = client.get("/api/indicators/gold").json()["data_points"]
+    assert [(p["date"], p["value"]) for p in points] == [
+        ("2020-01-01", 100.0), ("2020-01-02", 7.0), ("2020-01-03", 10.0),
+    ]
+
+
+def test_upload_csv_streams_in_chunks(client, db, monkeypatch):
+    monkeypatch.setattr(ingest.settings, "ingest_chunk_rows", 2)
+    category = make_category(db)
+    make_indicator(db, category, "gold")
+
+    rows = "".join(f"2021-01-{day:02d},{day}\n" for day in range(1, 6))
+    body = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", "date,value\n" + rows + "bad,1\n", "text/csv")},
+        data={"admin_token": "admin"},
+    ).json()
+
+    assert body["chunks"] == 3
+    assert body["added"] == 5
+    assert body["errors"] == ["Row 5: invalid date 'bad'"]
+
+    latest = client.get("/api/indicators/gold/latest").json()
+    assert latest["latest_date"] == "2021-01-05"
+
+
+def test_failed_upload_refreshes_snapshots_for_committed_chunks(client, db, monkeypatch):
+    monkeypatch.setattr(ingest.settings, "ingest_chunk_rows", 2)
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=1)
+    assert client.get("/api/indicators/gold/latest").json()["latest_date"] == "2020-01-01"
+
+    ingest_dataframe = ingest.ingest_dataframe
+    calls = []
+
+    def fail_second_chunk(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("database went away")
+        return ingest_dataframe(*args)
+
+    monkeypatch.setattr(ingest, "ingest_dataframe", fail_second_chunk)
+    rows = "".join(f"2021-01-{day:02d},{day}\n" for day in range(1, 6))
+    with pytest.raises(RuntimeError):
+        client.post(
+            "/api/admin/upload-csv/gold",
+            files={"file": ("gold.csv", "date,value\n" + rows, "text/csv")},
+            data={"admin_token": "admin"},
+        )
+
+    # The first chunk was committed; the cached latest value follows it
+    assert client.get("/api/indicators/gold/latest").json()["latest_date"] == "2021-01-02"
+
+
+def test_create_from_csv_rejects_missing_columns(client, db):
+    make_category(db)
+    response = client.post(
+        "/api/admin/create-indicator-from-csv",
+        files={"file": ("x.csv", "day,price\n2021-01-01,1\n", "text/csv")},
+        data={"admin_token": "admin", "name": "X", "slug": "x", "category_slug": "market-indexes"},
+    )
+
+    assert response.status_code == 400
+    assert client.get("/api/indicators/x").status_code == 404
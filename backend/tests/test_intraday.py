@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+from app import intraday
+from app.models import DailyBar, IntradayObservation
+
+from .conftest import make_category, make_indicator
+
+
+def test_bars_follow_readings_and_old_readings_roll_up(db, monkeypatch):
+    monkeypatch.setattr(intraday.settings, "intraday_retention_days", 7)
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    today = date(2026, 3, 20)
+    old_day = today - timedelta(days=10)
+
+    for hour, value in ((9, 5.0), (15, 7.0), (21, 6.0)):
+        intraday.record(db, {gold.id: value}, old_day, datetime(2026, 3, 10, hour))
+    intraday.record(db, {gold.id: 8.0}, today, datetime(2026, 3, 20, 9))
+    bars = intraday.refresh_bars(db, [gold.id], old_day)
+    assert bars[gold.id][:5] == (5.0, 7.0, 5.0, 6.0, 3)
+
+    # A reading arriving later is folded into the stored bar at rollup time
+    intraday.record(db, {gold.id: 9.0}, old_day, datetime(2026, 3, 10, 22))
+    summary = intraday.rollup(db, today)
+    db.commit()
+
+    assert summary == {"cutoff": "2026-03-13", "bars": 1, "observations_deleted": 4}
+    bar = db.get(DailyBar, (gold.id, old_day))
+    assert (bar.open, bar.high, bar.low, bar.close, bar.observations) == (5.0, 9.0, 5.0, 9.0, 4)
+    assert [o.date for o in db.query(IntradayObservation)] == [today]
+
+
+def test_manual_collection_is_kept_by_the_next_scheduled_run(client, db, monkeypatch):
+    from app import collection
+    from app.scraping import ScrapeOutcome
+
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    gold.scrape_url, gold.html_selector = "https://quotes.example/gold", ".price"
+    db.commit()
+
+    monkeypatch.setattr(collection, "scrape_targets", lambda targets, **kwargs: {gold.id: ScrapeOutcome(11.0, matched=".price")})
+    response = client.post("/api/admin/collect-daily-data/gold", params={"admin_token": "admin"})
+    assert response.json()["action"] == "created"
+
+    monkeypatch.setattr(collection, "scrape_targets", lambda targets, **kwargs: {gold.id: ScrapeOutcome(12.0, matched=".price")})
+    collection.collect_all(db)
+    db.expire_all()
+
+    bar = db.get(DailyBar, (gold.id, date.today()))
+    assert (bar.open, bar.low, bar.close, bar.observations) == (11.0, 11.0, 12.0, 2)
+    assert client.get("/api/indicators/gold/latest").json()["latest_value"] == 12.0
+
+
+def test_batch_collected_again_after_an_expired_lease_is_stored_once(db, monkeypatch):
+    from app import collection, schedule
+
+    monkeypatch.setattr(schedule.settings, "collection_lease_seconds", 60)
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    gold.scrape_url, gold.html_selector = "https://quotes.example/gold", ".price"
+    db.commit()
+    now = datetime(2026, 3, 2, 9, 0)
+    today = date(2026, 3, 2)
+
+    # worker-a stalls past its lease; worker-b claims the same batch and saves it first
+    assert schedule.claim(db, "worker-a", now=now) == [gold.id]
+    runs_a = schedule.previous_runs(db, [gold.id])
+    assert schedule.claim(db, "worker-b", now=now + timedelta(seconds=90)) == [gold.id]
+    collection.save_collected(db, {gold.id: 10.0}, today, schedule.previous_runs(db, [gold.id]))
+    schedule.mark_collected(db, {gold.id: "collected"}, now + timedelta(seconds=95), worker="worker-b")
+    db.commit()
+    collection.save_collected(db, {gold.id: 10.5}, today, runs_a)
+    db.commit()
+
+    assert db.query(IntradayObservation).count() == 1
+    assert db.get(DailyBar, (gold.id, today)).observations == 1
+
+    # The next run has a new key; manual readings (no run) are always kept
+    collection.save_collected(db, {gold.id: 11.0}, today, schedule.previous_runs(db, [gold.id]))
+    collection.save_collected(db, {gold.id: 12.0}, today)
+    collection.save_collected(db, {gold.id: 13.0}, today)
+    db.commit()
+    assert db.get(DailyBar, (gold.id, today)).observations == 4
+
+
+def test_manual_collection_goes_through_the_circuit_breaker(client, db, monkeypatch):
+    import requests
+
+    from app.scraping import host_health
+
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    gold.scrape_url, gold.html_selector = "https://quotes.example/gold", ".price"
+    db.commit()
+
+    monkeypatch.setattr(host_health, "threshold", 1)
+    host_health.failure("quotes.example", requests.Timeout("read timed out"))
+    fetches = []
+    monkeypatch.setattr("app.scraping.DocumentCache.get", lambda self, url, timeout: fetches.append(url))
+
+    response = client.post("/api/admin/collect-daily-data/gold", params={"admin_token": "admin"})
+    assert response.status_code == 400
+    assert "Circuit open for quotes.example" in response.json()["detail"]
+    assert fetches == []
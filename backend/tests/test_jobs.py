@@ -0,0 +1,78 @@
+import time
+from datetime import date
+
+from .conftest import make_category, make_indicator
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/admin/jobs/{job_id}", params={"admin_token": "admin"}).json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_background_upload_returns_job_and_reports_result(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold")
+
+    response = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", "date,value\n2021-01-01,1\n2021-01-02,x\n", "text/csv")},
+        data={"admin_token": "admin", "background": "true"},
+    )
+    assert response.status_code == 202
+
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "succeeded"
+    assert job["kind"] == "ingest_csv"
+    assert job["result"]["added"] == 1
+    assert job["result"]["total_errors"] == 1
+    assert job["progress"]["done"] == job["progress"]["total"]
+
+    latest = client.get("/api/indicators/gold/latest").json()
+    assert latest["latest_date"] == "2021-01-01"
+
+
+def test_background_job_failure_is_reported(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold")
+
+    response = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", "day,price\n2021-01-01,1\n", "text/csv")},
+        data={"admin_token": "admin", "background": "true"},
+    )
+
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "CSV must contain 'date' and 'value' columns"
+
+
+def test_background_create_with_unreadable_csv_leaves_no_indicator(client, db):
+    make_category(db)
+    response = client.post(
+        "/api/admin/create-indicator-from-csv",
+        files={"file": ("x.csv", "day,price\n2021-01-01,1\n", "text/csv")},
+        data={"admin_token": "admin", "name": "X", "slug": "x", "category_slug": "market-indexes", "background": "true"},
+    )
+    assert response.status_code == 202
+    assert [i["slug"] for i in client.get("/api/indicators").json()] == ["x"]
+
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "failed"
+    assert client.get("/api/indicators/x").status_code == 404
+    assert client.get("/api/indicators").json() == []
+
+
+def test_background_collect_all_reports_per_indicator_results(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=1, start=date.today())
+
+    response = client.post("/api/admin/collect-all-data", params={"admin_token": "admin", "background": "true"})
+    job = wait_for_job(client, response.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["summary"] == {"total_processed": 1, "successful": 1, "failed": 0}
+    assert job["progress"]["results"][0]["status"] == "existing"
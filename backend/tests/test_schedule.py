@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import schedule
+from app.models import CollectionSchedule
+
+from .conftest import make_category, make_indicator
+
+
+@pytest.fixture(autouse=True)
+def utc_schedules(monkeypatch):
+    monkeypatch.setattr(schedule.settings, "schedule_timezone", "UTC")
+    schedule._zone.cache_clear()
+    yield
+    schedule._zone.cache_clear()
+
+
+def test_cron_and_interval_specs():
+    windows = schedule.parse("0 9,15,21 * * *")
+    assert windows.next_after(datetime(2026, 3, 2, 8, 59)) == datetime(2026, 3, 2, 9, 0)
+    assert windows.next_after(datetime(2026, 3, 2, 9, 0)) == datetime(2026, 3, 2, 15, 0)
+    assert windows.next_after(datetime(2026, 3, 2, 21, 30)) == datetime(2026, 3, 3, 9, 0)
+
+    # 2026-03-02 is a Monday; weekdays only, every 4 hours
+    weekdays = schedule.parse("30 */4 * * 1-5")
+    assert weekdays.next_after(datetime(2026, 3, 6, 21, 0)) == datetime(2026, 3, 9, 0, 30)
+    # Both day fields restricted: either matches
+    assert schedule.parse("0 9 15 * 0").next_after(datetime(2026, 3, 2)) == datetime(2026, 3, 8, 9, 0)
+    assert schedule.parse("0 0 1 1 *").next_after(datetime(2026, 3, 2)) == datetime(2027, 1, 1)
+
+    assert schedule.parse("every 6h").next_after(datetime(2026, 3, 2, 10, 5)) == datetime(2026, 3, 2, 16, 5)
+    for bad in ("every 0h", "0 25 * * *", "* * *", "weekly"):
+        with pytest.raises(ValueError):
+            schedule.parse(bad)
+
+
+def test_only_due_indicators_are_returned_and_rescheduled(db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    house = make_indicator(db, category, "house-prices")
+    make_indicator(db, category, "no-scrape")
+    gold.frequency, house.frequency = "daily", "yearly"
+    for indicator in (gold, house):
+        indicator.scrape_url, indicator.html_selector = f"https://quotes.example/{indicator.slug}", ".price"
+    db.commit()
+
+    now = datetime(2026, 3, 2, 9, 0)
+    # New indicators are due at once
+    assert schedule.due_indicator_ids(db, now) == [gold.id, house.id]
+    schedule.mark_collected(db, {gold.id: "collected", house.id: "failed"}, now)
+    db.commit()
+
+    assert db.get(CollectionSchedule, gold.id).next_due_at == datetime(2026, 3, 2, 15, 0)
+    assert db.get(CollectionSchedule, house.id).next_due_at == datetime(2026, 3, 15, 9, 0)
+    assert db.get(CollectionSchedule, house.id).last_success_at is None
+    assert schedule.next_wakeup(db) == datetime(2026, 3, 2, 15, 0)
+    assert schedule.due_indicator_ids(db, now + timedelta(hours=6)) == [gold.id]
+
+    schedule.set_spec(db, house, "every 30m", now)
+    db.commit()
+    assert schedule.due_indicator_ids(db, now + timedelta(minutes=30)) == [house.id]
+
+
+def test_schedule_endpoint_validates_specs(client, db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    gold.scrape_url, gold.html_selector = "https://quotes.example/gold", ".price"
+    db.commit()
+
+    bad = client.put("/api/admin/indicators/gold/schedule", params={"admin_token": "admin", "spec": "0 9 * *"})
+    assert bad.status_code == 400
+
+    response = client.put("/api/admin/indicators/gold/schedule", params={"admin_token": "admin", "spec": "every 2h"})
+    assert response.status_code == 200
+    assert response.json()["schedule"] == "every 2h"
+
+    listing = client.get("/api/admin/collection-schedule", params={"admin_token": "admin"}).json()
+    assert [(row["slug"], row["custom"]) for row in listing["indicators"]] == [("gold", True)]
+
+
+def test_workers_claim_disjoint_batches_and_expired_leases_return(db, monkeypatch):
+    monkeypatch.setattr(schedule.settings, "collection_lease_seconds", 60)
+    category = make_category(db)
+    indicators = [make_indicator(db, category, f"series-{i}") for i in range(5)]
+    for indicator in indicators:
+        indicator.scrape_url, indicator.html_selector = f"https://quotes.example/{indicator.slug}", ".price"
+    db.commit()
+    now = datetime(2026, 3, 2, 9, 0)
+
+    first = schedule.claim(db, "worker-a", limit=3, now=now)
+    second = schedule.claim(db, "worker-b", limit=3, now=now)
+    assert len(first) == 3 and len(second) == 2
+    assert not set(first) & set(second)
+    assert schedule.claim(db, "worker-c", now=now) == []
+
+    # worker-a keeps its leases alive; worker-b's expire and can be claimed again
+    later = now + timedelta(seconds=50)
+    assert schedule.renew(db, "worker-a", first, later) == 3
+    expired = now + timedelta(seconds=90)
+    assert sorted(schedule.claim(db, "worker-c", now=expired)) == sorted(second)
+
+    # Recording the run releases the worker's lease
+    schedule.mark_collected(db, dict.fromkeys(first, "collected"), now, worker="worker-a")
+    db.commit()
+    assert all(db.get(CollectionSchedule, i).lease_owner is None for i in first)
+
+
+def test_a_stale_worker_does_not_release_a_lease_taken_over(db, monkeypatch):
+    monkeypatch.setattr(schedule.settings, "collection_lease_seconds", 60)
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    gold.scrape_url, gold.html_selector = "https://quotes.example/gold", ".price"
+    db.commit()
+    now = datetime(2026, 3, 2, 9, 0)
+
+    assert schedule.claim(db, "worker-a", now=now) == [gold.id]
+    later = now + timedelta(seconds=90)
+    assert schedule.claim(db, "worker-b", now=later) == [gold.id]
+
+    # worker-a finishes late: its run is recorded, worker-b keeps the lease
+    schedule.mark_collected(db, {gold.id: "collected"}, later, worker="worker-a")
+    db.commit()
+    db.expire_all()
+    row = db.get(CollectionSchedule, gold.id)
+    assert (row.lease_owner, row.last_status) == ("worker-b", "collected")
+    assert schedule.claim(db, "worker-c", due_only=False, now=later) == []
+
+    schedule.mark_collected(db, {gold.id: "collected"}, later, worker="worker-b")
+    db.commit()
+    db.expire_all()
+    assert db.get(CollectionSchedule, gold.id).lease_owner is None
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from app.scraping import ScrapeEngine
+
+
+def test_hosts_run_in_parallel_but_each_host_is_spaced():
+    starts = {}
+    lock = threading.Lock()
+
+    def task(key):
+        def fetch(timeout):
+            with lock:
+                starts[key] = time.monotonic()
+            time.sleep(0.05)
+            return key
+        return fetch
+
+    urls = {f"{host}-{i}": f"https://{host}.example/{i}" for host in ("a", "b", "c") for i in range(3)}
+    engine = ScrapeEngine(max_workers=9, per_host=1, host_interval=0.1, deadline=5)
+    started = time.monotonic()
+    outcomes = engine.run((key, url, task(key)) for key, url in urls.items())
+    elapsed = time.monotonic() - started
+
+    assert {key: outcome.value for key, outcome in outcomes.items()} == {key: key for key in urls}
+    # Three requests per host, spaced 0.1s and run one at a time; hosts overlap
+    assert elapsed < 0.6
+    for host in ("a", "b", "c"):
+        times = sorted(t for key, t in starts.items() if key.startswith(host))
+        assert all(later - earlier >= 0.095 for earlier, later in zip(times, times[1:]))
+
+
+def test_deadline_bounds_the_run_and_errors_are_captured():
+    def slow(timeout):
+        time.sleep(min(timeout, 1))
+        return "late"
+
+    def broken(timeout):
+        raise ValueError("bad page")
+
+    engine = ScrapeEngine(max_workers=4, per_host=1, host_interval=0, deadline=0.2)
+    started = time.monotonic()
+    outcomes = engine.run([
+        ("slow-1", "https://slow.example/1", slow),
+        ("slow-2", "https://slow.example/2", slow),
+        ("broken", "https://other.example/", broken),
+    ])
+
+    assert time.monotonic() - started < 0.5
+    assert outcomes["broken"].error == "bad page"
+    assert outcomes["slow-2"].value is None
+    assert outcomes["slow-2"].error == "Run deadline exceeded"
+
+
+def test_targets_sharing_a_url_fetch_the_page_once():
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from app.scraping import DocumentCache, scrape_targets
+
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = b'<html><body><span class="gold">$2,010.50</span><span class="silver">24.1</span></body></html>'
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        documents = DocumentCache()
+        outcomes = scrape_targets([
+            ("gold", f"{base}/metals", ".gold", "css"),
+            ("silver", f"{base}/metals", "//span[@class='silver']", "xpath"),
+            ("missing", f"{base}/metals", ".platinum", "css"),
+            ("other", f"{base}/other", ".gold", None),
+        ], engine=ScrapeEngine(host_interval=0), documents=documents)
+    finally:
+        server.shutdown()
+
+    assert sorted(hits) == ["/metals", "/other"]
+    assert documents.fetches == 2
+    assert outcomes["gold"].value == 2010.5
+    assert outcomes["silver"].value == 24.1
+    assert outcomes["other"].value == 2010.5
+    assert outcomes["missing"].error == "No value found for selector"
+
+
+def test_transient_errors_are_retried_with_backoff(monkeypatch):
+    import requests
+
+    from app.scraping import HostHealth, ScrapeEngine
+
+    monkeypatch.setattr(ScrapeEngine, "backoff", staticmethod(lambda attempt, error: 0.01))
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise requests.ConnectionError("connection reset")
+        return 42
+
+    def missing(timeout):
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError("404 Not Found", response=response)
+
+    engine = ScrapeEngine(per_host=1, host_interval=0, deadline=5, retries=2, health=HostHealth(threshold=5))
+    outcomes = engine.run([("flaky", "https://flaky.example/", flaky), ("missing", "https://gone.example/", missing)])
+
+    assert outcomes["flaky"].value == 42 and len(calls) == 3
+    # Not transient: failed once, not retried
+    assert outcomes["missing"].error == "404 Not Found"
+    assert engine.health.report() == []
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers(monkeypatch):
+    import requests
+
+    from app.scraping import HostHealth, ScrapeEngine
+
+    monkeypatch.setattr(ScrapeEngine, "backoff", staticmethod(lambda attempt, error: 0))
+    calls = []
+
+    def dead(timeout):
+        calls.append(timeout)
+        raise requests.Timeout("read timed out")
+
+    health = HostHealth(threshold=3, cooldown=0.2)
+    engine = ScrapeEngine(per_host=1, host_interval=0, deadline=5, retries=0, health=health)
+    outcomes = engine.run([(i, f"https://dead.example/{i}", dead) for i in range(5)])
+
+    # Three pages timing out open the circuit; the rest fail without a request
+    assert len(calls) == 3
+    assert all(outcome.value is None for outcome in outcomes.values())
+    assert sum("Circuit open for dead.example" in outcome.error for outcome in outcomes.values()) == 2
+    [state] = health.report(["dead.example"])
+    assert (state["circuit"], state["consecutive_failures"], state["trips"]) == ("open", 3, 1)
+
+    # After the cool-down a single trial request closes it again
+    time.sleep(0.25)
+    assert health.report()[0]["circuit"] == "half-open"
+    outcomes = engine.run([("back", "https://dead.example/back", lambda timeout: 1.0)])
+    assert outcomes["back"].value == 1.0
+    assert health.report() == []
+
+
+def test_one_flaky_page_or_a_straggler_does_not_flip_the_circuit(monkeypatch):
+    import requests
+
+    from app.scraping import HostHealth, ScrapeEngine
+
+    monkeypatch.setattr(ScrapeEngine, "backoff", staticmethod(lambda attempt, error: 0))
+
+    def flaky(timeout):
+        raise requests.ConnectionError("connection reset")
+
+    health = HostHealth(threshold=3, cooldown=60)
+    engine = ScrapeEngine(per_host=1, host_interval=0, deadline=5, retries=2, health=health)
+    engine.run([("flaky", "https://quotes.example/flaky", flaky)])
+    [state] = health.report()
+    assert (state["circuit"], state["consecutive_failures"]) == ("degraded", 1)
+
+    for _ in range(2):
+        health.failure("quotes.example", requests.Timeout("read timed out"))
+    assert health.report()[0]["circuit"] == "open"
+    # A request that started before the circuit opened neither closes it nor counts
+    health.success("quotes.example")
+    health.failure("quotes.example", requests.Timeout("read timed out"))
+    [state] = health.report()
+    assert (state["circuit"], state["consecutive_failures"], state["trips"]) == ("open", 3, 1)
@@ -0,0 +1,56 @@
+from app import selector_memory
+from app.extractors import extract
+from app.http_client import Page
+
+from .conftest import make_category, make_indicator
+
+PAGE = Page("https://quotes.example/gold", b'<html><body><span class="current-price">5.5</span></body></html>')
+
+
+def test_winning_fallback_is_tried_first_next_run(db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+    silver = make_indicator(db, category, "silver")
+
+    first = extract(PAGE, ".gone", "css")
+    assert first.matched == ".current-price"
+    assert len(first.missed) > 1
+
+    selector_memory.record(db, [(gold.id, PAGE.url, first.matched, first.missed)])
+    db.commit()
+
+    hints = selector_memory.load_hints(db, [(gold.id, PAGE.url), (silver.id, "https://QUOTES.example/silver")])
+    assert hints[gold.id].preferred == ".current-price"
+    # No history of its own: borrows the domain's best selector
+    assert hints[silver.id].preferred == ".current-price"
+
+    second = extract(PAGE, ".gone", "css", preferred=hints[gold.id].preferred, skip=hints[gold.id].skip)
+    assert (second.value, second.matched, second.missed) == (5.5, ".current-price", (".gone",))
+
+
+def test_hints_never_shadow_a_configured_selector_that_works():
+    page = Page("https://quotes.example/silver",
+                b'<html><body><span class="current-price">2010.5</span><span id="silver">24.1</span></body></html>')
+    result = extract(page, "#silver", "css", preferred=".current-price")
+    assert (result.value, result.matched) == (24.1, "#silver")
+    # A preferred selector that is not a fallback is ignored
+    assert extract(PAGE, ".gone", "css", preferred="span").matched == ".current-price"
+
+
+def test_repeatedly_missing_fallbacks_are_pruned(db, monkeypatch):
+    monkeypatch.setattr(selector_memory.settings, "selector_prune_after", 2)
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold")
+
+    for _ in range(2):
+        selector_memory.record(db, [(gold.id, PAGE.url, None, (".gone", ".price"))])
+    selector_memory.record(db, [(gold.id, PAGE.url, ".current-price", (".gone",))])
+    db.commit()
+
+    hint = selector_memory.load_hints(db, [(gold.id, PAGE.url)])[gold.id]
+    assert hint.skip == {".gone", ".price"}
+
+    # The configured selector itself is never skipped
+    result = extract(PAGE, ".gone", "css", skip=hint.skip)
+    assert result.missed[0] == ".gone"
+    assert ".price" not in result.missed
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from app.models import DataPoint
+
+from .conftest import make_category, make_indicator
+
+START = date(2020, 1, 1)
+
+
+def day(i):
+    return (START + timedelta(days=i)).isoformat()
+
+
+def make_two_series(db):
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold", points=10)
+    db.add_all([
+        DataPoint(indicator_id=gold.id, series_type="annual_change", date=START + timedelta(days=i), value=float(i))
+        for i in range(4)
+    ])
+    db.commit()
+    return gold
+
+
+def series_dates(body):
+    return {series["series_type"]: [point["date"] for point in series["data_points"]] for series in body["series"]}
+
+
+def test_limit_applies_to_each_series(client, db):
+    make_two_series(db)
+
+    body = client.get("/api/indicators/gold", params={"limit": 3}).json()
+    assert series_dates(body) == {
+        "historical": [day(7), day(8), day(9)],
+        "annual_change": [day(1), day(2), day(3)],
+    }
+
+    # A series shorter than the limit is returned whole, not cut by the other's length
+    body = client.get("/api/indicators/gold", params={"limit": 6}).json()
+    dates = series_dates(body)
+    assert dates["historical"] == [day(i) for i in range(4, 10)]
+    assert dates["annual_change"] == [day(i) for i in range(4)]
+
+    # Date filters apply before the limit
+    body = client.get("/api/indicators/gold", params={"limit": 2, "end_date": day(5)}).json()
+    assert series_dates(body) == {"historical": [day(4), day(5)], "annual_change": [day(2), day(3)]}
+
+
+def test_series_filter_selects_series_types(client, db):
+    make_two_series(db)
+
+    for params in ({"series": "annual_change"}, {"series": "annual_change", "limit": 2}):
+        body = client.get("/api/indicators/gold", params=params).json()
+        assert list(series_dates(body)) == ["annual_change"]
+        assert body["data_points"] == []
+    assert series_dates(client.get("/api/indicators/gold", params={"series": "annual_change", "limit": 2}).json()) == {
+        "annual_change": [day(2), day(3)],
+    }
+
+    body = client.get("/api/indicators/gold", params=[("series", "historical"), ("series", "annual_change"), ("limit", 1)]).json()
+    assert series_dates(body) == {"historical": [day(9)], "annual_change": [day(3)]}
+
+    for params in ({"series": "monthly"}, {"series": "monthly", "limit": 5}):
+        assert client.get("/api/indicators/gold", params=params).json()["series"] == []
@@ -0,0 +1,102 @@
+from datetime import date
+
+from app.models import DataPoint, DataStats, IndicatorSnapshot
+from app.snapshots import STATS_ROW_ID, refresh_snapshots
+
+from .conftest import make_category, make_indicator
+
+
+def test_upload_csv_updates_snapshot_in_same_commit(client, db):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=2)
+
+    csv = "date,value\n2021-06-01,150\n2021-06-02,160\n"
+    response = client.post(
+        "/api/admin/upload-csv/gold",
+        files={"file": ("gold.csv", csv, "text/csv")},
+        data={"admin_token": "admin"},
+    )
+    assert response.status_code == 200
+
+    latest = client.get("/api/indicators/gold/latest").json()
+    assert latest["latest_date"] == "2021-06-02"
+    assert latest["latest_value"] == 160.0
+    assert latest["previous_value"] == 150.0
+
+    stats = client.get("/api/admin/stats", params={"admin_token": "admin"}).json()
+    assert stats["total_data_points"] == 4
+    assert stats["indicators"][0]["date_range"] == "2020-01-01 to 2021-06-02"
+
+
+def test_latest_prefers_historical_series(client, db):
+    category = make_category(db)
+    indicator = make_indicator(db, category, "cpi", points=3)
+    # A newer point in another series must not replace the historical latest value
+    db.add(DataPoint(indicator_id=indicator.id, series_type="annual_change", date=date(2030, 1, 1), value=5.0))
+    refresh_snapshots(db, [indicator.id])
+    db.commit()
+
+    assert client.get("/api/indicators/cpi/latest").json()["latest_value"] == 102.0
+
+
+def test_summary_totals_follow_writes_without_counting(client, db, count_queries):
+    category = make_category(db)
+    make_indicator(db, category, "gold", points=3)
+    make_indicator(db, category, "silver", points=5, start=date(2019, 6, 1))
+
+    with count_queries() as statements:
+        summary = client.get("/api/dashboard/summary").json()
+    assert summary["total_data_points"] == 8
+    assert summary["data_range"] == {"oldest": "2019-06-01", "newest": "2020-01-03"}
+    assert not any("FROM data_points" in statement for statement in statements)
+
+    assert client.delete("/api/admin/indicators/silver", params={"admin_token": "admin"}).status_code == 200
+    summary = client.get("/api/dashboard/summary").json()
+    assert summary["total_data_points"] == 3
+    assert summary["data_range"]["oldest"] == "2020-01-01"
+
+
+def snapshot_state(db):
+    db.expire_all()
+    snapshots = [
+        (s.indicator_id, s.series_type, s.latest_date, s.latest_value, s.previous_date, s.previous_value,
+         s.count, s.min_date, s.max_date)
+        for s in db.query(IndicatorSnapshot).order_by(IndicatorSnapshot.indicator_id, IndicatorSnapshot.series_type)
+    ]
+    stats = db.get(DataStats, STATS_ROW_ID)
+    return snapshots, (stats.total_data_points, stats.oldest_date, stats.newest_date)
+
+
+def test_writes_update_snapshots_from_the_rows_written(client, db, count_queries):
+    from app import collection
+
+    category = make_category(db)
+    gold = make_indicator(db, category, "gold", points=50)
+
+    uploads = [
+        "date,value\n2020-01-10,1\n2020-02-18,2\n",        # updates only, one of them the previous point
+        "date,value\n2020-02-19,3\n2019-12-01,4\n",        # update of the latest point, new oldest point
+        "date,value\n2021-01-01,5\n2020-06-01,6\n",        # two new latest points
+    ]
+    for csv in uploads:
+        with count_queries() as statements:
+            response = client.post(
+                "/api/admin/upload-csv/gold",
+                files={"file": ("gold.csv", csv, "text/csv")},
+                data={"admin_token": "admin", "series_type": "historical"},
+            )
+        assert response.status_code == 200
+        assert not any("count(" in statement or "row_number" in statement for statement in statements)
+
+    collection.save_collected(db, {gold.id: 7.0}, date(2021, 1, 1))
+    collection.save_collected(db, {gold.id: 8.0}, date(2021, 1, 2))
+    db.commit()
+
+    incremental = snapshot_state(db)
+    assert incremental[0][0][2:] == (date(2021, 1, 2), 8.0, date(2021, 1, 1), 7.0, 54, date(2019, 12, 1), date(2021, 1, 2))
+    assert incremental[1] == (54, date(2019, 12, 1), date(2021, 1, 2))
+
+    refresh_snapshots(db, [gold.id])
+    db.commit()
+    assert snapshot_state(db) == incremental
+
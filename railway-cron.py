@@ -18,19 +18,41 @@ logger = logging.getLogger(__name__)
 # Configuration
 API_URL = os.getenv('API_URL', 'https://macro-indicators-app-production.up.railway.app')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', 'admin')
-COLLECTION_ENDPOINT = f"{API_URL}/api/admin/collect-all-data?admin_token={ADMIN_TOKEN}"
+COLLECTION_ENDPOINT = f"{API_URL}/api/admin/collect-all-data?admin_token={ADMIN_TOKEN}&background=true"
+JOB_POLL_INTERVAL = 10  # seconds
+JOB_TIMEOUT = 1800  # give up waiting after 30 min (the job keeps running server-side)
+
+def wait_for_job(job_id):
+    """Poll a background job until it finishes; returns the job or None on timeout"""
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        response = requests.get(f"{API_URL}/api/admin/jobs/{job_id}", params={"admin_token": ADMIN_TOKEN}, timeout=30)
+        response.raise_for_status()
+        job = response.json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        progress = job.get("progress") or {}
+        logger.info(f"⏳ Job {job_id}: {job['status']} {progress.get('done', 0)}/{progress.get('total') or '?'}")
+        time.sleep(JOB_POLL_INTERVAL)
+    return None
 
 def collect_data():
     """Trigger data collection via API"""
     try:
         logger.info(f"🚀 Triggering data collection at {datetime.now()}")
-        response = requests.post(COLLECTION_ENDPOINT, timeout=300)  # 5 min timeout
+        response = requests.post(COLLECTION_ENDPOINT, timeout=30)
         
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"✅ Collection successful: {data.get('summary', {})}")
-        else:
+        if response.status_code != 202:
             logger.error(f"❌ Collection failed: {response.status_code} - {response.text}")
+            return
+        
+        job = wait_for_job(response.json()["job_id"])
+        if job is None:
+            logger.error("⌛ Gave up waiting for the collection job")
+        elif job["status"] == "succeeded":
+            logger.info(f"✅ Collection successful: {job['result'].get('summary', {})}")
+        else:
+            logger.error(f"❌ Collection failed: {job['error']}")
             
     except Exception as e:
         logger.error(f"💥 Collection error: {str(e)}")
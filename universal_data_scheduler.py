@@ -7,9 +7,6 @@ Automatically scrapes and stores data for all indicators with scrape configurati
 import sys
 import os
 from datetime import datetime, date, time
-import requests
-from lxml import html
-import re
 from dotenv import load_dotenv
 import time as time_module
 import logging
@@ -25,7 +22,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv('backend/.env.local')
 
 from backend.app.database import get_db
-from backend.app.models import Indicator, DataPoint
+from backend.app.models import DataPoint
+from backend.app.collection import Collectable, collectable_indicators, save_collected
+from backend.app.scraping import DocumentCache, host_health, host_of, scrape_targets
+from backend.app import intraday, schedule, selector_memory
+from backend.app.config import get_settings
 from sqlalchemy.orm import Session
 
 # Configure logging
@@ -38,6 +39,7 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 class DataCollectorScheduler:
     def __init__(self):
@@ -51,61 +53,6 @@ class DataCollectorScheduler:
             'Pragma': 'no-cache'
         }
     
-    def scrape_value_from_url(self, url: str, selector: str, indicator_name: str) -> Optional[float]:
-        """Scrape value from URL using CSS selector"""
-        try:
-            logger.info(f"📡 Scraping {indicator_name} from: {url}")
-            response = requests.get(url, headers=self.session_headers, timeout=15)
-            response.raise_for_status()
-            
-            # Parse HTML
-            tree = html.fromstring(response.content)
-            
-            # Try the configured selector
-            elements = tree.cssselect(selector)
-            if elements:
-                value_text = elements[0].text_content().strip()
-                logger.info(f"🎯 Raw value for {indicator_name}: '{value_text}'")
-                
-                # Extract numeric value
-                numbers = re.findall(r'[\d,]+\.?\d*', value_text)
-                if numbers:
-                    clean_value = float(numbers[0].replace(',', ''))
-                    logger.info(f"💰 Extracted value for {indicator_name}: {clean_value}")
-                    return clean_value
-            
-            # Try alternative selectors
-            alt_selectors = [
-                '.text-5xl', '.text-4xl', '.text-3xl', '.text-2xl',
-                '[data-test="instrument-price-last"]',
-                '.instrument-price_last',
-                '.last-price-value', '.price-value', '.current-price',
-                '.pid-index-last', '.pid-last',
-                '.price', '.value', '.amount',
-                'span[class*="price"]', 'div[class*="price"]',
-                'span[class*="value"]', 'div[class*="value"]'
-            ]
-            
-            for alt_sel in alt_selectors:
-                try:
-                    elements = tree.cssselect(alt_sel)
-                    if elements:
-                        value_text = elements[0].text_content().strip()
-                        numbers = re.findall(r'[\d,]+\.?\d*', value_text)
-                        if numbers:
-                            clean_value = float(numbers[0].replace(',', ''))
-                            logger.info(f"🎯 Found {indicator_name} with '{alt_sel}': {clean_value}")
-                            return clean_value
-                except:
-                    continue
-            
-            logger.warning(f"❌ No value found for {indicator_name} with any selector")
-            return None
-            
-        except Exception as e:
-            logger.error(f"❌ Scraping failed for {indicator_name}: {e}")
-            return None
-    
     def generate_realistic_value(self, indicator_id: int, db: Session) -> float:
         """Generate realistic value based on historical data"""
         try:
@@ -125,123 +72,179 @@ class DataCollectorScheduler:
         except:
             return 100.0
     
-    def collect_indicator_data(self, indicator: Indicator, db: Session) -> dict:
-        """Collect data for a single indicator"""
+    def collect_indicator_data(self, entry: Collectable, scraped_value: Optional[float] = None, scrape_error: Optional[str] = None) -> dict:
+        """Decide today's reading for a single indicator.
+
+        `scraped_value` is the result of scraping the indicator's page (see
+        collect_all_indicators). Every successful scrape counts, even when
+        today's point exists: it is kept as an intraday reading and today's
+        point follows the day's bar. Nothing is written here: readings are
+        saved for the whole batch at once.
+        """
+        indicator = entry.indicator
         result = {
             'indicator': indicator.name,
             'slug': indicator.slug,
+            'scrape_url': indicator.scrape_url,
             'success': False,
             'value': None,
             'source': 'none',
             'error': None
         }
         
-        try:
-            today = date.today()
-            
-            # Check if we already have data for today
-            existing = db.query(DataPoint).filter(
-                DataPoint.indicator_id == indicator.id,
-                DataPoint.date == today,
-                DataPoint.series_type == 'historical'
-            ).first()
-            
-            if existing:
-                result['success'] = True
-                result['value'] = existing.value
-                result['source'] = 'existing'
-                logger.info(f"✅ {indicator.name}: Using existing value ${existing.value}")
-                return result
-            
-            # Try scraping if configured
-            scraped_value = None
-            if indicator.scrape_url and indicator.html_selector:
-                scraped_value = self.scrape_value_from_url(
-                    indicator.scrape_url, 
-                    indicator.html_selector, 
-                    indicator.name
-                )
-                
-            if scraped_value is not None:
-                final_value = scraped_value
-                result['source'] = 'scraped'
+        if scraped_value is not None:
+            result['success'] = True
+            result['value'] = scraped_value
+            result['source'] = 'scraped'
+            logger.info(f"✅ {indicator.name}: Scraped ${scraped_value}")
+        elif entry.has_today:
+            result['success'] = True
+            result['value'] = entry.today_value
+            result['source'] = 'existing'
+            if entry.scrapable:
+                logger.warning(f"⚠️  {indicator.name}: {scrape_error or 'No value scraped'}; keeping today's ${entry.today_value}")
             else:
-                # Skip indicators without scrape configuration
-                logger.warning(f"⏭️  {indicator.name}: No scrape URL configured, skipping auto-generation")
-                result['success'] = False
-                result['error'] = 'No scrape URL configured'
-                return result
-            
-            # Insert new data point
-            new_data_point = DataPoint(
-                indicator_id=indicator.id,
-                series_type='historical',
-                date=today,
-                value=final_value
+                logger.info(f"✅ {indicator.name}: Using existing value ${entry.today_value}")
+        elif entry.scrapable:
+            logger.warning(f"❌ {indicator.name}: {scrape_error or 'No value scraped'}")
+            result['error'] = scrape_error or 'Failed to scrape data from source'
+        else:
+            # Skip indicators without scrape configuration
+            logger.warning(f"⏭️  {indicator.name}: No scrape URL configured, skipping auto-generation")
+            result['error'] = 'No scrape URL configured'
+        return result
+    
+    def scrape_pending(self, entries: List[Collectable], db: Session) -> dict:
+        """Scrape every indicator with a scrape config, concurrently.
+
+        Each distinct page is fetched once and every indicator's extractor
+        on it is evaluated against the same page. Different hosts are fetched in
+        parallel; each host gets limited concurrency and spaced requests (see
+        backend/app/scraping.py). Returns {indicator_id: ScrapeOutcome}.
+        """
+        targets = []
+        names = {}
+        for indicator, _ in (entry for entry in entries if entry.scrapable):
+            targets.append((indicator.id, indicator.scrape_url, indicator.html_selector, indicator.extractor_type))
+            names[indicator.id] = indicator.name
+        
+        documents = DocumentCache(self.session_headers)
+        logger.info(f"🌐 Scraping {len(targets)} indicators from {len({target[1] for target in targets})} pages concurrently")
+        outcomes = scrape_targets(
+            targets,
+            documents=documents,
+            hints=selector_memory.load_hints(db, [(target[0], target[1]) for target in targets]),
+        )
+        logger.info(f"📥 Fetched {documents.fetches} pages ({documents.not_modified} unchanged)")
+        
+        # Remember which selector worked so the next run tries it first (committed with the run)
+        selector_memory.record(db, [
+            (target[0], target[1], outcomes[target[0]].matched, outcomes[target[0]].missed) for target in targets
+        ])
+        for indicator_id, outcome in outcomes.items():
+            if outcome.value is not None and outcome.matched:
+                logger.info(f"🎯 {names[indicator_id]}: {outcome.value} via '{outcome.matched}'")
+        return outcomes
+    
+    def collect_batch(self, entries: List[Collectable], db: Session, today: date, worker: Optional[str] = None) -> List[dict]:
+        """Scrape and save one batch: one bulk insert and one commit, with each indicator's next due time.
+
+        The commit releases the leases `worker` still holds on the batch.
+        """
+        started = time_module.monotonic()
+        runs = schedule.previous_runs(db, [entry.indicator.id for entry in entries if entry.scrapable])
+        scraped = self.scrape_pending(entries, db)
+        logger.info(f"⏱️  Scraping finished in {time_module.monotonic() - started:.1f}s")
+        
+        results = []
+        collected = {}
+        
+        for entry in entries:
+            outcome = scraped.get(entry.indicator.id)
+            result = self.collect_indicator_data(
+                entry,
+                scraped_value=outcome.value if outcome else None,
+                scrape_error=outcome.error if outcome else None,
             )
-            db.add(new_data_point)
+            results.append(result)
+            if result['source'] == 'scraped':
+                collected[entry.indicator.id] = result['value']
+        
+        # Committing also releases the batch's leases
+        statuses = {
+            entry.indicator.id: {'scraped': 'collected', 'existing': 'existing'}.get(result['source'], 'failed')
+            for entry, result in zip(entries, results) if entry.scrapable
+        }
+        try:
+            save_collected(db, collected, today, runs)
+            schedule.mark_collected(db, statuses, worker=worker)
             db.commit()
-            
-            result['success'] = True
-            result['value'] = final_value
-            
-            logger.info(f"✅ {indicator.name}: Saved ${final_value} ({result['source']})")
-            return result
-            
         except Exception as e:
             db.rollback()
-            result['error'] = str(e)
-            logger.error(f"❌ {indicator.name}: Failed - {e}")
-            return result
+            logger.error(f"❌ Saving {len(collected)} values failed: {e}")
+            for result in results:
+                if result['source'] == 'scraped':
+                    result['success'] = False
+                    result['error'] = str(e)
+            # Still move the failed indicators on to their next due time
+            schedule.mark_collected(db, dict.fromkeys(statuses, 'failed'), worker=worker)
+            db.commit()
+        return results
     
-    def collect_all_indicators(self):
-        """Collect data for all indicators with scrape configurations"""
-        logger.info("🚀 Starting daily data collection for all indicators")
+    def collect_all_indicators(self, due_only: bool = False):
+        """Collect data for all indicators with scrape configurations.
+
+        With `due_only`, only indicators whose collection schedule is due
+        (backend/app/schedule.py) are processed. Indicators are claimed in
+        leased batches, so several collectors can run side by side without
+        scraping the same indicator twice.
+        """
+        logger.info("🚀 Starting data collection for %s", "due indicators" if due_only else "all indicators")
         
         # Create logs directory if it doesn't exist
         os.makedirs('logs', exist_ok=True)
         
         try:
             db = next(get_db())
+            today = date.today()
+            worker = schedule.worker_id()
             
-            # Get all indicators with scrape configurations OR recent data
-            all_indicators = db.query(Indicator).all()
-            
-            # Filter indicators that either have scrape config OR have historical data
-            active_indicators = []
-            for indicator in all_indicators:
-                has_scrape_config = indicator.scrape_url and indicator.html_selector
-                has_data = db.query(DataPoint).filter(
-                    DataPoint.indicator_id == indicator.id
-                ).first() is not None
-                
-                if has_scrape_config or has_data:
-                    active_indicators.append(indicator)
-            
-            logger.info(f"📊 Found {len(active_indicators)} active indicators to process")
-            
+            # Indicators with historical data but no scrape config are only reported
             results = []
-            successful = 0
-            failed = 0
+            if not due_only:
+                results += self.collect_batch(
+                    [entry for entry in collectable_indicators(db, today) if not entry.scrapable], db, today
+                )
             
-            for indicator in active_indicators:
-                result = self.collect_indicator_data(indicator, db)
-                results.append(result)
-                
-                if result['success']:
-                    successful += 1
-                else:
-                    failed += 1
-                
-                # Small delay between requests to be respectful
-                time_module.sleep(1)
+            with schedule.LeaseKeeper(worker) as leases:
+                processed = set()
+                while True:
+                    claimed = schedule.claim(db, worker, due_only=due_only, exclude=processed)
+                    if not claimed:
+                        break
+                    logger.info(f"📊 Claimed {len(claimed)} indicators as {worker}")
+                    processed.update(claimed)
+                    leases.hold(claimed)
+                    try:
+                        # Each indicator with whether today's point exists, in one query
+                        results += self.collect_batch(collectable_indicators(db, today, claimed), db, today, worker)
+                    except Exception:
+                        db.rollback()
+                        schedule.release(db, worker, claimed)
+                        db.commit()
+                        raise
+                    finally:
+                        leases.drop(claimed)
+            
+            successful = sum(1 for result in results if result['success'])
+            failed = len(results) - successful
             
             # Summary
             logger.info("="*60)
             logger.info(f"📈 DATA COLLECTION SUMMARY - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             logger.info(f"✅ Successful: {successful}")
             logger.info(f"❌ Failed: {failed}")
-            logger.info(f"📊 Total processed: {len(active_indicators)}")
+            logger.info(f"📊 Total processed: {len(results)}")
             
             # Log detailed results
             logger.info("\\n📋 Detailed Results:")
@@ -251,6 +254,15 @@ class DataCollectorScheduler:
                 source_str = f"({result['source']})" if result['source'] != 'none' else ""
                 logger.info(f"   {status} {result['indicator']}: {value_str} {source_str}")
             
+            
+            # Hosts that failed this run, with their circuit breaker state
+            hosts = {host_of(entry['scrape_url']) for entry in results if entry.get('scrape_url')}
+            for host in host_health.report(hosts):
+                logger.warning(
+                    f"   🔌 {host['host']}: circuit {host['circuit']}, {host['consecutive_failures']} failures in a row"
+                    f" ({host['last_error']})"
+                )
+            
             logger.info("="*60)
             
         except Exception as e:
@@ -259,44 +271,51 @@ class DataCollectorScheduler:
             if 'db' in locals():
                 db.close()
     
+    def rollup_intraday(self):
+        """Reduce intraday readings past the retention window to daily bars"""
+        db = next(get_db())
+        try:
+            summary = intraday.rollup(db)
+            db.commit()
+            logger.info(f"🗜️  Rolled up {summary['observations_deleted']} intraday readings before {summary['cutoff']} into {summary['bars']} daily bars")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Intraday rollup failed: {e}")
+        finally:
+            db.close()
+    
     def start_scheduler(self):
-        """Start the scheduler with different collection times"""
+        """Collect each indicator when it is due, sleeping until the next due time in between"""
         logger.info("🕐 Starting Data Collection Scheduler")
         
-        # Collection times (hours)
-        collection_times = [9, 15, 21]  # 9 AM, 3 PM, 9 PM
-        
-        logger.info("📅 Scheduled collection times:")
-        logger.info("   - 09:00 AM (Market open)")
-        logger.info("   - 03:00 PM (Market close)")
-        logger.info("   - 09:00 PM (End of day)")
+        logger.info("📅 Default schedules by frequency (cron, %s):", settings.schedule_timezone or "server local time")
+        for frequency, spec in schedule.DEFAULT_SPECS.items():
+            logger.info(f"   - {frequency}: {spec}")
         
         logger.info("🔄 Scheduler is running... Press Ctrl+C to stop")
         
-        last_collection_date = None
+        last_rollup = None
         
         try:
             while True:
-                now = datetime.now()
-                current_hour = now.hour
-                current_date = now.date()
+                self.collect_all_indicators(due_only=True)
+                if last_rollup != date.today():
+                    self.rollup_intraday()
+                    last_rollup = date.today()
                 
-                # Check if we should collect data
-                should_collect = False
-                
-                if current_hour in collection_times:
-                    # Only collect once per hour at most
-                    if last_collection_date != current_date or current_hour != getattr(self, '_last_collection_hour', None):
-                        should_collect = True
-                        self._last_collection_hour = current_hour
-                        last_collection_date = current_date
-                
-                if should_collect:
-                    logger.info(f"⏰ Collection time reached: {current_hour}:00")
-                    self.collect_all_indicators()
+                db = next(get_db())
+                try:
+                    wake_at = schedule.next_wakeup(db)
+                finally:
+                    db.close()
                 
-                # Sleep for 30 minutes before checking again
-                time_module.sleep(1800)  # 30 minutes
+                # Sleep until the next indicator is due, waking at least every
+                # scheduler_max_sleep_seconds to pick up new or rescheduled indicators
+                delay = settings.scheduler_max_sleep_seconds
+                if wake_at is not None:
+                    delay = min(max((wake_at - schedule.utcnow()).total_seconds(), 1), delay)
+                    logger.info(f"💤 Next collection due at {wake_at:%Y-%m-%d %H:%M} UTC")
+                time_module.sleep(delay)
                 
         except KeyboardInterrupt:
             logger.info("⏹️  Scheduler stopped by user")